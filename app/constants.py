@@ -3,6 +3,8 @@
 YouTubeサムネイル生成ツール - 定数定義
 """
 
+import os
+
 # アプリケーション情報
 APP_NAME = "YouTube Thumbnail Generator"
 APP_VERSION = "1.0.0"
@@ -50,6 +52,7 @@ UI_SETTINGS = {
     "window_width": 1400,
     "window_height": 900,
     "preview_scale": 0.5,  # プレビュー表示のスケール
+    "preview_debounce_ms": 120,  # 入力からプレビュー描画開始までの待ち時間
     "sidebar_width": 250,
 }
 
@@ -58,7 +61,59 @@ PATHS = {
     "templates": "templates",
     "characters": "characters",
     "output": "output",
+    "cache": "cache",
 }
 
+# プロジェクトのルート（起動スクリプトはここで実行する）
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# ジョブ・インデックスなど実行時に作るデータの保存先（どのディレクトリから実行しても同じ場所を使う）
+CACHE_DIR = os.path.join(PROJECT_ROOT, PATHS["cache"])
+
 # API設定
 API_MODEL = "gemini-2.0-flash-preview-image-generation"
+API_KEY_ENV = "GEMINI_API_KEY"  # コマンドラインからジョブを処理するときのAPI Key
+API_BASE_URL_ENV = "GEMINI_API_BASE_URL"  # 接続先を差し替える環境変数（モックサーバー用）
+
+# API呼び出しの流量制限・再試行・サーキットブレーカー
+API_RESILIENCE = {
+    "rate_per_minute": 10,    # 1分あたりの呼び出し回数の上限（平均）
+    "burst": 3,               # 連続して呼び出せる回数
+    "max_attempts": 4,        # 再試行を含めた最大試行回数
+    "base_delay": 2.0,        # バックオフの基準秒数
+    "max_delay": 30.0,        # バックオフの最大秒数
+    "failure_threshold": 5,   # サーキットブレーカーが開くまでの連続失敗回数
+    "reset_timeout": 60.0,    # 開いてから試行を再開するまでの秒数
+}
+
+# 生成解像度（ドラフトは低解像度で素早く、選んだものだけを高解像度で仕上げる）
+GENERATION_RESOLUTIONS = {
+    "draft": "1K",
+    "final": "2K",
+}
+
+# API送信前の参照画像の前処理
+REFERENCE_IMAGE_SETTINGS = {
+    "max_edge": 1536,   # 長辺の最大ピクセル数
+    "format": "WEBP",   # 再エンコード形式 ("WEBP", "JPEG", "PNG")
+    "quality": 90,      # 画質（WEBP/JPEG）
+}
+
+# 複数候補の生成と評価
+CANDIDATE_SETTINGS = {
+    "count": 4,             # 1回の呼び出しで要求する候補数
+    "sample_width": 384,    # 評価に使う縮小画像の幅
+    "safe_margin": 0.05,    # テキスト安全領域の外側の余白（幅・高さに対する割合）
+    "text_box": (560, 110),  # テキスト配置位置ごとに空き具合を見る領域のサイズ（サムネイル座標）
+    "weights": {            # 指標ごとの重み
+        "sharpness": 1.0,
+        "contrast": 1.0,
+        "free_space": 1.5,
+    },
+}
+
+# API呼び出しの計測データの書き出し先
+TELEMETRY_SETTINGS = {
+    "path": os.path.join(CACHE_DIR, "api_telemetry.jsonl"),
+    "format": "jsonl",  # "jsonl"（終了ごとに1行追記）または "prometheus"
+}
@@ -3,4 +3,7 @@
 Logic module for YouTube Thumbnail Generator
 """
 
-from .api_client import generate_image_with_api, validate_api_key
+from .api_client import (
+    generate_image_with_api, generate_images_async, generate_draft, finalize_draft,
+    generate_candidates, validate_api_key, close_clients
+)
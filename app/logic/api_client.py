@@ -4,44 +4,38 @@ API呼び出しロジック
 Gemini APIとの通信処理
 """
 
-import io
-from PIL import Image
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+
+import httpx
 from google import genai
 from google.genai import types
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-def generate_image_with_api(
-    api_key: str,
-    yaml_prompt: str,
-    char_image_paths: list,
-    resolution: str = "2K",
-    ref_image_path: str = None
-) -> dict:
-    """
-    Gemini APIを使用して画像を生成
+from constants import (
+    API_BASE_URL_ENV, CACHE_DIR, CANDIDATE_SETTINGS, GENERATION_RESOLUTIONS, TELEMETRY_SETTINGS
+)
+from .candidate_ranking import rank_candidates
+from .generated_image import GeneratedImage, image_extension
+from .reference_encoder import encode_reference_image
+from .resilience import RequestGuard
+from .response_cache import get_response_cache, make_cache_key
+from .telemetry import Telemetry
 
-    Args:
-        api_key: Google AI API Key
-        yaml_prompt: YAMLプロンプト文字列
-        char_image_paths: キャラクター参照画像のパスリスト
-        resolution: 解像度 ("1K", "2K", "4K")
-        ref_image_path: 参考画像（清書モード用）のパス
 
-    Returns:
-        結果を含む辞書:
-        {
-            'success': bool,
-            'image': PIL.Image or None,
-            'error': str or None
-        }
-    """
-    try:
-        client = genai.Client(api_key=api_key)
+# 画像生成に使うモデル
+IMAGE_MODEL = "gemini-3-pro-image-preview"
 
-        # 参考画像清書モードの場合、専用プロンプトを使用
-        if ref_image_path:
-            # 清書モード専用プロンプト（YAMLは不要）
-            redraw_prompt = """【CRITICAL: HIGH-FIDELITY IMAGE ENHANCEMENT MODE】
+# 指定できる解像度
+RESOLUTIONS = ("1K", "2K", "4K")
+
+# 清書モード専用プロンプト（YAMLは不要）
+REDRAW_PROMPT = """【CRITICAL: HIGH-FIDELITY IMAGE ENHANCEMENT MODE】
 
 You are performing an Image-to-Image (i2i) "clean-up / upscale" task.
 Your ONLY job is to ENHANCE IMAGE QUALITY while preserving the original image EXACTLY.
@@ -74,50 +68,675 @@ The attached image is the source to enhance.
 A higher-quality version of the EXACT SAME image.
 The result should be indistinguishable from the original except for improved quality.
 """
-            contents = [redraw_prompt]
-        else:
-            contents = [yaml_prompt]
 
-        # Add reference image first (if in redraw mode)
-        if ref_image_path:
-            try:
-                ref_img = Image.open(ref_image_path)
-                contents.append(ref_img)
-            except Exception as e:
-                print(f"Error loading reference image {ref_image_path}: {e}")
 
-        # Add character reference images
-        for img_path in char_image_paths:
-            try:
-                pil_img = Image.open(img_path)
-                contents.append(pil_img)
-            except Exception as e:
-                print(f"Error loading image {img_path}: {e}")
+# API呼び出しの流量制限・再試行・サーキットブレーカー（プロセス共通）
+_request_guard = RequestGuard()
+
+# API Keyごとのクライアントプール（接続を維持して再利用する）
+_client_pool = {}
+_client_pool_lock = threading.Lock()
+
+# API呼び出しのフェーズごとの所要時間と送受信バイト数（プロセス共通）
+_telemetry = Telemetry("thumbnail_api")
+
+# 実行中の呼び出しのHTTP計測（スレッドごとに別の値になる）
+_http_trace = contextvars.ContextVar("http_trace", default=None)
+
+
+def _on_http_request(request):
+    """HTTPリクエスト送信時のフック（試行ごとに呼ばれる）"""
+    trace = _http_trace.get()
+    if trace is None:
+        return
+    trace['sent_at'] = time.perf_counter()
+    _telemetry.count("http_attempts")
+    try:
+        _telemetry.count("http_upload_bytes", len(request.content))
+    except httpx.RequestNotRead:
+        pass  # ストリーミング送信の本文は数えない
+
+
+def _on_http_response(response):
+    """HTTPレスポンスのヘッダー受信時のフック（本文はまだ読まれていない）"""
+    trace = _http_trace.get()
+    if trace is None:
+        return
+    trace['headers_at'] = time.perf_counter()
+    _telemetry.count("http_download_bytes", int(response.headers.get("content-length") or 0))
+
+
+def _create_client(api_key: str) -> genai.Client:
+    """
+    クライアントを作成
+
+    環境変数 GEMINI_API_BASE_URL が設定されている場合は、その接続先を使う
+    （ローカルのモックサーバーでの計測・テスト用）。
+    """
+    base_url = os.environ.get(API_BASE_URL_ENV) or None
+    http_options = types.HttpOptions(
+        base_url=base_url,
+        client_args={"event_hooks": {"request": [_on_http_request], "response": [_on_http_response]}}
+    )
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+def get_client(api_key: str) -> genai.Client:
+    """
+    API Keyに対応するクライアントを取得（なければ作成してプールに保持）
+
+    Args:
+        api_key: Google AI API Key
+
+    Returns:
+        genai.Client: 再利用されるクライアント
+    """
+    key = (api_key, os.environ.get(API_BASE_URL_ENV) or None)
+
+    with _client_pool_lock:
+        client = _client_pool.get(key)
+        if client is None:
+            client = _create_client(api_key)
+            _client_pool[key] = client
+        return client
+
+
+def get_request_guard() -> RequestGuard:
+    """
+    API呼び出しに適用される RequestGuard を取得
+
+    get_stats() で試行回数・待ち時間・サーキットブレーカーが開いていた時間を確認でき、
+    configure() で設定を変更できる。
+    """
+    return _request_guard
+
+
+def get_telemetry() -> Telemetry:
+    """
+    API呼び出しの計測データを取得
+
+    フェーズ（所要時間。直近の値の p50/p95/p99 と累計）:
+        client_setup      クライアントの取得
+        image_loading     参照画像の読み込み・エンコード
+        api_call          API呼び出し全体（流量制限の待ち・再試行を含む）
+        request           最後の試行の送信からレスポンスヘッダー受信まで（アップロード＋サーバー処理）
+        download          レスポンス本文の受信と解析
+        response_parsing  画像の取り出しとヘッダーの確認
+        candidate_ranking 複数候補のデコードと評価（generate_candidates() のみ）
+    カウンター:
+        calls, cache_hits, errors, candidates_received,
+        images_sent, payload_bytes（送信したプロンプトと参照画像）,
+        http_attempts, http_upload_bytes, http_download_bytes（HTTP上のバイト数。再試行を含む）
+
+    request/download と http_* は同期呼び出しのみ計測される。
+    """
+    return _telemetry
+
+
+def export_telemetry(path: str = None, format: str = None) -> bool:
+    """
+    API呼び出しの計測データをファイルに書き出す（呼び出しがなければ何もしない）
+
+    Args:
+        path: 出力先のパス（Noneの場合は TELEMETRY_SETTINGS["path"]）
+        format: "jsonl" または "prometheus"（Noneの場合は TELEMETRY_SETTINGS["format"]）
+
+    Returns:
+        書き出した場合True
+    """
+    if not _telemetry.snapshot()["counters"].get("calls"):
+        return False
+    try:
+        _telemetry.export(path or TELEMETRY_SETTINGS["path"], format or TELEMETRY_SETTINGS["format"])
+        return True
+    except Exception as e:
+        print(f"Warning: Could not export API telemetry: {e}")
+        return False
+
+
+def close_clients():
+    """プール内のクライアントをすべて閉じる（アプリ終了時に呼ぶ）"""
+    with _client_pool_lock:
+        clients = list(_client_pool.values())
+        _client_pool.clear()
+
+    for client in clients:
+        try:
+            client.close()
+        except Exception as e:
+            print(f"Warning: Could not close API client: {e}")
+
+
+def generate_image_with_api(
+    api_key: str,
+    yaml_prompt: str,
+    char_image_paths: list,
+    resolution: str = "2K",
+    ref_image_path: str = None,
+    use_cache: bool = True
+) -> dict:
+    """
+    Gemini APIを使用して画像を生成
+
+    (モデル, プロンプト, 解像度, 参照画像の内容) が同じ生成結果はディスクにキャッシュされ、
+    次回からはAPIを呼ばずに返す。
+
+    Args:
+        api_key: Google AI API Key
+        yaml_prompt: YAMLプロンプト文字列
+        char_image_paths: キャラクター参照画像のパスリスト
+        resolution: 解像度 ("1K", "2K", "4K")
+        ref_image_path: 参考画像（清書モード用）のパス
+        use_cache: Falseの場合はキャッシュを使わずに必ずAPIを呼ぶ（結果はキャッシュを更新する）
+
+    Returns:
+        結果を含む辞書:
+        {
+            'success': bool,
+            'image': GeneratedImage or None,   # 遅延デコードされる画像
+            'error': str or None
+        }
+    """
+    _telemetry.count("calls")
+    try:
+        cache_key = _cache_key(yaml_prompt, char_image_paths, resolution, ref_image_path)
+        if use_cache:
+            cached = _cached_result(cache_key)
+            if cached is not None:
+                _telemetry.count("cache_hits")
+                return cached
+
+        with _telemetry.phase("client_setup"):
+            client = get_client(api_key)
+        with _telemetry.phase("image_loading"):
+            contents = _build_contents(yaml_prompt, char_image_paths, ref_image_path)
 
         # Call API
-        response = client.models.generate_content(
-            model="gemini-3-pro-image-preview",
-            contents=contents,
-            config=types.GenerateContentConfig(
-                response_modalities=['TEXT', 'IMAGE']
+        config = _build_config(resolution)
+        trace = {}
+        token = _http_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            response = _request_guard.call(
+                lambda: client.models.generate_content(
+                    model=IMAGE_MODEL,
+                    contents=contents,
+                    config=config
+                )
             )
-        )
+        finally:
+            end = time.perf_counter()
+            _http_trace.reset(token)
+            _telemetry.observe("api_call", end - start)
+        if 'sent_at' in trace and 'headers_at' in trace:
+            _telemetry.observe("request", trace['headers_at'] - trace['sent_at'])
+            _telemetry.observe("download", end - trace['headers_at'])
+        _log_request(contents, end - start)
 
         # Process response
-        return process_api_response(response)
+        with _telemetry.phase("response_parsing"):
+            result = process_api_response(response, cache_key)
 
     except Exception as e:
-        return {
+        result = {
             'success': False,
             'image': None,
             'error': str(e)
         }
+    if not result['success']:
+        _telemetry.count("errors")
+    return result
+
+
+def _cache_key(yaml_prompt: str, char_image_paths: list, resolution: str, ref_image_path: str = None) -> str:
+    """生成リクエストのキャッシュキー（送信内容と同じ順序で参照画像を含める）"""
+    prompt = REDRAW_PROMPT if ref_image_path else yaml_prompt
+    image_paths = ([ref_image_path] if ref_image_path else []) + list(char_image_paths)
+    return make_cache_key(IMAGE_MODEL, prompt, resolution, image_paths)
+
+
+def _cached_result(cache_key: str) -> dict:
+    """キャッシュされた生成結果（なければNone）"""
+    cached = get_response_cache().get(cache_key)
+    if cached is None:
+        return None
+    image_data, mime_type = cached
+    return _image_result(image_data, mime_type)
+
+
+def _build_contents(yaml_prompt: str, char_image_paths: list, ref_image_path: str = None) -> list:
+    """
+    APIに送るコンテンツ（プロンプトと参照画像）を組み立てる
+
+    Args:
+        yaml_prompt: YAMLプロンプト文字列
+        char_image_paths: キャラクター参照画像のパスリスト
+        ref_image_path: 参考画像（清書モード用）のパス
+
+    Returns:
+        コンテンツのリスト
+    """
+    # 参考画像清書モードの場合、専用プロンプトを使用
+    if ref_image_path:
+        contents = [REDRAW_PROMPT]
+    else:
+        contents = [yaml_prompt]
+
+    # 参照画像は縮小・再エンコード済みのバイト列で送る（エンコード結果は再利用される）
+    # Add reference image first (if in redraw mode)
+    if ref_image_path:
+        try:
+            data, mime_type = encode_reference_image(ref_image_path)
+            contents.append(types.Part.from_bytes(data=data, mime_type=mime_type))
+        except Exception as e:
+            print(f"Error loading reference image {ref_image_path}: {e}")
+
+    # Add character reference images
+    for img_path in char_image_paths:
+        try:
+            data, mime_type = encode_reference_image(img_path)
+            contents.append(types.Part.from_bytes(data=data, mime_type=mime_type))
+        except Exception as e:
+            print(f"Error loading image {img_path}: {e}")
+
+    return contents
+
+
+def _log_request(contents: list, elapsed: float):
+    """
+    API呼び出しの送信バイト数と所要時間を表示（計測データにも加算する）
+
+    Args:
+        contents: 送信したコンテンツ
+        elapsed: リクエストの所要時間（秒）
+    """
+    upload_bytes = 0
+    image_count = 0
+    for content in contents:
+        if isinstance(content, str):
+            upload_bytes += len(content.encode("utf-8"))
+        elif getattr(content, 'inline_data', None) is not None:
+            upload_bytes += len(content.inline_data.data)
+            image_count += 1
+    _telemetry.count("payload_bytes", upload_bytes)
+    _telemetry.count("images_sent", image_count)
+    print(
+        f"API呼び出し: 送信 {upload_bytes / 1024:.1f} KB（参照画像 {image_count}枚）  "
+        f"{elapsed * 1000:.0f} ms"
+    )
+
+
+def _build_config(resolution: str = "2K", candidate_count: int = 1) -> types.GenerateContentConfig:
+    """
+    生成設定を組み立てる
+
+    Args:
+        resolution: 解像度 ("1K", "2K", "4K")
+        candidate_count: 要求する候補数
+
+    Returns:
+        types.GenerateContentConfig: 生成設定
+    """
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"未対応の解像度です: {resolution}")
+
+    return types.GenerateContentConfig(
+        response_modalities=['TEXT', 'IMAGE'],
+        image_config=types.ImageConfig(image_size=resolution),
+        candidate_count=candidate_count if candidate_count > 1 else None
+    )
+
+
+def generate_candidates(
+    api_key: str,
+    yaml_prompt: str,
+    char_image_paths: list,
+    resolution: str = "2K",
+    ref_image_path: str = None,
+    candidate_count: int = None,
+    text_positions: list = None
+) -> dict:
+    """
+    1回のAPI呼び出しで複数の候補を生成し、背景として使いやすい順に並べる
+
+    候補はスレッドプールで並行してデコードし、シャープネス・テキスト安全領域のコントラスト・
+    テキスト配置位置の空き具合で順位付けする（candidate_ranking を参照）。
+    候補ごとに結果が異なるため、レスポンスキャッシュは使わない。
+
+    Args:
+        api_key: Google AI API Key
+        yaml_prompt: YAMLプロンプト文字列
+        char_image_paths: キャラクター参照画像のパスリスト
+        resolution: 解像度 ("1K", "2K", "4K")
+        ref_image_path: 参考画像（清書モード用）のパス
+        candidate_count: 要求する候補数（Noneの場合は CANDIDATE_SETTINGS["count"]）
+        text_positions: テキストを置く予定の配置プリセットのリスト
+                        （main_window の TEXT_POSITIONS の値と同じ形式。Noneの場合は空き具合を評価しない）
+
+    Returns:
+        結果を含む辞書:
+        {
+            'success': bool,
+            'image': GeneratedImage or None,   # 最も評価の高い候補
+            'error': str or None,
+            'candidates': [                    # 評価の高い順
+                {'image': GeneratedImage, 'score': CandidateScore}, ...
+            ]
+        }
+    """
+    candidate_count = candidate_count or CANDIDATE_SETTINGS["count"]
+    _telemetry.count("calls")
+    try:
+        with _telemetry.phase("client_setup"):
+            client = get_client(api_key)
+        with _telemetry.phase("image_loading"):
+            contents = _build_contents(yaml_prompt, char_image_paths, ref_image_path)
+
+        config = _build_config(resolution, candidate_count)
+        start = time.perf_counter()
+        try:
+            response = _request_guard.call(
+                lambda: client.models.generate_content(
+                    model=IMAGE_MODEL,
+                    contents=contents,
+                    config=config
+                )
+            )
+        finally:
+            elapsed = time.perf_counter() - start
+            _telemetry.observe("api_call", elapsed)
+        _log_request(contents, elapsed)
+
+        with _telemetry.phase("response_parsing"):
+            result = process_candidates_response(response, text_positions)
+
+    except Exception as e:
+        result = {
+            'success': False,
+            'image': None,
+            'error': str(e),
+            'candidates': []
+        }
+    if not result['success']:
+        _telemetry.count("errors")
+    return result
+
+
+def generate_draft(
+    api_key: str,
+    yaml_prompt: str,
+    char_image_paths: list,
+    ref_image_path: str = None,
+    use_cache: bool = True
+) -> dict:
+    """
+    低解像度のドラフトを生成し、プレビュー用にファイルへ保存
+
+    Args:
+        api_key: Google AI API Key
+        yaml_prompt: YAMLプロンプト文字列
+        char_image_paths: キャラクター参照画像のパスリスト
+        ref_image_path: 参考画像（清書モード用）のパス
+        use_cache: Falseの場合はキャッシュを使わずに必ずAPIを呼ぶ
+
+    Returns:
+        結果を含む辞書:
+        {
+            'success': bool,
+            'image': GeneratedImage or None,   # 遅延デコードされる画像
+            'error': str or None,
+            'path': str or None     # 保存したドラフトの絶対パス（背景画像や finalize_draft() に渡す）
+        }
+    """
+    resolution = GENERATION_RESOLUTIONS["draft"]
+    result = generate_image_with_api(
+        api_key, yaml_prompt, char_image_paths, resolution, ref_image_path, use_cache
+    )
+    result['path'] = None
+    if not result['success']:
+        return result
+
+    try:
+        cache_key = _cache_key(yaml_prompt, char_image_paths, resolution, ref_image_path)
+        draft_dir = os.path.join(CACHE_DIR, "drafts")
+        os.makedirs(draft_dir, exist_ok=True)
+        # 返された形式のまま保存する（デコード・再エンコードしない）
+        draft_path = os.path.join(draft_dir, cache_key + image_extension(result['image'].format))
+        result['image'].save(draft_path)
+        result['path'] = draft_path
+    except Exception as e:
+        print(f"Warning: Could not save draft image: {e}")
 
+    return result
 
-def process_api_response(response) -> dict:
+
+def finalize_draft(
+    api_key: str,
+    draft_path: str,
+    resolution: str = None,
+    use_cache: bool = True
+) -> dict:
+    """
+    選んだドラフトだけを高解像度で仕上げる
+
+    ドラフトを参考画像として清書モードで生成し直すため、構図はドラフトのまま保たれる。
+
+    Args:
+        api_key: Google AI API Key
+        draft_path: generate_draft() が保存したドラフトのパス
+        resolution: 仕上げの解像度（Noneの場合は GENERATION_RESOLUTIONS["final"]）
+        use_cache: Falseの場合はキャッシュを使わずに必ずAPIを呼ぶ
+
+    Returns:
+        generate_image_with_api() と同じ形式の辞書
+    """
+    resolution = resolution or GENERATION_RESOLUTIONS["final"]
+    return generate_image_with_api(
+        api_key, "", [], resolution, ref_image_path=draft_path, use_cache=use_cache
+    )
+
+
+async def generate_images_async(api_key: str, jobs: list, max_concurrency: int = 4):
+    """
+    複数の画像生成を並行して実行し、完了した順に結果を返す
+
+    非同期クライアントの接続はイベントループをまたいで使えないため、
+    呼び出しごとに1つのクライアントを作成し、ジョブ間で接続を共有する。
+
+    Args:
+        api_key: Google AI API Key
+        jobs: ジョブのリスト。各ジョブは generate_image_with_api() と同じ引数の辞書:
+            {
+                'yaml_prompt': str,
+                'char_image_paths': list,   # 省略可
+                'resolution': str,          # 省略可（既定は "2K"）
+                'ref_image_path': str,      # 省略可
+                'use_cache': bool           # 省略可（既定は True）
+            }
+        max_concurrency: 同時に実行するリクエストの最大数
+
+    Yields:
+        (ジョブの番号, 結果の辞書)。結果は process_api_response() と同じ形式
+    """
+    client = _create_client(api_key)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def run(index: int, job: dict):
+        async with semaphore:
+            _telemetry.count("calls")
+            try:
+                # キャッシュと参照画像の読み込みはイベントループを止めないようにスレッドで行う
+                cache_key = await asyncio.to_thread(
+                    _cache_key,
+                    job.get('yaml_prompt', ""),
+                    job.get('char_image_paths') or [],
+                    job.get('resolution', "2K"),
+                    job.get('ref_image_path')
+                )
+                if job.get('use_cache', True):
+                    cached = await asyncio.to_thread(_cached_result, cache_key)
+                    if cached is not None:
+                        _telemetry.count("cache_hits")
+                        return index, cached
+
+                with _telemetry.phase("image_loading"):
+                    contents = await asyncio.to_thread(
+                        _build_contents,
+                        job.get('yaml_prompt', ""),
+                        job.get('char_image_paths') or [],
+                        job.get('ref_image_path')
+                    )
+                config = _build_config(job.get('resolution', "2K"))
+                start = time.perf_counter()
+                try:
+                    response = await _request_guard.call_async(
+                        lambda: client.aio.models.generate_content(
+                            model=IMAGE_MODEL,
+                            contents=contents,
+                            config=config
+                        )
+                    )
+                finally:
+                    elapsed = time.perf_counter() - start
+                    _telemetry.observe("api_call", elapsed)
+                _log_request(contents, elapsed)
+                with _telemetry.phase("response_parsing"):
+                    result = process_api_response(response, cache_key)
+            except Exception as e:
+                result = {
+                    'success': False,
+                    'image': None,
+                    'error': str(e)
+                }
+        if not result['success']:
+            _telemetry.count("errors")
+        return index, result
+
+    tasks = [asyncio.ensure_future(run(index, job)) for index, job in enumerate(jobs)]
+    try:
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        # 途中で打ち切られた場合は残りのジョブを取り消す
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await client.aio.aclose()
+        client.close()
+
+
+def process_api_response(response, cache_key: str = None) -> dict:
     """
     APIレスポンスを処理して画像を抽出
 
+    Args:
+        response: Gemini APIレスポンス
+        cache_key: 指定した場合、取り出した画像をこのキーでレスポンスキャッシュに保存する
+
+    Returns:
+        結果を含む辞書:
+        {
+            'success': bool,
+            'image': GeneratedImage or None,   # 遅延デコードされる画像
+            'error': str or None
+        }
+    """
+    extracted = extract_image_data(response)
+    if not extracted['success']:
+        return {
+            'success': False,
+            'image': None,
+            'error': extracted['error']
+        }
+    result = _image_result(extracted['data'], extracted['mime_type'])
+    if cache_key and result['success']:
+        get_response_cache().put(cache_key, extracted['data'], extracted['mime_type'])
+    return result
+
+
+def process_candidates_response(response, text_positions: list = None) -> dict:
+    """
+    APIレスポンスのすべての候補から画像を取り出し、並行してデコード・評価して順位付け
+
+    Args:
+        response: Gemini APIレスポンス
+        text_positions: テキストを置く予定の配置プリセットのリスト（Noneの場合は空き具合を評価しない）
+
+    Returns:
+        generate_candidates() と同じ形式の辞書
+    """
+    extracted = extract_candidate_images(response)
+    if not extracted['success']:
+        return {
+            'success': False,
+            'image': None,
+            'error': extracted['error'],
+            'candidates': []
+        }
+
+    # ヘッダーを確認できない（壊れた）候補は除く
+    images = []
+    errors = []
+    for image_data, mime_type in extracted['images']:
+        result = _image_result(image_data, mime_type)
+        if result['success']:
+            images.append(result['image'])
+        else:
+            errors.append(result['error'])
+    _telemetry.count("candidates_received", len(images))
+    if not images:
+        return {
+            'success': False,
+            'image': None,
+            'error': errors[0],
+            'candidates': []
+        }
+
+    try:
+        with _telemetry.phase("candidate_ranking"):
+            scores = rank_candidates(images, text_positions)
+    except Exception as e:
+        return {
+            'success': False,
+            'image': None,
+            'error': f"レスポンス処理エラー: {e}",
+            'candidates': []
+        }
+
+    candidates = [{'image': images[score.index], 'score': score} for score in scores]
+    return {
+        'success': True,
+        'image': candidates[0]['image'],
+        'error': None,
+        'candidates': candidates
+    }
+
+
+def _image_result(image_data: bytes, mime_type: str = None) -> dict:
+    """
+    画像のバイト列から process_api_response() と同じ形式の結果を作る
+
+    ピクセルはデコードせず、ヘッダーだけを確認する（デコードは最初のピクセルアクセス時）。
+    """
+    try:
+        image = GeneratedImage(image_data, mime_type)
+        return {
+            'success': True,
+            'image': image,
+            'error': None
+        }
+    except Exception as e:
+        return {
+            'success': False,
+            'image': None,
+            'error': f"レスポンス処理エラー: {e}"
+        }
+
+
+def extract_image_data(response) -> dict:
+    """
+    APIレスポンスから画像のバイト列を取り出す（デコードはしない）
+
     Args:
         response: Gemini APIレスポンス
 
@@ -125,7 +744,8 @@ def process_api_response(response) -> dict:
         結果を含む辞書:
         {
             'success': bool,
-            'image': PIL.Image or None,
+            'data': bytes or None,       # 画像のバイト列
+            'mime_type': str or None,    # 画像のMIMEタイプ
             'error': str or None
         }
     """
@@ -134,7 +754,8 @@ def process_api_response(response) -> dict:
         if response is None:
             return {
                 'success': False,
-                'image': None,
+                'data': None,
+                'mime_type': None,
                 'error': "APIからレスポンスがありませんでした。"
             }
 
@@ -142,7 +763,8 @@ def process_api_response(response) -> dict:
         if not hasattr(response, 'candidates') or response.candidates is None:
             return {
                 'success': False,
-                'image': None,
+                'data': None,
+                'mime_type': None,
                 'error': "APIレスポンスに候補データがありません。"
             }
 
@@ -155,7 +777,8 @@ def process_api_response(response) -> dict:
                     block_reason = f" (理由: {feedback.block_reason})"
             return {
                 'success': False,
-                'image': None,
+                'data': None,
+                'mime_type': None,
                 'error': f"APIから候補が返されませんでした。コンテンツがブロックされた可能性があります。{block_reason}"
             }
 
@@ -167,13 +790,15 @@ def process_api_response(response) -> dict:
             if 'SAFETY' in finish_reason.upper():
                 return {
                     'success': False,
-                    'image': None,
+                    'data': None,
+                    'mime_type': None,
                     'error': f"安全性フィルターによりコンテンツがブロックされました。プロンプトや参照画像を変更してお試しください。"
                 }
             elif 'RECITATION' in finish_reason.upper():
                 return {
                     'success': False,
-                    'image': None,
+                    'data': None,
+                    'mime_type': None,
                     'error': "著作権関連の問題でコンテンツがブロックされました。"
                 }
 
@@ -181,7 +806,8 @@ def process_api_response(response) -> dict:
         if not hasattr(candidate, 'content') or candidate.content is None:
             return {
                 'success': False,
-                'image': None,
+                'data': None,
+                'mime_type': None,
                 'error': "APIレスポンスにコンテンツがありません。生成に失敗した可能性があります。"
             }
 
@@ -189,34 +815,37 @@ def process_api_response(response) -> dict:
         if not hasattr(candidate.content, 'parts') or candidate.content.parts is None:
             return {
                 'success': False,
-                'image': None,
+                'data': None,
+                'mime_type': None,
                 'error': "APIレスポンスにパーツデータがありません。画像生成に失敗した可能性があります。"
             }
 
         if len(candidate.content.parts) == 0:
             return {
                 'success': False,
-                'image': None,
+                'data': None,
+                'mime_type': None,
                 'error': "APIレスポンスのパーツが空です。"
             }
 
         # 画像データを探す
         generated_img_data = None
+        generated_mime_type = None
         text_response = ""
 
         for part in candidate.content.parts:
             if hasattr(part, 'inline_data') and part.inline_data:
                 generated_img_data = part.inline_data.data
+                generated_mime_type = part.inline_data.mime_type
                 break
             elif hasattr(part, 'text') and part.text:
                 text_response = part.text
 
         if generated_img_data:
-            image_bytes = io.BytesIO(generated_img_data)
-            image = Image.open(image_bytes)
             return {
                 'success': True,
-                'image': image,
+                'data': generated_img_data,
+                'mime_type': generated_mime_type or "image/png",
                 'error': None
             }
         else:
@@ -228,24 +857,71 @@ def process_api_response(response) -> dict:
                 error_msg += f"\n\nAPIからのメッセージ:\n{preview}"
             return {
                 'success': False,
-                'image': None,
+                'data': None,
+                'mime_type': None,
                 'error': error_msg
             }
 
     except AttributeError as e:
         return {
             'success': False,
-            'image': None,
+            'data': None,
+            'mime_type': None,
             'error': f"レスポンス構造エラー: APIレスポンスの形式が想定と異なります。({e})"
         }
     except Exception as e:
         return {
             'success': False,
-            'image': None,
+            'data': None,
+            'mime_type': None,
             'error': f"レスポンス処理エラー: {e}"
         }
 
 
+def extract_candidate_images(response) -> dict:
+    """
+    APIレスポンスのすべての候補・すべてのパーツから画像のバイト列を取り出す（デコードはしない）
+
+    Args:
+        response: Gemini APIレスポンス
+
+    Returns:
+        結果を含む辞書:
+        {
+            'success': bool,
+            'images': [(bytes, mime_type), ...],   # レスポンス内の順番
+            'error': str or None
+        }
+    """
+    images = []
+    try:
+        for candidate in (getattr(response, 'candidates', None) or []):
+            content = getattr(candidate, 'content', None)
+            for part in (getattr(content, 'parts', None) or []):
+                inline_data = getattr(part, 'inline_data', None)
+                if inline_data and inline_data.data:
+                    images.append((inline_data.data, inline_data.mime_type or "image/png"))
+    except Exception as e:
+        return {
+            'success': False,
+            'images': [],
+            'error': f"レスポンス処理エラー: {e}"
+        }
+
+    if not images:
+        # 画像が1枚もない場合は、先頭の候補について理由を調べる
+        return {
+            'success': False,
+            'images': [],
+            'error': extract_image_data(response)['error'] or "APIから画像データが返されませんでした。"
+        }
+    return {
+        'success': True,
+        'images': images,
+        'error': None
+    }
+
+
 def validate_api_key(api_key: str) -> bool:
     """
     API Keyの基本的な検証
@@ -0,0 +1,239 @@
+# -*- coding: utf-8 -*-
+"""
+背景画像キャッシュ
+デコード・リサイズ済みの背景画像をメモリ上限付きで保持する
+"""
+
+import itertools
+import os
+import threading
+import weakref
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+from PIL import Image
+
+from .image_loader import load_image
+
+
+# キャッシュに保持する背景画像の合計バイト数の上限
+BACKGROUND_CACHE_BYTES = 256 * 1024 * 1024
+
+
+def fit_background(bg_image: Image.Image, size: Tuple[int, int], fit_mode: str = "cover") -> Image.Image:
+    """
+    背景画像をキャンバスサイズに合わせる
+
+    Args:
+        bg_image: RGBAの背景画像
+        size: キャンバスサイズ (width, height)
+        fit_mode: フィットモード ("cover", "contain", "stretch")
+
+    Returns:
+        PIL.Image: フィット後の画像（"contain"の場合はキャンバスより小さいことがある）
+    """
+    width, height = size
+
+    if fit_mode == "cover":
+        # アスペクト比を維持しつつ、キャンバスを完全に覆う
+        bg_ratio = bg_image.width / bg_image.height
+        canvas_ratio = width / height
+
+        if bg_ratio > canvas_ratio:
+            new_height = height
+            new_width = int(new_height * bg_ratio)
+        else:
+            new_width = width
+            new_height = int(new_width / bg_ratio)
+
+        bg_image = bg_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
+
+        # 中央でクロップ
+        left = (new_width - width) // 2
+        top = (new_height - height) // 2
+        bg_image = bg_image.crop((left, top, left + width, top + height))
+
+    elif fit_mode == "contain":
+        # アスペクト比を維持しつつ、キャンバス内に収める
+        bg_image = bg_image.copy()
+        bg_image.thumbnail((width, height), Image.Resampling.LANCZOS)
+
+    elif fit_mode == "stretch":
+        bg_image = bg_image.resize((width, height), Image.Resampling.LANCZOS)
+
+    return bg_image
+
+
+def _image_bytes(image: Image.Image) -> int:
+    """画像が占めるおおよそのバイト数"""
+    return image.width * image.height * len(image.getbands())
+
+
+class BackgroundCache:
+    """フィット済み背景画像のLRUキャッシュ（バイト数で上限管理）"""
+
+    def __init__(self, max_bytes: int = BACKGROUND_CACHE_BYTES):
+        """
+        Args:
+            max_bytes: 保持する画像の合計バイト数の上限
+        """
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[tuple, Image.Image]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[Image.Image]:
+        """キャッシュから画像を取得（なければNone）"""
+        with self._lock:
+            image = self._entries.get(key)
+            if image is not None:
+                self._entries.move_to_end(key)
+            return image
+
+    def put(self, key: tuple, image: Image.Image):
+        """画像をキャッシュに追加し、上限を超えた分を古い順に破棄"""
+        size = _image_bytes(image)
+        if size > self.max_bytes:
+            # 上限より大きい画像はキャッシュしない
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= _image_bytes(self._entries.pop(key))
+            self._entries[key] = image
+            self.current_bytes += size
+            while self.current_bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.current_bytes -= _image_bytes(evicted)
+
+    def clear(self):
+        """キャッシュをクリア"""
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+
+# プロセス共通のキャッシュ
+_background_cache = BackgroundCache()
+
+
+def file_background_key(image_path: str, size: Tuple[int, int], fit_mode: str = "cover") -> tuple:
+    """ファイル背景のキャッシュキー (パス, 更新日時, サイズ, フィットモード)"""
+    stat = os.stat(image_path)
+    return ("file", os.path.abspath(image_path), stat.st_mtime_ns, tuple(size), fit_mode)
+
+
+# PIL画像オブジェクトごとの識別番号（id() は解放後に再利用されるため、弱参照で同じオブジェクトか確かめる）
+_image_tokens: Dict[int, tuple] = {}
+_image_token_counter = itertools.count(1)
+_image_tokens_lock = threading.Lock()
+
+
+def image_token(image) -> int:
+    """画像オブジェクトの識別番号（同じオブジェクトが生きている間は同じ値）"""
+    object_id = id(image)
+    with _image_tokens_lock:
+        entry = _image_tokens.get(object_id)
+        if entry is not None and entry[0]() is image:
+            return entry[1]
+        token = next(_image_token_counter)
+
+        def forget(ref, object_id=object_id, token=token):
+            with _image_tokens_lock:
+                if _image_tokens.get(object_id, (None, None))[1] == token:
+                    del _image_tokens[object_id]
+
+        _image_tokens[object_id] = (weakref.ref(image, forget), token)
+        return token
+
+
+def pil_background_key(
+    pil_image: Image.Image,
+    size: Tuple[int, int],
+    fit_mode: str = "cover",
+    source_key: Optional[Hashable] = None
+) -> tuple:
+    """
+    PIL画像背景のキャッシュキー
+
+    ピクセルは読まずに画像オブジェクトの同一性で識別する（同じオブジェクトなら内容も同じとみなす）。
+    同じオブジェクトを書き換えて使う場合や、別のオブジェクトでも同じ内容と分かっている場合は source_key を渡す。
+
+    Args:
+        pil_image: PIL画像オブジェクト
+        size: キャンバスサイズ (width, height)
+        fit_mode: フィットモード
+        source_key: 呼び出し側で決めた画像の内容のキー（Noneの場合はオブジェクトの同一性）
+    """
+    if source_key is not None:
+        return ("pil", "key", source_key, tuple(size), fit_mode)
+    return ("pil", image_token(pil_image), pil_image.mode, pil_image.size, tuple(size), fit_mode)
+
+
+def get_fitted_background(
+    image_path: str,
+    size: Tuple[int, int],
+    fit_mode: str = "cover",
+    key: Optional[tuple] = None
+) -> Image.Image:
+    """
+    ファイルから背景画像を読み込み、キャンバスサイズに合わせて取得
+
+    (パス, 更新日時, サイズ, フィットモード) が同じ場合はキャッシュを返す。
+    返される画像は共有されるため、変更しないこと。
+
+    Args:
+        image_path: 背景画像のパス
+        size: キャンバスサイズ (width, height)
+        fit_mode: フィットモード
+        key: 計算済みのキャッシュキー（Noneの場合は file_background_key で計算）
+
+    Returns:
+        PIL.Image: フィット済みの背景画像
+    """
+    if key is None:
+        key = file_background_key(image_path, size, fit_mode)
+
+    bg_image = _background_cache.get(key)
+    if bg_image is None:
+        # 大きな画像は目標サイズ近くまで縮小デコードしてから仕上げる
+        source = load_image(image_path, tuple(size), fit_mode)
+        bg_image = fit_background(source, size, fit_mode)
+        _background_cache.put(key, bg_image)
+    return bg_image
+
+
+def get_fitted_background_from_pil(
+    pil_image: Image.Image,
+    size: Tuple[int, int],
+    fit_mode: str = "cover",
+    key: Optional[tuple] = None
+) -> Image.Image:
+    """
+    PIL画像をキャンバスサイズに合わせて取得
+
+    同じ画像オブジェクト（または同じ key）の場合はキャッシュを返す。
+    返される画像は共有されるため、変更しないこと。
+
+    Args:
+        pil_image: PIL画像オブジェクト
+        size: キャンバスサイズ (width, height)
+        fit_mode: フィットモード
+        key: 計算済みのキャッシュキー（Noneの場合は pil_background_key で計算）
+
+    Returns:
+        PIL.Image: フィット済みの背景画像
+    """
+    if key is None:
+        key = pil_background_key(pil_image, size, fit_mode)
+
+    bg_image = _background_cache.get(key)
+    if bg_image is None:
+        bg_image = fit_background(pil_image.convert("RGBA"), size, fit_mode)
+        _background_cache.put(key, bg_image)
+    return bg_image
+
+
+def clear_background_cache():
+    """背景画像のキャッシュをクリア"""
+    _background_cache.clear()
@@ -0,0 +1,380 @@
+# -*- coding: utf-8 -*-
+"""
+バッチ描画ロジック
+マニフェストファイル（YAML/CSV）に記述されたサムネイルをまとめて描画する
+GUI（customtkinter）には依存しない
+"""
+
+import copy
+import csv
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT, PATHS
+from .file_manager import iter_yaml_documents
+from .image_composer import ImageComposer
+from .template_manager import TemplateManager, ThumbnailTemplate
+from .yaml_cache import load_yaml
+
+
+# ワーカープロセスごとのテンプレートマネージャー
+_template_manager: Optional[TemplateManager] = None
+
+# プロンプトのドキュメントに書かれていれば描画項目としてそのまま使うキー
+# （characters はプロンプトではキャラクターの説明のため使わない）
+_PROMPT_ITEM_KEYS = ("template", "background", "output", "format")
+
+
+def load_manifest(manifest_path: str) -> List[dict]:
+    """
+    マニフェストファイルを読み込む
+
+    YAMLは項目のリスト、または {"defaults": {...}, "items": [...]} の形式。
+    CSVは1行1項目で、列は template, output, format, background, characters（";"区切り）、
+    テキストは "text.<テキスト要素ID>" の列で指定する。
+
+    各項目の形式:
+        {
+            'template': str,         # テンプレートID
+            'texts': dict,           # テキスト要素ID -> テキスト
+            'background': str,       # 背景画像のパス（省略可）
+            'characters': list,      # キャラクター画像のパス（スロット順、省略可）
+            'output': str,           # 出力ファイルのパス（省略可）
+            'format': str,           # "PNG" または "JPEG"（省略可）
+        }
+
+    Args:
+        manifest_path: マニフェストファイルのパス
+
+    Returns:
+        項目のリスト（相対パスはマニフェストのディレクトリ基準で解決済み）
+    """
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+
+    if manifest_path.lower().endswith(".csv"):
+        items = _load_csv_manifest(manifest_path)
+    else:
+        data = copy.deepcopy(load_yaml(manifest_path)) or []
+        if isinstance(data, dict):
+            defaults = data.get("defaults", {})
+            items = [{**defaults, **item} for item in data.get("items", [])]
+        else:
+            items = list(data)
+
+    return [_normalize_item(item, base_dir) for item in items]
+
+
+def iter_prompt_items(prompt_path: str, template: str = "new_song") -> Iterator[Tuple[int, dict]]:
+    """
+    複数ドキュメント（--- 区切り）のYAMLプロンプトを1件ずつ描画項目に変換
+
+    ドキュメントは iter_yaml_documents() で必要な分だけ解析するため、ファイル全体の解析を待たずに先頭から描画できる。
+    タイトル・作者はテンプレートの "title"・"artist" 要素に入れ、ドキュメントに texts があればそちらを優先する。
+
+    Args:
+        prompt_path: YAMLプロンプトファイルのパス
+        template: ドキュメントに template がない場合のテンプレートID
+
+    Yields:
+        (ドキュメントの番号, load_manifest() と同じ形式の項目)
+    """
+    base_dir = os.path.dirname(os.path.abspath(prompt_path))
+    for index, data, ui_data in iter_yaml_documents(prompt_path):
+        item = {"template": template}
+        item.update((key, data[key]) for key in _PROMPT_ITEM_KEYS if key in data)
+        texts = {"title": ui_data["title"], "artist": ui_data["author"]}
+        item["texts"] = {**{k: v for k, v in texts.items() if v}, **(data.get("texts") or {})}
+        yield index, _normalize_item(item, base_dir)
+
+
+def _load_csv_manifest(manifest_path: str) -> List[dict]:
+    """CSV形式のマニフェストを読み込む"""
+    items = []
+    with open(manifest_path, "r", encoding="utf-8-sig", newline="") as f:
+        for row in csv.DictReader(f):
+            item = {"texts": {}}
+            for column, value in row.items():
+                if column is None or value is None or value == "":
+                    continue
+                if column.startswith("text."):
+                    item["texts"][column[len("text."):]] = value
+                elif column == "characters":
+                    item["characters"] = [p.strip() for p in value.split(";") if p.strip()]
+                else:
+                    item[column] = value
+            items.append(item)
+    return items
+
+
+def _normalize_item(item: dict, base_dir: str) -> dict:
+    """項目の既定値を補い、相対パスを解決"""
+    def resolve(path):
+        if not path:
+            return None
+        path = os.path.expanduser(path)
+        return path if os.path.isabs(path) else os.path.join(base_dir, path)
+
+    return {
+        "template": item.get("template", "new_song"),
+        "texts": dict(item.get("texts") or {}),
+        "background": resolve(item.get("background")),
+        "characters": [resolve(p) for p in item.get("characters") or []],
+        "output": resolve(item.get("output")),
+        "format": str(item.get("format", "PNG")).upper(),
+    }
+
+
+def compose_from_template(
+    template: ThumbnailTemplate,
+    texts: Dict[str, str] = None,
+    background: str = None,
+    characters: List[str] = None,
+    width: int = THUMBNAIL_WIDTH,
+    height: int = THUMBNAIL_HEIGHT
+) -> ImageComposer:
+    """
+    テンプレートに従ってサムネイルを合成
+
+    Args:
+        template: サムネイルテンプレート
+        texts: テキスト要素ID -> テキスト（未指定の要素はデフォルトテキスト）
+        background: 背景画像のパス（Noneの場合はテンプレートの背景色）
+        characters: キャラクター画像のパス（キャラクタースロット順）
+        width: 出力画像の幅
+        height: 出力画像の高さ
+
+    Returns:
+        ImageComposer: 合成済みのコンポーザー
+
+    Raises:
+        ValueError: 背景画像またはキャラクター画像を読み込めなかった場合
+    """
+    texts = texts or {}
+    characters = characters or []
+    composer = ImageComposer(width, height)
+
+    # 背景を設定
+    composer.create_canvas(template.background_color)
+    if background and not composer.set_background_image(background):
+        raise ValueError(f"背景画像を読み込めません: {background}")
+
+    if template.background_gradient:
+        gradient = template.background_gradient
+        composer.add_gradient_overlay(
+            direction=gradient.get("direction", "bottom"),
+            color=gradient.get("color", "#000000"),
+            opacity=gradient.get("opacity", 0.5)
+        )
+
+    # キャラクターをスロットに配置
+    for slot, char_path in zip(template.character_slots, characters):
+        if char_path and not composer.add_character(
+            char_path,
+            position=tuple(slot.position),
+            size=tuple(slot.size),
+            anchor=slot.anchor,
+            node_id=slot.id
+        ):
+            raise ValueError(f"キャラクター画像を読み込めません: {char_path}")
+
+    # ラベル
+    for label in template.labels:
+        composer.add_label(
+            text=label.get("text", ""),
+            position=tuple(label.get("position", (50, 50))),
+            bg_color=label.get("bg_color", "#FF0000"),
+            text_color=label.get("text_color", "#FFFFFF"),
+            font_size=label.get("font_size", 24)
+        )
+
+    # テキスト要素
+    for element in template.text_elements:
+        text = texts.get(element.id, element.default_text)
+        if not text:
+            continue
+        composer.add_text(
+            text=text,
+            position=tuple(element.position),
+            font_size=element.font_size,
+            font_color=element.font_color,
+            anchor=element.anchor,
+            stroke_width=element.stroke_width,
+            stroke_color=element.stroke_color,
+            shadow=element.shadow,
+            node_id=element.id
+        )
+
+    return composer
+
+
+def _default_output_path(item: dict, index: int, output_dir: str) -> str:
+    """出力パスが指定されていない項目の出力パス"""
+    extension = ".jpg" if item["format"] == "JPEG" else ".png"
+    return os.path.join(output_dir, f"{index:03d}_{item['template']}{extension}")
+
+
+def render_item(index: int, item: dict, output_dir: str, templates_dir: str) -> dict:
+    """
+    マニフェストの1項目を描画して保存（ワーカープロセスで実行される）
+
+    Args:
+        index: 項目の番号
+        item: load_manifest() で正規化された項目
+        output_dir: 出力パスが指定されていない場合の出力ディレクトリ
+        templates_dir: カスタムテンプレートのディレクトリ
+
+    Returns:
+        {
+            'index': int,
+            'output': str or None,
+            'success': bool,
+            'error': str or None,
+            'seconds': float      # 描画と保存にかかった時間
+        }
+    """
+    global _template_manager
+
+    start = time.perf_counter()
+    result = {"index": index, "output": None, "success": False, "error": None, "seconds": 0.0}
+
+    try:
+        if _template_manager is None or _template_manager.templates_dir != templates_dir:
+            _template_manager = TemplateManager(templates_dir)
+
+        template = _template_manager.get_template(item["template"])
+        if template is None:
+            result["error"] = f"テンプレートが見つかりません: {item['template']}"
+            return result
+
+        composer = compose_from_template(
+            template, item["texts"], item["background"], item["characters"]
+        )
+
+        output_path = item["output"] or _default_output_path(item, index, output_dir)
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+
+        result["output"] = output_path
+        result["success"] = composer.save(output_path, item["format"])
+        if not result["success"]:
+            result["error"] = "画像の保存に失敗しました。"
+
+    except Exception as e:
+        result["error"] = str(e)
+
+    finally:
+        result["seconds"] = time.perf_counter() - start
+
+    return result
+
+
+def render_manifest(
+    manifest_path: str,
+    output_dir: str = None,
+    templates_dir: str = None,
+    workers: int = None
+) -> List[dict]:
+    """
+    マニフェストの全項目をプロセスプールで描画
+
+    項目ごとの所要時間と全体のスループットを標準出力に表示する。
+
+    Args:
+        manifest_path: マニフェストファイルのパス
+        output_dir: 出力パスが指定されていない項目の出力ディレクトリ
+        templates_dir: カスタムテンプレートのディレクトリ
+        workers: ワーカープロセス数（Noneの場合はCPU数）
+
+    Returns:
+        render_item() の結果のリスト（項目順）
+    """
+    items = load_manifest(manifest_path)
+    print(f"{len(items)}件を描画します: {manifest_path}")
+    return _render_items(enumerate(items), output_dir, templates_dir, workers)
+
+
+def render_prompt_documents(
+    prompt_path: str,
+    template: str = "new_song",
+    output_dir: str = None,
+    templates_dir: str = None,
+    workers: int = None
+) -> List[dict]:
+    """
+    複数ドキュメントのYAMLプロンプトを1件ずつ解析しながらプロセスプールで描画
+
+    解析できたドキュメントから順にワーカーに渡すため、ファイルの残りを解析している間に描画が進む。
+
+    Args:
+        prompt_path: YAMLプロンプトファイルのパス
+        template: ドキュメントに template がない場合のテンプレートID
+        output_dir: 出力パスが指定されていない項目の出力ディレクトリ
+        templates_dir: カスタムテンプレートのディレクトリ
+        workers: ワーカープロセス数（Noneの場合はCPU数）
+
+    Returns:
+        render_item() の結果のリスト（ドキュメント順）
+    """
+    print(f"ドキュメントを順に描画します: {prompt_path}")
+    return _render_items(iter_prompt_items(prompt_path, template), output_dir, templates_dir, workers)
+
+
+def _render_items(
+    items: Iterable[Tuple[int, dict]],
+    output_dir: str = None,
+    templates_dir: str = None,
+    workers: int = None
+) -> List[dict]:
+    """
+    項目をプロセスプールで描画（項目は取り出した順にワーカーに渡す）
+
+    Args:
+        items: (番号, 項目) のイテラブル
+        output_dir: 出力パスが指定されていない項目の出力ディレクトリ
+        templates_dir: カスタムテンプレートのディレクトリ
+        workers: ワーカープロセス数（Noneの場合はCPU数）
+
+    Returns:
+        render_item() の結果のリスト（番号順）。項目の読み込みが途中で失敗した場合は失敗の結果を1件含む
+    """
+    output_dir = output_dir or PATHS["output"]
+    templates_dir = templates_dir or PATHS["templates"]
+
+    start = time.perf_counter()
+    results = []
+    futures = []
+    next_index = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        try:
+            for index, item in items:
+                futures.append(executor.submit(render_item, index, item, output_dir, templates_dir))
+                next_index = index + 1
+        except Exception as e:
+            # 読み込めた項目の描画は続ける
+            print(f"項目の読み込みを中断しました: {e}")
+            results.append({
+                "index": next_index, "output": None, "success": False,
+                "error": f"読み込みエラー: {e}", "seconds": 0.0
+            })
+
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            status = "OK " if result["success"] else "NG "
+            detail = result["output"] if result["success"] else result["error"]
+            print(f"  [{status}] #{result['index']:03d} {result['seconds'] * 1000:8.1f} ms  {detail}")
+
+    elapsed = time.perf_counter() - start
+    succeeded = sum(1 for r in results if r["success"])
+    throughput = len(results) / elapsed if elapsed > 0 else 0.0
+    print(
+        f"完了: {succeeded}/{len(results)}件成功  "
+        f"合計 {elapsed:.2f} 秒  スループット {throughput:.2f} 枚/秒"
+    )
+
+    return sorted(results, key=lambda r: r["index"])
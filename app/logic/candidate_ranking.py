@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+"""
+生成候補の評価
+1回のAPI呼び出しで返された複数の背景画像候補を、縮小したグレースケール画像上の
+軽い指標（シャープネス・テキスト安全領域のコントラスト・テキスト配置位置の空き具合）で順位付けする
+"""
+
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from PIL import Image, ImageFilter, ImageStat
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import CANDIDATE_SETTINGS, THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT
+from .background_cache import fit_background
+
+
+# ラプラシアン（輪郭の強さ。分散が大きいほどシャープ）
+_LAPLACIAN = ImageFilter.Kernel((3, 3), [0, 1, 0, 1, -4, 1, 0, 1, 0], scale=1, offset=128)
+
+# 指標名（CANDIDATE_SETTINGS["weights"] のキー）
+METRICS = ("sharpness", "contrast", "free_space")
+
+
+@dataclass
+class CandidateScore:
+    """候補の評価結果"""
+    index: int                # レスポンス内の候補の順番
+    sharpness: float          # ラプラシアンの分散
+    contrast: float           # テキスト安全領域の輝度の標準偏差（0〜1）
+    free_space: Optional[float]  # テキスト配置位置の平坦さ（0〜1。配置位置の指定がなければNone）
+    score: float = 0.0        # 候補間で正規化した指標の重み付き和（rank_scores() が設定）
+
+
+def _text_boxes(position: dict, scale: float) -> List[Tuple[int, int, int, int]]:
+    """
+    テキスト配置プリセットからタイトル・アーティスト名の領域を求める
+
+    Args:
+        position: {"title": (x, y), "artist": (x, y), "anchor": "left"/"center"/"right"}
+                  （サムネイル座標。main_window の TEXT_POSITIONS と同じ形式）
+        scale: 評価画像のサムネイルに対する倍率
+    """
+    box_width, box_height = CANDIDATE_SETTINGS["text_box"]
+    anchor = position.get("anchor", "left")
+    boxes = []
+    for key in ("title", "artist"):
+        if key not in position:
+            continue
+        x, y = position[key]
+        # ImageComposer.add_text() と同じアンカーの解釈
+        if "center" in anchor:
+            x -= box_width // 2
+        elif "right" in anchor:
+            x -= box_width
+        if anchor == "center":
+            y -= box_height // 2
+        boxes.append((
+            int(max(0, x) * scale), int(max(0, y) * scale),
+            int(min(THUMBNAIL_WIDTH, x + box_width) * scale),
+            int(min(THUMBNAIL_HEIGHT, y + box_height) * scale)
+        ))
+    return boxes
+
+
+def _sample(image: Image.Image) -> Image.Image:
+    """評価用に、サムネイルと同じ構図（cover）の縮小グレースケール画像を作る"""
+    width = CANDIDATE_SETTINGS["sample_width"]
+    height = width * THUMBNAIL_HEIGHT // THUMBNAIL_WIDTH
+    gray = image.convert("L")
+    factor = min(gray.width // width, gray.height // height)
+    if factor > 1:
+        gray = gray.reduce(factor)
+    return fit_background(gray, (width, height), "cover")
+
+
+def score_image(image: Image.Image, text_positions: Iterable[dict] = None, index: int = 0) -> CandidateScore:
+    """
+    候補画像を評価
+
+    Args:
+        image: 候補画像（GeneratedImage の場合はここでデコードされる）
+        text_positions: テキストを置く予定の配置プリセットのリスト（Noneの場合は空き具合を評価しない）
+        index: レスポンス内の候補の順番
+
+    Returns:
+        CandidateScore: 評価結果（score は未設定）
+    """
+    sample = _sample(image)
+    scale = sample.width / THUMBNAIL_WIDTH
+
+    # フィルターは外周1ピクセルを元の値のまま残すため除いて集計する
+    laplacian = sample.filter(_LAPLACIAN).crop((1, 1, sample.width - 1, sample.height - 1))
+    sharpness = ImageStat.Stat(laplacian).var[0]
+
+    margin_x = int(sample.width * CANDIDATE_SETTINGS["safe_margin"])
+    margin_y = int(sample.height * CANDIDATE_SETTINGS["safe_margin"])
+    safe = sample.crop((margin_x, margin_y, sample.width - margin_x, sample.height - margin_y))
+    contrast = ImageStat.Stat(safe).stddev[0] / 127.5
+
+    free_space = None
+    if text_positions is not None:
+        flatness = []
+        for position in text_positions:
+            for box in _text_boxes(position, scale):
+                if box[2] > box[0] and box[3] > box[1]:
+                    flatness.append(1.0 - ImageStat.Stat(sample.crop(box)).stddev[0] / 127.5)
+        if flatness:
+            free_space = sum(flatness) / len(flatness)
+
+    return CandidateScore(index, sharpness, contrast, free_space)
+
+
+def rank_scores(scores: List[CandidateScore], weights: Dict[str, float] = None) -> List[CandidateScore]:
+    """
+    評価結果を候補間で正規化して順位付け
+
+    指標ごとに候補間の最小〜最大を0〜1に正規化し（全候補が同じ値なら1）、重み付きで合計する。
+
+    Args:
+        scores: score_image() の結果
+        weights: 指標ごとの重み（Noneの場合は CANDIDATE_SETTINGS["weights"]）
+
+    Returns:
+        score の高い順に並べた評価結果
+    """
+    weights = weights or CANDIDATE_SETTINGS["weights"]
+    for score in scores:
+        score.score = 0.0
+
+    for metric in METRICS:
+        values = [getattr(s, metric) for s in scores if getattr(s, metric) is not None]
+        if not values:
+            continue
+        low, high = min(values), max(values)
+        for score in scores:
+            value = getattr(score, metric)
+            if value is None:
+                continue
+            normalized = (value - low) / (high - low) if high > low else 1.0
+            score.score += weights.get(metric, 0.0) * normalized
+
+    return sorted(scores, key=lambda s: s.score, reverse=True)
+
+
+def rank_candidates(
+    images: List[Image.Image],
+    text_positions: Iterable[dict] = None,
+    weights: Dict[str, float] = None,
+    max_workers: Optional[int] = None
+) -> List[CandidateScore]:
+    """
+    候補画像をスレッドプールで並行してデコード・評価し、順位付け
+
+    Args:
+        images: 候補画像のリスト
+        text_positions: テキストを置く予定の配置プリセットのリスト（Noneの場合は空き具合を評価しない）
+        weights: 指標ごとの重み（Noneの場合は CANDIDATE_SETTINGS["weights"]）
+        max_workers: スレッド数（Noneの場合は候補数とCPU数の小さい方）
+
+    Returns:
+        score の高い順に並べた評価結果（index で images の要素を指す）
+    """
+    if not images:
+        return []
+    text_positions = list(text_positions) if text_positions is not None else None
+    max_workers = max_workers or min(len(images), os.cpu_count() or 1)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        scores = list(executor.map(
+            lambda item: score_image(item[1], text_positions, item[0]), enumerate(images)
+        ))
+    return rank_scores(scores, weights)
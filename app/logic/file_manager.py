@@ -5,19 +5,37 @@ YAML読み書き、履歴管理、テンプレート読み込み、画像処理
 """
 
 import os
+import copy
 import json
-import yaml
+import tempfile
 from datetime import datetime
 from PIL import Image, ImageDraw, ImageFont
 
 import sys
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from constants import (
-    MAX_RECENT_FILES, MAX_CHARACTERS,
-    COLOR_MODES, DUOTONE_COLORS, OUTPUT_STYLES, TEXT_POSITIONS,
-    ASPECT_RATIOS, OUTFIT_DATA
-)
+import constants
+from .font_registry import get_role_font
+from .metadata_index import get_metadata_index
+from .outfit_matcher import OutfitMatcher
+from .yaml_cache import iter_yaml, load_yaml, read_yaml
+
+
+# 最近使ったファイル・YAMLからUI設定への逆変換で使う設定
+# constants にまだ定義されていないものは既定値（表は空）として扱う。
+# 表が空の場合、逆変換はその項目を既定の選択肢（フルカラー・おまかせなど）のままにする
+MAX_RECENT_FILES = getattr(constants, "MAX_RECENT_FILES", 10)
+MAX_CHARACTERS = getattr(constants, "MAX_CHARACTERS", None)  # Noneは上限なし
+COLOR_MODES = getattr(constants, "COLOR_MODES", {})
+DUOTONE_COLORS = getattr(constants, "DUOTONE_COLORS", {})
+OUTPUT_STYLES = getattr(constants, "OUTPUT_STYLES", {})
+TEXT_POSITIONS = getattr(constants, "TEXT_POSITIONS", {})
+ASPECT_RATIOS = getattr(constants, "ASPECT_RATIOS", {})
+OUTFIT_DATA = getattr(constants, "OUTFIT_DATA", {})
+
+
+# OUTFIT_DATA の全語をまとめた照合器（起動時に1回だけ作る）
+_outfit_matcher = OutfitMatcher(OUTFIT_DATA)
 
 
 def load_template(template_path: str) -> dict:
@@ -32,8 +50,7 @@ def load_template(template_path: str) -> dict:
     """
     try:
         if os.path.exists(template_path):
-            with open(template_path, 'r', encoding='utf-8') as f:
-                return yaml.safe_load(f)
+            return copy.deepcopy(load_yaml(template_path))
     except Exception as e:
         print(f"Warning: Could not load template: {e}")
     return None
@@ -125,23 +142,60 @@ _metadata:
 
         with open(filepath, 'w', encoding='utf-8') as f:
             f.write(final_content)
-        return True, None
     except Exception as e:
         return False, str(e)
 
+    # メタデータインデックスにも記録する（YAMLは保存済みのため、記録に失敗しても保存は成功とする）
+    if generated_image_path:
+        try:
+            get_metadata_index().link(filepath, generated_image_path)
+        except Exception as e:
+            print(f"Warning: Could not record metadata link for {filepath}: {e}")
+    return True, None
+
 
-def update_yaml_metadata(yaml_filepath: str, image_filepath: str) -> tuple:
+def update_yaml_metadata(yaml_filepath: str, image_filepath: str, embed: bool = False) -> tuple:
     """
-    既存のYAMLファイルにメタデータを追加/更新
+    YAMLファイルに生成画像を関連付ける
+
+    関連付けはメタデータインデックスに記録され、YAMLファイルは書き換えない。
 
     Args:
         yaml_filepath: YAMLファイルのパス
         image_filepath: 関連付ける画像ファイルのパス
+        embed: Trueの場合はYAMLファイルの _metadata ブロックにも書き出す（export_yaml_metadata()）
+
+    Returns:
+        (success: bool, error_message: str or None)
+    """
+    try:
+        get_metadata_index().link(yaml_filepath, image_filepath)
+    except Exception as e:
+        return False, str(e)
+
+    if embed:
+        return export_yaml_metadata(yaml_filepath)
+    return True, None
+
+
+def export_yaml_metadata(yaml_filepath: str) -> tuple:
+    """
+    メタデータインデックスの最新の関連付けを、YAMLファイルの _metadata ブロックとして書き出す
+
+    ファイルは一時ファイルに書いてから置き換えるため、途中で失敗しても元の内容は壊れない。
+
+    Args:
+        yaml_filepath: YAMLファイルのパス
 
     Returns:
         (success: bool, error_message: str or None)
     """
     try:
+        link = get_metadata_index().get(yaml_filepath)
+        if link is None:
+            return False, "関連付けられた画像がありません。"
+        metadata = link.to_metadata()
+
         # 既存のYAMLを読み込む
         with open(yaml_filepath, 'r', encoding='utf-8') as f:
             content = f.read()
@@ -151,20 +205,28 @@ def update_yaml_metadata(yaml_filepath: str, image_filepath: str) -> tuple:
             content = content.split("# ====================================================\n# メタデータ")[0].rstrip()
 
         # 新しいメタデータを追加
-        metadata = f"""
+        content += f"""
 
 # ====================================================
 # メタデータ (Metadata) - 自動生成
 # ====================================================
 _metadata:
-  created_at: "{datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-  generated_image: "{os.path.basename(image_filepath)}"
-  generated_image_full_path: "{image_filepath}"
+  created_at: "{metadata['created_at']}"
+  generated_image: "{metadata['generated_image']}"
+  generated_image_full_path: "{metadata['generated_image_full_path']}"
 """
-        content += metadata
 
-        with open(yaml_filepath, 'w', encoding='utf-8') as f:
-            f.write(content)
+        directory = os.path.dirname(os.path.abspath(yaml_filepath))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(content)
+            # 一時ファイルは所有者のみの権限で作られるため、元のファイルの権限に合わせる
+            os.chmod(tmp_path, os.stat(yaml_filepath).st_mode & 0o7777)
+            os.replace(tmp_path, yaml_filepath)
+        except Exception:
+            os.remove(tmp_path)
+            raise
         return True, None
     except Exception as e:
         return False, str(e)
@@ -174,6 +236,8 @@ def extract_metadata_from_yaml(filepath: str) -> dict:
     """
     YAMLファイルからメタデータを抽出
 
+    メタデータインデックスの記録を優先し、なければYAMLファイルの _metadata ブロックを読む。
+
     Args:
         filepath: YAMLファイルのパス
 
@@ -181,13 +245,30 @@ def extract_metadata_from_yaml(filepath: str) -> dict:
         メタデータの辞書（存在しない場合は空辞書）
     """
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
+        link = get_metadata_index().get(filepath)
+        if link is not None:
+            return link.to_metadata()
+    except Exception as e:
+        print(f"Warning: Could not read metadata index: {e}")
+
+    return extract_embedded_metadata(filepath)
+
+
+def extract_embedded_metadata(filepath: str) -> dict:
+    """
+    YAMLファイルに埋め込まれた _metadata ブロックを読む（メタデータインデックスは見ない）
 
-        # YAMLを解析
-        data = yaml.safe_load(content)
+    Args:
+        filepath: YAMLファイルのパス
+
+    Returns:
+        メタデータの辞書（存在しない場合は空辞書）
+    """
+    try:
+        # YAMLを解析（load_yaml_file() とキャッシュを共有し、変更のないファイルは解析しない）
+        _, data = read_yaml(filepath, _skip_instruction_header)
         if data and '_metadata' in data:
-            return data['_metadata']
+            return copy.deepcopy(data['_metadata'])
     except Exception as e:
         print(f"Warning: Could not extract metadata: {e}")
     return {}
@@ -241,6 +322,40 @@ def check_yaml_image_match(yaml_filepath: str, image_filepath: str) -> dict:
     return result
 
 
+# YAMLの前に付く指示文の書き出し（日本語または英語）
+_INSTRUCTION_PREFIXES = (
+    "以下の",
+    "Generate ",
+    "The YAML below",
+)
+
+
+def _skip_instruction_header(content: str) -> str:
+    """先頭の指示文（日本語または英語）があれば取り除いたYAML部分を返す"""
+    if content.startswith(_INSTRUCTION_PREFIXES):
+        parts = content.split("\n\n", 1)
+        if len(parts) > 1:
+            return parts[1]
+    return content
+
+
+def _skip_instruction_header_in_file(f):
+    """
+    開いたファイルの先頭に指示文があれば、最初の空行まで読み進める（_skip_instruction_header と同じ判定）
+
+    Args:
+        f: テキストモードで開いたファイル（先頭の位置）
+    """
+    line = f.readline()
+    if line.startswith(_INSTRUCTION_PREFIXES):
+        while line:
+            line = f.readline()
+            if line == "\n":
+                return
+    # 指示文がない、または空行がない場合はファイル全体を解析する
+    f.seek(0)
+
+
 def load_yaml_file(filepath: str) -> tuple:
     """
     YAMLファイルを読み込んで解析
@@ -252,33 +367,46 @@ def load_yaml_file(filepath: str) -> tuple:
         (success: bool, data: dict or None, raw_content: str, error_message: str or None)
     """
     try:
-        with open(filepath, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        # Skip instruction header if present (Japanese or English)
-        instruction_prefixes = [
-            "以下の",
-            "Generate ",
-            "The YAML below",
-        ]
-        yaml_content = content
-        for prefix in instruction_prefixes:
-            if content.startswith(prefix):
-                parts = content.split("\n\n", 1)
-                if len(parts) > 1:
-                    yaml_content = parts[1]
-                break
-
-        data = yaml.safe_load(yaml_content)
+        # 変更のないファイルはキャッシュから返る
+        content, data = read_yaml(filepath, _skip_instruction_header)
         if not data:
             return False, None, content, "YAMLファイルを解析できませんでした。"
 
-        return True, data, content, None
+        return True, copy.deepcopy(data), content, None
 
     except Exception as e:
         return False, None, "", str(e)
 
 
+def iter_yaml_documents(filepath: str):
+    """
+    複数のドキュメント（--- 区切り）を含むYAMLファイルを1件ずつ読み込む
+
+    ファイルは解析に必要な分だけ読み進め、UI用データへの変換も1件ごとに行うため、
+    ファイルの大きさに関係なくメモリ使用量は一定で、全体の解析を待たずに先頭から処理できる
+
+    Args:
+        filepath: ファイルパス
+
+    Yields:
+        (index: int, data: dict, ui_data: dict)
+        index はファイル内のドキュメントの番号（0から。空や辞書でないドキュメントは飛ばす）
+
+    Raises:
+        OSError: ファイルを読めない場合
+        yaml.YAMLError: 解析できない場合（それまでに返したドキュメントはそのまま使える）
+    """
+    with open(filepath, "r", encoding="utf-8") as f:
+        _skip_instruction_header_in_file(f)
+        for index, data in enumerate(iter_yaml(f)):
+            if data is None:
+                continue
+            if not isinstance(data, dict):
+                print(f"Warning: Skipping document {index} in {filepath}: not a mapping")
+                continue
+            yield index, data, parse_yaml_to_ui_data(data)
+
+
 def parse_outfit_from_prompt(outfit_prompt: str) -> dict:
     """
     英語の服装プロンプトから日本語の選択肢に逆変換
@@ -307,50 +435,18 @@ def parse_outfit_from_prompt(outfit_prompt: str) -> dict:
     if not outfit_prompt:
         return result
 
-    prompt_lower = outfit_prompt.lower()
-
-    # 色を検索
-    for jp_name, en_name in OUTFIT_DATA["色"].items():
-        if en_name and en_name.lower() in prompt_lower:
-            result['color'] = jp_name
-            break
-
-    # 柄を検索
-    for jp_name, en_name in OUTFIT_DATA["柄"].items():
-        if en_name and en_name.lower() in prompt_lower:
-            result['pattern'] = jp_name
-            break
-
-    # スタイルを検索
-    for jp_name, en_name in OUTFIT_DATA["スタイル"].items():
-        if en_name and en_name.lower() in prompt_lower:
-            result['style'] = jp_name
-            break
-
-    # カテゴリと形状を検索（形状の方が具体的なので先にチェック）
-    found_category = None
-    found_shape = None
-
-    for category, shapes in OUTFIT_DATA["形状"].items():
-        for jp_shape, en_shape in shapes.items():
-            if en_shape and en_shape.lower() in prompt_lower:
-                found_category = category
-                found_shape = jp_shape
-                break
-        if found_shape:
-            break
-
-    # 形状が見つからなかった場合はカテゴリのみ検索
-    if not found_category:
-        for jp_name, en_name in OUTFIT_DATA["カテゴリ"].items():
-            if en_name and en_name.lower() in prompt_lower:
-                found_category = jp_name
-                break
+    # 全分類の語を1回の走査で検索（分類ごとに OUTFIT_DATA 内で先にある語を優先）
+    found = _outfit_matcher.match(outfit_prompt)
 
-    if found_category:
-        result['category'] = found_category
-    if found_shape:
-        result['shape'] = found_shape
+    for key in ('color', 'pattern', 'style'):
+        if found[key]:
+            result[key] = found[key]
+
+    # 形状の方が具体的なので優先し、形状が見つからなかった場合はカテゴリのみ
+    if found['shape']:
+        result['category'], result['shape'] = found['shape']
+    elif found['category']:
+        result['category'] = found['category']
 
     return result
 
@@ -583,36 +679,8 @@ def _get_japanese_font(size: int) -> ImageFont.FreeTypeFont:
     Returns:
         ImageFontオブジェクト
     """
-    # 日本語フォントの候補リスト（OS別）
-    font_candidates = [
-        # Windows
-        "C:/Windows/Fonts/meiryo.ttc",
-        "C:/Windows/Fonts/msgothic.ttc",
-        "C:/Windows/Fonts/YuGothM.ttc",
-        # macOS
-        "/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc",
-        "/System/Library/Fonts/Hiragino Sans GB.ttc",
-        "/Library/Fonts/Arial Unicode.ttf",
-        # Linux
-        "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
-        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
-        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
-        # Google Fonts (if installed)
-        "/usr/share/fonts/truetype/noto/NotoSansJP-Regular.otf",
-    ]
-
-    for font_path in font_candidates:
-        if os.path.exists(font_path):
-            try:
-                return ImageFont.truetype(font_path, size)
-            except Exception:
-                continue
-
-    # フォールバック: デフォルトフォント
-    try:
-        return ImageFont.truetype("arial.ttf", size)
-    except Exception:
-        return ImageFont.load_default()
+    # 候補の解決とフォントの読み込みはレジストリでキャッシュされる
+    return get_role_font("japanese", size)
 
 
 def _calculate_text_position(
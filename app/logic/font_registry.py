@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+フォント管理ロジック
+フォント候補の解決とFreeTypeFontオブジェクトのキャッシュ
+"""
+
+import os
+from functools import lru_cache
+from typing import Optional, Tuple
+
+from PIL import ImageFont
+
+
+# 保持するFreeTypeFontオブジェクトの最大数
+FONT_CACHE_SIZE = 64
+
+# 用途別のフォント候補リスト（先頭から順に探す）
+FONT_CANDIDATES = {
+    # 装飾テキスト用（太字）
+    "bold": [
+        "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
+        "/System/Library/Fonts/Hiragino Sans GB.ttc",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+        "/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc",
+    ],
+    # ラベル用
+    "label": [
+        "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
+    ],
+    # 日本語本文用（OS別）
+    "japanese": [
+        # Windows
+        "C:/Windows/Fonts/meiryo.ttc",
+        "C:/Windows/Fonts/msgothic.ttc",
+        "C:/Windows/Fonts/YuGothM.ttc",
+        # macOS
+        "/System/Library/Fonts/ヒラギノ角ゴシック W3.ttc",
+        "/System/Library/Fonts/Hiragino Sans GB.ttc",
+        "/Library/Fonts/Arial Unicode.ttf",
+        # Linux
+        "/usr/share/fonts/truetype/fonts-japanese-gothic.ttf",
+        "/usr/share/fonts/opentype/noto/NotoSansCJK-Regular.ttc",
+        "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+        # Google Fonts (if installed)
+        "/usr/share/fonts/truetype/noto/NotoSansJP-Regular.otf",
+    ],
+}
+
+# 候補が見つからない場合に試すフォント名（OSのフォント検索パスから探される）
+FALLBACK_FONT_NAMES = {
+    "japanese": ["arial.ttf"],
+}
+
+
+@lru_cache(maxsize=None)
+def resolve_font_paths(role: str) -> Tuple[str, ...]:
+    """
+    用途別の候補から存在するフォントファイルを解決（プロセスごとに1回）
+
+    Args:
+        role: フォントの用途 ("bold", "label", "japanese")
+
+    Returns:
+        存在するフォントパスのタプル（優先順）
+    """
+    candidates = FONT_CANDIDATES.get(role, [])
+    return tuple(path for path in candidates if os.path.exists(path))
+
+
+@lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(path: str, size: int, index: int = 0) -> ImageFont.FreeTypeFont:
+    """
+    FreeTypeFontオブジェクトを取得（同じ条件ならキャッシュを返す）
+
+    Args:
+        path: フォントファイルのパス
+        size: フォントサイズ
+        index: フォントコレクション（.ttc）内のフェイス番号
+
+    Returns:
+        ImageFont.FreeTypeFont: 読み込まれたフォント
+
+    Raises:
+        OSError: フォントを読み込めなかった場合
+    """
+    return ImageFont.truetype(path, size, index=index)
+
+
+def get_role_font(role: str, size: int, font_path: Optional[str] = None):
+    """
+    用途に合ったフォントを取得
+
+    Args:
+        role: フォントの用途 ("bold", "label", "japanese")
+        size: フォントサイズ
+        font_path: 優先して使うフォントファイルのパス（Noneの場合は候補から探す）
+
+    Returns:
+        ImageFont.FreeTypeFont または読み込みに失敗した場合のデフォルトフォント
+    """
+    paths = resolve_font_paths(role)
+    if font_path and os.path.exists(font_path):
+        paths = (font_path,) + paths
+
+    for path in paths + tuple(FALLBACK_FONT_NAMES.get(role, [])):
+        try:
+            return get_font(path, size)
+        except Exception:
+            continue
+
+    # フォールバック: デフォルトフォント
+    return ImageFont.load_default()
+
+
+def clear_font_cache():
+    """解決済みパスとフォントのキャッシュをクリア"""
+    resolve_font_paths.cache_clear()
+    get_font.cache_clear()
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+生成画像
+APIから返された画像のバイト列を保持し、ピクセルが必要になるまでデコードしない
+"""
+
+import io
+import os
+import threading
+from typing import Optional, Tuple
+
+from PIL import Image
+
+
+# PILの形式名と保存時の拡張子の対応
+_FORMAT_EXTENSIONS = {
+    "PNG": ".png",
+    "JPEG": ".jpg",
+    "WEBP": ".webp",
+}
+
+
+def image_extension(image_format: str) -> str:
+    """形式名に対応する拡張子（不明な形式は ".png"）"""
+    return _FORMAT_EXTENSIONS.get(image_format, ".png")
+
+
+class GeneratedImage:
+    """
+    遅延デコードされる生成画像
+
+    サイズ・モードなどはヘッダーだけから取得し、ピクセルデータは最初にアクセスしたときにデコードする。
+    同じ形式で保存する場合はデコードせずにバイト列をそのまま書き出す。
+    PIL.Image の属性・メソッドは（デコードした上で）そのまま使える。
+    """
+
+    def __init__(self, data: bytes, mime_type: str = None):
+        """
+        Args:
+            data: 画像のバイト列
+            mime_type: MIMEタイプ（Noneの場合はデータから判定）
+
+        Raises:
+            PIL.UnidentifiedImageError: 画像として認識できない場合
+        """
+        self.data = data
+        # ヘッダーだけを読む（ピクセルはデコードしない）
+        header = Image.open(io.BytesIO(data))
+        self.format: str = header.format
+        self.mode: str = header.mode
+        self.size: Tuple[int, int] = header.size
+        self.info: dict = dict(header.info)
+        self.mime_type = mime_type or Image.MIME.get(header.format, "application/octet-stream")
+        self._image: Optional[Image.Image] = None
+        self._lock = threading.Lock()
+
+    @property
+    def width(self) -> int:
+        return self.size[0]
+
+    @property
+    def height(self) -> int:
+        return self.size[1]
+
+    @property
+    def is_decoded(self) -> bool:
+        """ピクセルデータをデコード済みか"""
+        return self._image is not None
+
+    def decode(self) -> Image.Image:
+        """
+        ピクセルデータをデコードしたPIL画像を取得（2回目以降はデコード済みの画像を返す）
+
+        Returns:
+            PIL.Image: デコードされた画像（共有されるため変更する場合はコピーする）
+        """
+        with self._lock:
+            if self._image is None:
+                image = Image.open(io.BytesIO(self.data))
+                image.load()
+                self._image = image
+            return self._image
+
+    def save(self, fp, format: str = None, **params):
+        """
+        画像を保存
+
+        保存形式が元の形式と同じで追加の保存オプションがなければ、デコード・再エンコードせずに
+        バイト列をそのまま書き出す。
+
+        Args:
+            fp: 保存先のパスまたはファイルオブジェクト
+            format: 保存形式（Noneの場合は拡張子から判定）
+            **params: PIL.Image.save() に渡す保存オプション
+        """
+        target_format = format.upper() if format else None
+        if target_format is None and isinstance(fp, (str, os.PathLike)):
+            ext = os.path.splitext(os.fspath(fp))[1].lower()
+            target_format = Image.registered_extensions().get(ext)
+        if target_format == "JPG":
+            target_format = "JPEG"
+
+        if target_format == self.format and not params:
+            if isinstance(fp, (str, os.PathLike)):
+                with open(fp, "wb") as f:
+                    f.write(self.data)
+            else:
+                fp.write(self.data)
+            return
+
+        self.decode().save(fp, format, **params)
+
+    def __getattr__(self, name):
+        # 上で定義していない属性（ピクセル操作など）はデコードした画像に委譲する
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.decode(), name)
+
+    def __repr__(self) -> str:
+        state = "decoded" if self.is_decoded else "encoded"
+        return (
+            f"<GeneratedImage {self.format} {self.mode} size={self.size[0]}x{self.size[1]} "
+            f"{len(self.data)} bytes {state}>"
+        )
+
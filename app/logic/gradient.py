@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+グラデーション生成ロジック
+1次元のアルファ値ストリップを一度だけ作成し、キャンバス全体に引き伸ばして
+グラデーションオーバーレイを生成する
+"""
+
+from functools import lru_cache
+from typing import Tuple
+
+from PIL import Image
+
+
+# キャッシュするオーバーレイの最大数
+GRADIENT_CACHE_SIZE = 16
+
+
+def _build_alpha_strip(length: int, direction: str, opacity: float) -> list:
+    """
+    グラデーション方向に沿ったアルファ値の並びを作成
+
+    Args:
+        length: グラデーション方向の長さ（ピクセル）
+        direction: グラデーションの方向 ("top", "bottom", "left", "right")
+        opacity: 最大不透明度（0.0〜1.0）
+
+    Returns:
+        list: 各位置のアルファ値（0〜255）
+    """
+    if direction in ("bottom", "right"):
+        return [int(255 * opacity * (i / length)) for i in range(length)]
+    return [int(255 * opacity * (1 - i / length)) for i in range(length)]
+
+
+@lru_cache(maxsize=GRADIENT_CACHE_SIZE)
+def get_gradient_overlay(
+    size: Tuple[int, int],
+    direction: str = "bottom",
+    color: str = "#000000",
+    opacity: float = 0.5
+) -> Image.Image:
+    """
+    グラデーションオーバーレイを取得（同じ条件の場合はキャッシュを返す）
+
+    返される画像は複数のテンプレートで共有されるため、変更しないこと。
+
+    Args:
+        size: オーバーレイのサイズ (width, height)
+        direction: グラデーションの方向 ("top", "bottom", "left", "right")
+        color: グラデーションの色
+        opacity: 最大不透明度（0.0〜1.0）
+
+    Returns:
+        PIL.Image: RGBAのグラデーションオーバーレイ
+    """
+    width, height = size
+
+    # カラーをRGBに変換
+    r = int(color[1:3], 16)
+    g = int(color[3:5], 16)
+    b = int(color[5:7], 16)
+
+    overlay = Image.new("RGBA", (width, height), (r, g, b, 0))
+
+    if direction in ("top", "bottom"):
+        strip = Image.new("L", (1, height))
+        strip.putdata(_build_alpha_strip(height, direction, opacity))
+    elif direction in ("left", "right"):
+        strip = Image.new("L", (width, 1))
+        strip.putdata(_build_alpha_strip(width, direction, opacity))
+    else:
+        # 未知の方向は透明なオーバーレイ
+        return overlay
+
+    # 1ピクセル幅のストリップを引き伸ばしてアルファチャンネルにする
+    overlay.putalpha(strip.resize((width, height), Image.Resampling.NEAREST))
+    return overlay
@@ -5,22 +5,73 @@
 """
 
 import os
-from PIL import Image, ImageDraw, ImageFont, ImageFilter
-from typing import Optional, Tuple, Dict, Any
+from PIL import Image, ImageDraw, ImageFilter
+from typing import Optional, Tuple, Dict, Any, Hashable
+
+from .background_cache import (
+    get_fitted_background, get_fitted_background_from_pil,
+    file_background_key, pil_background_key, image_token
+)
+from .font_registry import get_role_font
+from .gradient import get_gradient_overlay
+from .image_loader import load_image
+from .scene import Scene
+from .text_sprite import get_text_sprite, paste_sprite
 
 
 class ImageComposer:
     """サムネイル画像の合成クラス"""
 
-    def __init__(self, width: int = 1280, height: int = 720):
+    def __init__(
+        self,
+        width: int = 1280,
+        height: int = 720,
+        scale: float = 1.0,
+        scene: Optional[Scene] = None
+    ):
         """
         Args:
-            width: 出力画像の幅
-            height: 出力画像の高さ
+            width: 出力画像の幅（レイアウト座標系）
+            height: 出力画像の高さ（レイアウト座標系）
+            scale: 描画倍率。位置・サイズ・フォントサイズ等の引数はレイアウト座標系で
+                   指定し、この倍率で縮小・拡大して描画する（プレビュー用）
+            scene: レイヤーモードで使うシーン。指定した場合は各要素をキャンバスに直接描かず
+                   シーンのノードとして配置し、get_image() で変更領域だけを再合成する。
+                   同じシーンを複数のコンポーザーで順に使い回すことで差分合成が効く
         """
-        self.width = width
-        self.height = height
+        self.scale = scale
+        self.width = max(1, round(width * scale))
+        self.height = max(1, round(height * scale))
         self.canvas: Optional[Image.Image] = None
+        self.scene = scene
+        self._node_counts: Dict[str, int] = {}
+
+        if self.scene is not None:
+            self.scene.begin((self.width, self.height))
+
+    def _scaled(self, value: float) -> int:
+        """レイアウト座標系の長さを描画倍率で変換"""
+        return int(round(value * self.scale))
+
+    def _scaled_pair(self, pair: Tuple[float, float]) -> Tuple[int, int]:
+        """レイアウト座標系の (x, y) や (width, height) を描画倍率で変換"""
+        return self._scaled(pair[0]), self._scaled(pair[1])
+
+    def _node_id(self, layer: str, node_id: Optional[str] = None) -> str:
+        """レイヤーモードのノードIDを決定（未指定の場合はレイヤー内の連番）"""
+        if node_id:
+            return node_id
+        index = self._node_counts.get(layer, 0)
+        self._node_counts[layer] = index + 1
+        return f"{layer}:{index}"
+
+    def _ensure_canvas(self):
+        """背景がまだなければデフォルトのキャンバスを作成"""
+        if self.scene is not None:
+            if not self.scene.has_layer("background"):
+                self.create_canvas()
+        elif self.canvas is None:
+            self.create_canvas()
 
     def create_canvas(self, background_color: str = "#1a1a2e") -> Image.Image:
         """
@@ -32,6 +83,14 @@ class ImageComposer:
         Returns:
             PIL.Image: 作成されたキャンバス
         """
+        if self.scene is not None:
+            key = ("solid", background_color, self.width, self.height)
+            canvas = self.scene.cached_image("background", key)
+            if canvas is None:
+                canvas = Image.new("RGBA", (self.width, self.height), background_color)
+            self.scene.set_node("background", "background", canvas, (0, 0), key)
+            return canvas
+
         self.canvas = Image.new("RGBA", (self.width, self.height), background_color)
         return self.canvas
 
@@ -47,98 +106,81 @@ class ImageComposer:
             bool: 成功したかどうか
         """
         try:
-            bg_image = Image.open(image_path).convert("RGBA")
-
-            if fit_mode == "cover":
-                # アスペクト比を維持しつつ、キャンバスを完全に覆う
-                bg_ratio = bg_image.width / bg_image.height
-                canvas_ratio = self.width / self.height
-
-                if bg_ratio > canvas_ratio:
-                    new_height = self.height
-                    new_width = int(new_height * bg_ratio)
-                else:
-                    new_width = self.width
-                    new_height = int(new_width / bg_ratio)
-
-                bg_image = bg_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-                # 中央でクロップ
-                left = (new_width - self.width) // 2
-                top = (new_height - self.height) // 2
-                bg_image = bg_image.crop((left, top, left + self.width, top + self.height))
-
-            elif fit_mode == "contain":
-                # アスペクト比を維持しつつ、キャンバス内に収める
-                bg_image.thumbnail((self.width, self.height), Image.Resampling.LANCZOS)
-
-            elif fit_mode == "stretch":
-                bg_image = bg_image.resize((self.width, self.height), Image.Resampling.LANCZOS)
-
-            if self.canvas is None:
-                self.canvas = Image.new("RGBA", (self.width, self.height))
-
-            # 背景画像を配置
-            if fit_mode == "contain":
-                x = (self.width - bg_image.width) // 2
-                y = (self.height - bg_image.height) // 2
-                self.canvas.paste(bg_image, (x, y))
-            else:
-                self.canvas = bg_image
-
+            # デコード・リサイズ済みの画像はキャッシュから再利用される
+            key = file_background_key(image_path, (self.width, self.height), fit_mode)
+            bg_image = get_fitted_background(image_path, (self.width, self.height), fit_mode, key)
+            self._apply_background(bg_image, fit_mode, key)
             return True
 
         except Exception as e:
             print(f"背景画像の設定エラー: {e}")
             return False
 
-    def set_background_from_pil(self, pil_image: Image.Image, fit_mode: str = "cover") -> bool:
+    def set_background_from_pil(
+        self,
+        pil_image: Image.Image,
+        fit_mode: str = "cover",
+        source_key: Optional[Hashable] = None
+    ) -> bool:
         """
         PIL画像から背景を設定
 
         Args:
             pil_image: PIL画像オブジェクト
             fit_mode: フィットモード
+            source_key: 画像の内容のキー（Noneの場合は画像オブジェクトの同一性でキャッシュする。
+                        同じオブジェクトを書き換えて使う場合は内容ごとに異なるキーを渡す）
 
         Returns:
             bool: 成功したかどうか
         """
         try:
-            bg_image = pil_image.convert("RGBA")
-
-            if fit_mode == "cover":
-                bg_ratio = bg_image.width / bg_image.height
-                canvas_ratio = self.width / self.height
-
-                if bg_ratio > canvas_ratio:
-                    new_height = self.height
-                    new_width = int(new_height * bg_ratio)
-                else:
-                    new_width = self.width
-                    new_height = int(new_width / bg_ratio)
-
-                bg_image = bg_image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-
-                left = (new_width - self.width) // 2
-                top = (new_height - self.height) // 2
-                bg_image = bg_image.crop((left, top, left + self.width, top + self.height))
-
-            elif fit_mode == "stretch":
-                bg_image = bg_image.resize((self.width, self.height), Image.Resampling.LANCZOS)
-
-            self.canvas = bg_image
+            key = pil_background_key(pil_image, (self.width, self.height), fit_mode, source_key)
+            bg_image = get_fitted_background_from_pil(pil_image, (self.width, self.height), fit_mode, key)
+            self._apply_background(bg_image, fit_mode, key)
             return True
 
         except Exception as e:
             print(f"背景設定エラー: {e}")
             return False
 
+    def _apply_background(self, bg_image: Image.Image, fit_mode: str, content_key: tuple = None):
+        """
+        フィット済みの背景画像をキャンバスに配置
+
+        Args:
+            bg_image: フィット済みの背景画像（キャッシュと共有されるため変更しない）
+            fit_mode: フィットモード
+            content_key: レイヤーモードで使う背景の内容キー
+        """
+        if self.scene is not None:
+            if fit_mode == "contain":
+                # 背景色の上に中央配置
+                x = (self.width - bg_image.width) // 2
+                y = (self.height - bg_image.height) // 2
+                self.scene.set_node("background_image", "background", bg_image, (x, y), content_key)
+            else:
+                self.scene.set_node("background", "background", bg_image, (0, 0), content_key)
+            return
+
+        if fit_mode == "contain":
+            if self.canvas is None:
+                self.canvas = Image.new("RGBA", (self.width, self.height))
+
+            # 中央に配置
+            x = (self.width - bg_image.width) // 2
+            y = (self.height - bg_image.height) // 2
+            self.canvas.paste(bg_image, (x, y))
+        else:
+            self.canvas = bg_image.copy()
+
     def add_character(
         self,
         image_path: str,
         position: Tuple[int, int] = (0, 0),
         size: Optional[Tuple[int, int]] = None,
-        anchor: str = "topleft"
+        anchor: str = "topleft",
+        node_id: Optional[str] = None
     ) -> bool:
         """
         キャラクター画像を追加
@@ -148,17 +190,37 @@ class ImageComposer:
             position: 配置位置 (x, y)
             size: リサイズ後のサイズ (width, height)、Noneの場合は元のサイズ
             anchor: アンカーポイント ("topleft", "center", "bottomright" など)
+            node_id: レイヤーモードでのノードID（Noneの場合は自動採番）
 
         Returns:
             bool: 成功したかどうか
         """
         try:
-            char_image = Image.open(image_path).convert("RGBA")
+            target_size = self._scaled_pair(size) if size else None
+
+            # レイヤーモードでは前回と同じ画像なら読み込みを省略
+            char_image = None
+            content_key = None
+            if self.scene is not None:
+                node_id = self._node_id("characters", node_id)
+                content_key = (
+                    "file", os.path.abspath(image_path),
+                    os.stat(image_path).st_mtime_ns, target_size, self.scale
+                )
+                char_image = self.scene.cached_image(node_id, content_key)
 
-            if size:
-                char_image = char_image.resize(size, Image.Resampling.LANCZOS)
+            if char_image is None:
+                # リサイズ先が決まっている場合は縮小デコードする
+                char_image = load_image(image_path, target_size)
 
-            x, y = position
+                if size:
+                    char_image = char_image.resize(target_size, Image.Resampling.LANCZOS)
+                elif self.scale != 1.0:
+                    char_image = char_image.resize(
+                        self._scaled_pair(char_image.size), Image.Resampling.LANCZOS
+                    )
+
+            x, y = self._scaled_pair(position)
 
             # アンカーポイントに基づいて位置を調整
             if "center" in anchor:
@@ -171,10 +233,12 @@ class ImageComposer:
             elif "bottom" in anchor:
                 y -= char_image.height
 
-            if self.canvas is None:
-                self.create_canvas()
+            self._ensure_canvas()
 
-            self.canvas.paste(char_image, (x, y), char_image)
+            if self.scene is not None:
+                self.scene.set_node(node_id, "characters", char_image, (x, y), content_key)
+            else:
+                self.canvas.paste(char_image, (x, y), char_image)
             return True
 
         except Exception as e:
@@ -186,18 +250,49 @@ class ImageComposer:
         pil_image: Image.Image,
         position: Tuple[int, int] = (0, 0),
         size: Optional[Tuple[int, int]] = None,
-        anchor: str = "topleft"
+        anchor: str = "topleft",
+        node_id: Optional[str] = None,
+        source_key: Optional[Hashable] = None
     ) -> bool:
         """
         PIL画像からキャラクターを追加
-        """
-        try:
-            char_image = pil_image.convert("RGBA")
 
-            if size:
-                char_image = char_image.resize(size, Image.Resampling.LANCZOS)
+        Args:
+            pil_image: キャラクターのPIL画像
+            position: 配置位置 (x, y)
+            size: リサイズ後のサイズ (width, height)、Noneの場合は元のサイズ
+            anchor: アンカーポイント
+            node_id: レイヤーモードでのノードID（Noneの場合は自動採番）
+            source_key: 画像の内容のキー（Noneの場合は画像オブジェクトの同一性。
+                        同じオブジェクトを書き換えて使う場合は内容ごとに異なるキーを渡す）
 
-            x, y = position
+        Returns:
+            bool: 成功したかどうか
+        """
+        try:
+            target_size = self._scaled_pair(size) if size else None
+
+            # レイヤーモードでは前回と同じ画像なら変換・リサイズを省略
+            char_image = None
+            content_key = None
+            if self.scene is not None:
+                node_id = self._node_id("characters", node_id)
+                if source_key is None:
+                    source_key = (image_token(pil_image), pil_image.mode, pil_image.size)
+                content_key = ("pil", source_key, target_size, self.scale)
+                char_image = self.scene.cached_image(node_id, content_key)
+
+            if char_image is None:
+                char_image = pil_image.convert("RGBA")
+
+                if size:
+                    char_image = char_image.resize(target_size, Image.Resampling.LANCZOS)
+                elif self.scale != 1.0:
+                    char_image = char_image.resize(
+                        self._scaled_pair(char_image.size), Image.Resampling.LANCZOS
+                    )
+
+            x, y = self._scaled_pair(position)
 
             if "center" in anchor:
                 x -= char_image.width // 2
@@ -209,10 +304,12 @@ class ImageComposer:
             elif "bottom" in anchor:
                 y -= char_image.height
 
-            if self.canvas is None:
-                self.create_canvas()
+            self._ensure_canvas()
 
-            self.canvas.paste(char_image, (x, y), char_image)
+            if self.scene is not None:
+                self.scene.set_node(node_id, "characters", char_image, (x, y), content_key)
+            else:
+                self.canvas.paste(char_image, (x, y), char_image)
             return True
 
         except Exception as e:
@@ -231,7 +328,8 @@ class ImageComposer:
         stroke_color: str = "#000000",
         shadow: bool = False,
         shadow_offset: Tuple[int, int] = (3, 3),
-        shadow_color: str = "#000000"
+        shadow_color: str = "#000000",
+        node_id: Optional[str] = None
     ) -> bool:
         """
         テキストを追加
@@ -248,44 +346,34 @@ class ImageComposer:
             shadow: 影をつけるかどうか
             shadow_offset: 影のオフセット
             shadow_color: 影の色
+            node_id: レイヤーモードでのノードID（Noneの場合は自動採番）
 
         Returns:
             bool: 成功したかどうか
         """
         try:
-            if self.canvas is None:
-                self.create_canvas()
+            self._ensure_canvas()
 
-            draw = ImageDraw.Draw(self.canvas)
-
-            # フォントの読み込み
-            try:
-                if font_path and os.path.exists(font_path):
-                    font = ImageFont.truetype(font_path, font_size)
-                else:
-                    # システムフォントを探す
-                    font_candidates = [
-                        "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
-                        "/System/Library/Fonts/Hiragino Sans GB.ttc",
-                        "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                        "/usr/share/fonts/noto-cjk/NotoSansCJK-Bold.ttc",
-                    ]
-                    font = None
-                    for candidate in font_candidates:
-                        if os.path.exists(candidate):
-                            font = ImageFont.truetype(candidate, font_size)
-                            break
-                    if font is None:
-                        font = ImageFont.load_default()
-            except:
-                font = ImageFont.load_default()
-
-            # テキストのバウンディングボックスを取得
-            bbox = draw.textbbox((0, 0), text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-
-            x, y = position
+            # 描画倍率を反映（縁取りは指定がある限り1px以上を保つ）
+            font_size = max(1, self._scaled(font_size))
+            if stroke_width > 0:
+                stroke_width = max(1, self._scaled(stroke_width))
+
+            # フォントの読み込み（解決済みパスとフォントはキャッシュされる）
+            font = get_role_font("bold", font_size, font_path)
+
+            # 縁取り・影を含めて描画済みのスプライトを取得
+            sprite = get_text_sprite(
+                text, font, font_color,
+                stroke_width=stroke_width,
+                stroke_color=stroke_color,
+                shadow=shadow,
+                shadow_offset=self._scaled_pair(shadow_offset),
+                shadow_color=shadow_color
+            )
+            text_width, text_height = sprite.text_size
+
+            x, y = self._scaled_pair(position)
 
             # アンカーポイントに基づいて位置を調整
             if "center" in anchor:
@@ -298,20 +386,20 @@ class ImageComposer:
             elif "bottom" in anchor:
                 y -= text_height
 
-            # 影を描画
-            if shadow:
-                shadow_x = x + shadow_offset[0]
-                shadow_y = y + shadow_offset[1]
-                draw.text((shadow_x, shadow_y), text, font=font, fill=shadow_color)
-
-            # テキストを描画
-            if stroke_width > 0:
-                draw.text(
-                    (x, y), text, font=font, fill=font_color,
-                    stroke_width=stroke_width, stroke_fill=stroke_color
+            # スプライトをキャンバスに合成
+            sprite_position = (x + sprite.offset[0], y + sprite.offset[1])
+            if self.scene is not None:
+                content_key = (
+                    "text", text, font_size, font_path, font_color,
+                    stroke_width, stroke_color,
+                    shadow, tuple(shadow_offset), shadow_color, self.scale
+                )
+                self.scene.set_node(
+                    self._node_id("texts", node_id), "texts",
+                    sprite.image, sprite_position, content_key
                 )
             else:
-                draw.text((x, y), text, font=font, fill=font_color)
+                paste_sprite(self.canvas, sprite.image, sprite_position)
 
             return True
 
@@ -327,7 +415,8 @@ class ImageComposer:
         text_color: str = "#FFFFFF",
         font_size: int = 24,
         padding: Tuple[int, int] = (20, 10),
-        border_radius: int = 5
+        border_radius: int = 5,
+        node_id: Optional[str] = None
     ) -> bool:
         """
         ラベル（背景付きテキスト）を追加
@@ -340,58 +429,36 @@ class ImageComposer:
             font_size: フォントサイズ
             padding: パディング (horizontal, vertical)
             border_radius: 角丸の半径
+            node_id: レイヤーモードでのノードID（Noneの場合は自動採番）
 
         Returns:
             bool: 成功したかどうか
         """
         try:
-            if self.canvas is None:
-                self.create_canvas()
-
-            # テキストサイズを計算
-            temp_draw = ImageDraw.Draw(self.canvas)
-            try:
-                font_candidates = [
-                    "/System/Library/Fonts/ヒラギノ角ゴシック W6.ttc",
-                    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf",
-                ]
-                font = None
-                for candidate in font_candidates:
-                    if os.path.exists(candidate):
-                        font = ImageFont.truetype(candidate, font_size)
-                        break
-                if font is None:
-                    font = ImageFont.load_default()
-            except:
-                font = ImageFont.load_default()
-
-            bbox = temp_draw.textbbox((0, 0), text, font=font)
-            text_width = bbox[2] - bbox[0]
-            text_height = bbox[3] - bbox[1]
-
-            # ラベルサイズ
-            label_width = text_width + padding[0] * 2
-            label_height = text_height + padding[1] * 2
-
-            # ラベル画像を作成
-            label_img = Image.new("RGBA", (label_width, label_height), (0, 0, 0, 0))
-            label_draw = ImageDraw.Draw(label_img)
-
-            # 角丸四角形を描画
-            label_draw.rounded_rectangle(
-                [(0, 0), (label_width - 1, label_height - 1)],
-                radius=border_radius,
-                fill=bg_color
-            )
-
-            # テキストを描画
-            text_x = padding[0]
-            text_y = padding[1]
-            label_draw.text((text_x, text_y), text, font=font, fill=text_color)
-
-            # キャンバスに合成
-            x, y = position
-            self.canvas.paste(label_img, (x, y), label_img)
+            self._ensure_canvas()
+
+            # 描画倍率を反映
+            font_size = max(1, self._scaled(font_size))
+            padding = self._scaled_pair(padding)
+            border_radius = self._scaled(border_radius)
+
+            x, y = self._scaled_pair(position)
+
+            if self.scene is not None:
+                node_id = self._node_id("labels", node_id)
+                content_key = ("label", text, bg_color, text_color, font_size, padding, border_radius)
+                label_img = self.scene.cached_image(node_id, content_key)
+                if label_img is None:
+                    label_img = self._render_label(
+                        text, bg_color, text_color, font_size, padding, border_radius
+                    )
+                self.scene.set_node(node_id, "labels", label_img, (x, y), content_key)
+            else:
+                label_img = self._render_label(
+                    text, bg_color, text_color, font_size, padding, border_radius
+                )
+                # キャンバスに合成
+                self.canvas.paste(label_img, (x, y), label_img)
 
             return True
 
@@ -399,6 +466,46 @@ class ImageComposer:
             print(f"ラベル追加エラー: {e}")
             return False
 
+    def _render_label(
+        self,
+        text: str,
+        bg_color: str,
+        text_color: str,
+        font_size: int,
+        padding: Tuple[int, int],
+        border_radius: int
+    ) -> Image.Image:
+        """ラベル画像を作成（引数は描画倍率を反映済みの値）"""
+        # テキストサイズを計算
+        temp_draw = ImageDraw.Draw(Image.new("RGBA", (1, 1)))
+        font = get_role_font("label", font_size)
+
+        bbox = temp_draw.textbbox((0, 0), text, font=font)
+        text_width = bbox[2] - bbox[0]
+        text_height = bbox[3] - bbox[1]
+
+        # ラベルサイズ
+        label_width = text_width + padding[0] * 2
+        label_height = text_height + padding[1] * 2
+
+        # ラベル画像を作成
+        label_img = Image.new("RGBA", (label_width, label_height), (0, 0, 0, 0))
+        label_draw = ImageDraw.Draw(label_img)
+
+        # 角丸四角形を描画
+        label_draw.rounded_rectangle(
+            [(0, 0), (label_width - 1, label_height - 1)],
+            radius=border_radius,
+            fill=bg_color
+        )
+
+        # テキストを描画
+        text_x = padding[0]
+        text_y = padding[1]
+        label_draw.text((text_x, text_y), text, font=font, fill=text_color)
+
+        return label_img
+
     def add_gradient_overlay(
         self,
         direction: str = "bottom",
@@ -417,40 +524,18 @@ class ImageComposer:
             bool: 成功したかどうか
         """
         try:
-            if self.canvas is None:
-                self.create_canvas()
+            self._ensure_canvas()
+
+            # グラデーション画像を取得（同じ条件ならキャッシュを再利用）
+            gradient = get_gradient_overlay(
+                (self.width, self.height), direction, color, opacity
+            )
 
-            # カラーをRGBに変換
-            r = int(color[1:3], 16)
-            g = int(color[3:5], 16)
-            b = int(color[5:7], 16)
-
-            # グラデーション画像を作成
-            gradient = Image.new("RGBA", (self.width, self.height), (0, 0, 0, 0))
-
-            for i in range(self.height if direction in ["top", "bottom"] else self.width):
-                if direction == "bottom":
-                    alpha = int(255 * opacity * (i / self.height))
-                    y = i
-                    for x in range(self.width):
-                        gradient.putpixel((x, y), (r, g, b, alpha))
-                elif direction == "top":
-                    alpha = int(255 * opacity * (1 - i / self.height))
-                    y = i
-                    for x in range(self.width):
-                        gradient.putpixel((x, y), (r, g, b, alpha))
-                elif direction == "right":
-                    alpha = int(255 * opacity * (i / self.width))
-                    x = i
-                    for y in range(self.height):
-                        gradient.putpixel((x, y), (r, g, b, alpha))
-                elif direction == "left":
-                    alpha = int(255 * opacity * (1 - i / self.width))
-                    x = i
-                    for y in range(self.height):
-                        gradient.putpixel((x, y), (r, g, b, alpha))
-
-            self.canvas = Image.alpha_composite(self.canvas, gradient)
+            if self.scene is not None:
+                content_key = ("gradient", self.width, self.height, direction, color, opacity)
+                self.scene.set_node("gradient", "gradient", gradient, (0, 0), content_key)
+            else:
+                self.canvas = Image.alpha_composite(self.canvas, gradient)
             return True
 
         except Exception as e:
@@ -464,6 +549,9 @@ class ImageComposer:
         Returns:
             PIL.Image: 合成された画像、またはNone
         """
+        if self.scene is not None:
+            # 前回のフレームから変更された領域だけを再合成
+            self.canvas = self.scene.render()
         return self.canvas
 
     def save(self, output_path: str, format: str = "PNG") -> bool:
@@ -478,7 +566,7 @@ class ImageComposer:
             bool: 成功したかどうか
         """
         try:
-            if self.canvas is None:
+            if self.get_image() is None:
                 return False
 
             if format.upper() == "JPEG":
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+"""
+画像読み込みロジック
+大きな画像を目標サイズに近い解像度でデコードする
+"""
+
+import math
+from typing import Optional, Tuple
+
+from PIL import Image
+
+
+# 最終リサンプル前に確保する解像度の余裕（Image.thumbnail と同じ考え方）
+REDUCING_GAP = 2.0
+
+# reduce() が直接扱えるモード
+_REDUCIBLE_MODES = ("L", "LA", "RGB", "RGBA", "RGBa", "La", "I", "F")
+
+
+def required_source_size(
+    source_size: Tuple[int, int],
+    target_size: Tuple[int, int],
+    fit_mode: str = "stretch"
+) -> Tuple[int, int]:
+    """
+    最終的なリサイズに必要な元画像の最小サイズを計算
+
+    Args:
+        source_size: 元画像のサイズ (width, height)
+        target_size: 最終的なサイズ (width, height)
+        fit_mode: フィットモード ("cover", "contain", "stretch")
+
+    Returns:
+        (width, height): 縮小デコードしてもよい下限サイズ
+    """
+    width, height = source_size
+    target_width, target_height = target_size
+
+    if fit_mode == "cover":
+        scale = max(target_width / width, target_height / height)
+    elif fit_mode == "contain":
+        scale = min(target_width / width, target_height / height)
+    else:
+        return target_width, target_height
+
+    return math.ceil(width * scale), math.ceil(height * scale)
+
+
+def load_image(
+    image_path: str,
+    target_size: Optional[Tuple[int, int]] = None,
+    fit_mode: str = "stretch"
+) -> Image.Image:
+    """
+    画像を読み込み、RGBAに変換して返す
+
+    target_size が指定された場合、JPEGは Image.draft で縮小デコードし、
+    その他の形式は整数倍の reduce() で目標サイズに近づける。
+    仕上げの高品質リサンプルは呼び出し側で行う。
+
+    Args:
+        image_path: 画像ファイルのパス
+        target_size: 最終的に使うサイズ (width, height)、Noneの場合は元のサイズ
+        fit_mode: target_size へのフィットモード ("cover", "contain", "stretch")
+
+    Returns:
+        PIL.Image: RGBAの画像
+    """
+    with Image.open(image_path) as source:
+        if not target_size:
+            return source.convert("RGBA")
+
+        required = required_source_size(source.size, target_size, fit_mode)
+        gap_size = (
+            max(1, int(required[0] * REDUCING_GAP)),
+            max(1, int(required[1] * REDUCING_GAP))
+        )
+
+        # JPEGはDCTスケーリングで縮小しながらデコード
+        if source.format == "JPEG":
+            source.draft(source.mode, gap_size)
+
+        image = source if source.mode in _REDUCIBLE_MODES else source.convert("RGBA")
+
+        # 整数倍で縮小（draft後にまだ大きい場合も含む）
+        factor = min(image.width // gap_size[0], image.height // gap_size[1])
+        if factor > 1:
+            image = image.reduce(factor)
+
+        return image.convert("RGBA")
@@ -0,0 +1,473 @@
+# -*- coding: utf-8 -*-
+"""
+画像生成ジョブキュー
+AI画像生成のジョブをSQLiteに永続化し、ワーカースレッドで順に処理する
+アプリが終了しても未完了のジョブは次回起動時に再開される
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import closing
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import CACHE_DIR, PATHS, PROJECT_ROOT
+from .api_client import generate_image_with_api
+from .file_manager import update_yaml_metadata
+from .generated_image import image_extension
+
+
+# ジョブデータベースのパス
+JOB_DB_PATH = os.path.join(CACHE_DIR, "jobs.sqlite3")
+
+# ジョブの状態
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# キューが空のときに新しいジョブを確認する間隔（秒）
+IDLE_POLL_SECONDS = 2.0
+
+# 実行中のジョブの生存を記録する間隔と、記録が途絶えて放棄されたとみなすまでの時間（秒）
+HEARTBEAT_SECONDS = 10.0
+STALE_CLAIM_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    yaml_prompt TEXT NOT NULL,
+    char_image_paths TEXT NOT NULL,
+    resolution TEXT NOT NULL,
+    ref_image_path TEXT,
+    yaml_path TEXT,
+    status TEXT NOT NULL,
+    result_path TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    owner TEXT,
+    heartbeat_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, id);
+"""
+
+# 以前のデータベースに追加する列
+_ADDED_COLUMNS = (
+    ("owner", "TEXT"),          # ジョブを実行しているワーカープールの識別子
+    ("heartbeat_at", "REAL"),   # 実行中のワーカーが最後に生存を記録した日時
+)
+
+
+@dataclass
+class GenerationJob:
+    """画像生成ジョブ"""
+    id: int
+    yaml_prompt: str
+    char_image_paths: List[str]
+    resolution: str
+    ref_image_path: Optional[str]
+    yaml_path: Optional[str]  # メタデータを関連付けるYAMLファイル
+    status: str
+    result_path: Optional[str]
+    error: Optional[str]
+    attempts: int
+    created_at: float
+    started_at: Optional[float]
+    finished_at: Optional[float]
+    owner: Optional[str] = None
+    heartbeat_at: Optional[float] = None
+
+    @property
+    def seconds(self) -> Optional[float]:
+        """処理にかかった時間（未完了の場合はNone）"""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "GenerationJob":
+        data = dict(row)
+        data["char_image_paths"] = json.loads(data["char_image_paths"])
+        return cls(**data)
+
+
+class JobQueue:
+    """SQLiteに永続化された画像生成ジョブのキュー"""
+
+    def __init__(self, db_path: str = JOB_DB_PATH):
+        """
+        Args:
+            db_path: ジョブデータベースのパス
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+            for name, definition in _ADDED_COLUMNS:
+                if name not in columns:
+                    try:
+                        conn.execute(f"ALTER TABLE jobs ADD COLUMN {name} {definition}")
+                    except sqlite3.OperationalError:
+                        # 同時に起動した別のプロセスが先に追加した
+                        pass
+
+    def _connect(self) -> sqlite3.Connection:
+        """接続を作成（スレッドごとに別の接続を使う。with conn はコミットのみで閉じないため closing() で閉じる）"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def submit(
+        self,
+        yaml_prompt: str,
+        char_image_paths: List[str] = None,
+        resolution: str = "2K",
+        ref_image_path: str = None,
+        yaml_path: str = None
+    ) -> int:
+        """
+        ジョブを追加
+
+        Args:
+            yaml_prompt: YAMLプロンプト文字列
+            char_image_paths: キャラクター参照画像のパスリスト
+            resolution: 解像度 ("1K", "2K", "4K")
+            ref_image_path: 参考画像（清書モード用）のパス
+            yaml_path: 完成した画像をメタデータで関連付けるYAMLファイルのパス
+
+        Returns:
+            ジョブID
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO jobs (yaml_prompt, char_image_paths, resolution, ref_image_path,"
+                " yaml_path, status, created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (
+                    yaml_prompt, json.dumps(list(char_image_paths or [])), resolution,
+                    ref_image_path, yaml_path, PENDING, time.time()
+                )
+            )
+            return cursor.lastrowid
+
+    def claim(self, owner: str = None) -> Optional[GenerationJob]:
+        """
+        待機中のジョブを1件取り出して実行中にする（複数のワーカーから呼んでも重複しない）
+
+        Args:
+            owner: 取り出すワーカープールの識別子（heartbeat() で生存を記録する）
+
+        Returns:
+            取り出したジョブ（なければNone）
+        """
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE status = ? ORDER BY id LIMIT 1", (PENDING,)
+            ).fetchone()
+            if row is None:
+                conn.rollback()
+                return None
+            now = time.time()
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = ?, attempts = attempts + 1,"
+                " error = NULL, owner = ?, heartbeat_at = ? WHERE id = ?",
+                (RUNNING, now, owner, now, row["id"])
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        return self.get(row["id"])
+
+    def complete(self, job_id: int, result_path: str):
+        """ジョブを完了にする"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, result_path = ?, finished_at = ? WHERE id = ?",
+                (DONE, result_path, time.time(), job_id)
+            )
+
+    def fail(self, job_id: int, error: str):
+        """ジョブを失敗にする"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id)
+            )
+
+    def retry(self, job_id: int):
+        """失敗したジョブを待機中に戻す"""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, finished_at = NULL"
+                " WHERE id = ? AND status = ?",
+                (PENDING, job_id, FAILED)
+            )
+
+    def heartbeat(self, owner: str) -> int:
+        """
+        ワーカープールが実行中のジョブの生存を記録
+
+        Args:
+            owner: ワーカープールの識別子
+
+        Returns:
+            記録したジョブの数
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET heartbeat_at = ? WHERE status = ? AND owner = ?",
+                (time.time(), RUNNING, owner)
+            )
+            return cursor.rowcount
+
+    def recover(self, stale_seconds: float = STALE_CLAIM_SECONDS) -> int:
+        """
+        生存の記録が途絶えた実行中のジョブ（終了・強制終了したプロセスのもの）を待機中に戻す
+        他のプロセスが実行中のジョブは生存を記録し続けるため戻さない
+
+        Args:
+            stale_seconds: 最後の記録からこの秒数が経過したジョブを放棄されたとみなす
+
+        Returns:
+            戻したジョブの数
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, heartbeat_at = NULL"
+                " WHERE status = ? AND (heartbeat_at IS NULL OR heartbeat_at < ?)",
+                (PENDING, RUNNING, time.time() - stale_seconds)
+            )
+            return cursor.rowcount
+
+    def release(self, owner: str) -> int:
+        """
+        ワーカープールが実行中のジョブを待機中に戻す（完了を待たずに停止するとき）
+
+        Args:
+            owner: ワーカープールの識別子
+
+        Returns:
+            戻したジョブの数
+        """
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = ?, started_at = NULL, owner = NULL, heartbeat_at = NULL"
+                " WHERE status = ? AND owner = ?",
+                (PENDING, RUNNING, owner)
+            )
+            return cursor.rowcount
+
+    def get(self, job_id: int) -> Optional[GenerationJob]:
+        """ジョブを取得"""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return GenerationJob.from_row(row) if row else None
+
+    def list_jobs(self, status: str = None, limit: int = 100) -> List[GenerationJob]:
+        """
+        ジョブの一覧（新しい順）
+
+        Args:
+            status: 指定した場合はその状態のジョブのみ
+            limit: 最大件数
+        """
+        query = "SELECT * FROM jobs"
+        params: tuple = ()
+        if status:
+            query += " WHERE status = ?"
+            params = (status,)
+        query += " ORDER BY id DESC LIMIT ?"
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(query, params + (limit,)).fetchall()
+        return [GenerationJob.from_row(row) for row in rows]
+
+    def counts(self) -> Dict[str, int]:
+        """状態ごとのジョブ数"""
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall()
+        return {status: count for status, count in rows}
+
+
+def _output_path(job: GenerationJob, output_dir: str, extension: str = ".png") -> str:
+    """ジョブの出力ファイルのパス"""
+    if job.yaml_path:
+        stem = os.path.splitext(os.path.basename(job.yaml_path))[0]
+    else:
+        stem = "generated"
+    return os.path.join(output_dir, f"{stem}_job{job.id:05d}{extension}")
+
+
+def run_job(job: GenerationJob, api_key: str, output_dir: str = None) -> tuple:
+    """
+    ジョブを1件実行して画像を保存
+
+    Args:
+        job: 実行するジョブ
+        api_key: Google AI API Key
+        output_dir: 出力ディレクトリ（Noneの場合はプロジェクト直下の PATHS["output"]）
+
+    Returns:
+        (success: bool, 出力パスまたはエラーメッセージ)
+    """
+    output_dir = output_dir or os.path.join(PROJECT_ROOT, PATHS["output"])
+    result = generate_image_with_api(
+        api_key, job.yaml_prompt, job.char_image_paths, job.resolution, job.ref_image_path
+    )
+    if not result['success']:
+        return False, result['error']
+
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        # 返された形式のまま保存する（デコード・再エンコードしない）
+        image = result['image']
+        output_path = os.path.abspath(_output_path(job, output_dir, image_extension(image.format)))
+        image.save(output_path)
+    except Exception as e:
+        return False, f"画像の保存に失敗しました: {e}"
+
+    # 元のYAMLに生成画像を関連付ける
+    if job.yaml_path:
+        success, error = update_yaml_metadata(job.yaml_path, output_path)
+        if not success:
+            print(f"Warning: Could not update YAML metadata for job {job.id}: {error}")
+
+    return True, output_path
+
+
+class JobWorkerPool:
+    """ジョブキューを処理するワーカースレッドのプール"""
+
+    def __init__(
+        self,
+        queue: JobQueue,
+        api_key: str,
+        workers: int = 2,
+        output_dir: str = None,
+        on_update: Callable[[GenerationJob], None] = None
+    ):
+        """
+        Args:
+            queue: 処理するジョブキュー
+            api_key: Google AI API Key
+            workers: ワーカースレッド数
+            output_dir: 出力ディレクトリ（Noneの場合はプロジェクト直下の PATHS["output"]）
+            on_update: ジョブの状態が変わるたびに呼ばれるコールバック（ワーカースレッドから呼ばれる）
+        """
+        self.queue = queue
+        self.api_key = api_key
+        self.workers = workers
+        self.output_dir = output_dir
+        self.on_update = on_update
+        # 同じキューを処理する他のプロセス・プールと区別する識別子
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._threads: List[threading.Thread] = []
+        self._stop = threading.Event()
+        self._wakeup = threading.Condition()
+        # このプールで処理したジョブの数（キューの過去の結果は含まない）
+        self.succeeded = 0
+        self.failed = 0
+        self._counts_lock = threading.Lock()
+
+    def start(self) -> int:
+        """
+        前回の未完了ジョブを再開し、ワーカーを起動
+
+        Returns:
+            再開したジョブの数
+        """
+        resumed = self.queue.recover()
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+        return resumed
+
+    def notify(self):
+        """ジョブが追加されたことをワーカーに知らせる"""
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _notify_update(self, job_id: int):
+        if self.on_update is not None:
+            job = self.queue.get(job_id)
+            if job is not None:
+                self.on_update(job)
+
+    def _heartbeat(self):
+        """実行中のジョブの生存を記録し、他のプロセスが放棄したジョブを待機中に戻す"""
+        while not self._stop.wait(HEARTBEAT_SECONDS):
+            try:
+                self.queue.heartbeat(self.owner)
+                if self.queue.recover():
+                    self.notify()
+            except sqlite3.Error as e:
+                print(f"Warning: Could not update job heartbeat: {e}")
+
+    def _run(self):
+        """ワーカースレッドのメインループ"""
+        while not self._stop.is_set():
+            job = self.queue.claim(self.owner)
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(IDLE_POLL_SECONDS)
+                continue
+
+            self._notify_update(job.id)
+            try:
+                success, detail = run_job(job, self.api_key, self.output_dir)
+            except Exception as e:
+                success, detail = False, str(e)
+
+            if success:
+                self.queue.complete(job.id, detail)
+            else:
+                self.queue.fail(job.id, detail)
+            with self._counts_lock:
+                if success:
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+            self._notify_update(job.id)
+
+    def stop(self, timeout: float = None):
+        """
+        ワーカーを停止（実行中のジョブは完了を待つ。待たずに終了した場合は次回起動時に再開される）
+
+        Args:
+            timeout: 各ワーカーの終了を待つ最大秒数（Noneの場合は完了まで待つ）
+        """
+        self._stop.set()
+        self.notify()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        if self._threads:
+            # 完了を待たなかったジョブは、次回（または他のプロセス）ですぐに再開できるよう戻す
+            self.queue.release(self.owner)
+
+    def wait_until_idle(self, poll_seconds: float = 0.5):
+        """待機中・実行中のジョブがなくなるまで待つ"""
+        while True:
+            counts = self.queue.counts()
+            if not counts.get(PENDING) and not counts.get(RUNNING):
+                return
+            time.sleep(poll_seconds)
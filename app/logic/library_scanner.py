@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+ライブラリの整合性チェック
+出力フォルダ以下のYAMLと生成画像の関連付けをまとめて確認し、
+画像の欠落・内容の不一致・関連付けのない画像などを報告する
+前回の結果を保存しておき、更新時刻とサイズが変わっていないファイルは読み直さない
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import CACHE_DIR, PATHS, PROJECT_ROOT
+from .file_manager import extract_embedded_metadata
+from .metadata_index import file_hash, get_metadata_index
+
+
+# 前回の走査結果（ファイルごとの更新時刻・サイズ・ハッシュ・メタデータ）
+SCAN_STATE_PATH = os.path.join(CACHE_DIR, "library_scan.json")
+
+YAML_EXTENSIONS = (".yaml", ".yml")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".webp")
+
+_STATE_VERSION = 1
+
+
+@dataclass
+class ScanReport:
+    """走査結果"""
+    root: str
+    yaml_count: int = 0
+    image_count: int = 0
+    ok: List[str] = field(default_factory=list)                # 画像が存在し内容も一致するYAML
+    mismatches: List[dict] = field(default_factory=list)       # 画像の内容が関連付けたときと異なる
+    stale_links: List[dict] = field(default_factory=list)      # 関連付けた画像が存在しない（移動先が分かれば found_at）
+    unverified: List[dict] = field(default_factory=list)       # 画像は存在するがハッシュの記録がない（YAML埋め込みのみ）
+    unlinked_yaml: List[str] = field(default_factory=list)     # 画像が関連付けられていないYAML
+    orphan_images: List[str] = field(default_factory=list)     # どのYAMLからも関連付けられていない画像
+    files_read: int = 0                                        # 今回読み込んだファイル数
+    files_reused: int = 0                                      # 前回の結果を再利用したファイル数
+    elapsed: float = 0.0
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+    def format_text(self) -> str:
+        """人が読むための報告"""
+        lines = [
+            f"{self.root}: YAML {self.yaml_count}件  画像 {self.image_count}件  "
+            f"({self.elapsed:.2f} s、読み込み {self.files_read}件 / 再利用 {self.files_reused}件)",
+            f"  一致: {len(self.ok)}件",
+        ]
+        for item in self.mismatches:
+            lines.append(f"  [不一致] {item['yaml']} -> {item['image']}（画像の内容が変わっています）")
+        for item in self.stale_links:
+            moved = f"（移動先の候補: {', '.join(item['found_at'])}）" if item['found_at'] else ""
+            lines.append(f"  [リンク切れ] {item['yaml']} -> {item['image']}{moved}")
+        for item in self.unverified:
+            lines.append(f"  [未検証] {item['yaml']} -> {item['image']}（ハッシュの記録がありません）")
+        for path in self.unlinked_yaml:
+            lines.append(f"  [関連付けなし] {path}")
+        for path in self.orphan_images:
+            lines.append(f"  [孤立した画像] {path}")
+        return "\n".join(lines)
+
+
+def _walk(root: str) -> Tuple[Dict[str, tuple], Dict[str, tuple]]:
+    """
+    フォルダ以下のYAMLと画像を列挙
+
+    Returns:
+        (YAMLのパス -> (mtime_ns, size), 画像のパス -> (mtime_ns, size))
+    """
+    yamls = {}
+    images = {}
+    stack = [os.path.abspath(root)]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                        continue
+                    ext = os.path.splitext(entry.name)[1].lower()
+                    if ext in YAML_EXTENSIONS:
+                        target = yamls
+                    elif ext in IMAGE_EXTENSIONS:
+                        target = images
+                    else:
+                        continue
+                    stat = entry.stat()
+                    target[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError as e:
+            print(f"Warning: Could not scan {directory}: {e}")
+    return yamls, images
+
+
+def _load_state(state_path: str = None) -> dict:
+    """前回の走査結果を読み込む（なければ空）"""
+    if state_path:
+        try:
+            with open(state_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("version") == _STATE_VERSION:
+                return state
+        except (OSError, ValueError):
+            pass
+    return {"version": _STATE_VERSION, "images": {}, "yamls": {}}
+
+
+def _save_state(state_path: str, state: dict):
+    """走査結果を保存（一時ファイルに書いてから置き換える）"""
+    directory = os.path.dirname(os.path.abspath(state_path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f, ensure_ascii=False, default=str)
+    os.replace(tmp_path, state_path)
+
+
+def _embedded_image_path(yaml_path: str, metadata: dict) -> Optional[str]:
+    """YAMLに埋め込まれたメタデータが指す画像のパス"""
+    full_path = metadata.get("generated_image_full_path")
+    if full_path:
+        return os.path.abspath(full_path)
+    name = metadata.get("generated_image")
+    if name:
+        return os.path.join(os.path.dirname(yaml_path), name)
+    return None
+
+
+def scan_library(
+    root: str = None,
+    workers: int = 8,
+    state_path: str = SCAN_STATE_PATH,
+    full: bool = False
+) -> ScanReport:
+    """
+    出力フォルダ以下のYAMLと生成画像の関連付けを確認
+
+    関連付けはメタデータインデックスの記録を優先し、なければYAMLに埋め込まれた _metadata を使う。
+    画像は内容のハッシュで照合し、見つからない画像は同じ内容のファイルが他の場所にあれば移動先として報告する。
+
+    Args:
+        root: 走査するフォルダ（Noneの場合はプロジェクト直下の PATHS["output"]）
+        workers: ファイルを読み込むスレッド数
+        state_path: 前回の走査結果の保存先（Noneの場合は保存しない）
+        full: Trueの場合は前回の結果を使わずにすべて読み直す
+
+    Returns:
+        ScanReport: 走査結果
+    """
+    start = time.perf_counter()
+    root = os.path.abspath(root or os.path.join(PROJECT_ROOT, PATHS["output"]))
+    report = ScanReport(root=root)
+
+    yamls, images = _walk(root)
+    report.yaml_count = len(yamls)
+    report.image_count = len(images)
+
+    state = _load_state(None if full else state_path)
+    previous_images = state["images"]
+    previous_yamls = state["yamls"]
+
+    # 変更のあったファイルだけを読み込む（画像はハッシュ、YAMLは埋め込みメタデータ）
+    image_hashes = {}
+    changed_images = []
+    for path, signature in images.items():
+        cached = previous_images.get(path)
+        if cached and tuple(cached[:2]) == signature:
+            image_hashes[path] = cached[2]
+        else:
+            changed_images.append(path)
+
+    embedded = {}
+    changed_yamls = []
+    for path, signature in yamls.items():
+        cached = previous_yamls.get(path)
+        if cached and tuple(cached[:2]) == signature:
+            embedded[path] = cached[2]
+        else:
+            changed_yamls.append(path)
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for path, digest in zip(changed_images, executor.map(file_hash, changed_images)):
+            image_hashes[path] = digest
+        for path, metadata in zip(changed_yamls, executor.map(extract_embedded_metadata, changed_yamls)):
+            embedded[path] = metadata or None
+
+    report.files_read = len(changed_images) + len(changed_yamls)
+    report.files_reused = len(images) + len(yamls) - report.files_read
+
+    paths_by_hash: Dict[str, List[str]] = {}
+    for path, digest in image_hashes.items():
+        if digest:
+            paths_by_hash.setdefault(digest, []).append(path)
+
+    # 関連付けを照合
+    links = get_metadata_index().latest_links()
+    referenced = set()
+    for yaml_path in sorted(yamls):
+        link = links.get(yaml_path)
+        if link is not None:
+            image_path, expected_hash = link.image_path, link.image_hash
+        elif embedded.get(yaml_path):
+            image_path, expected_hash = _embedded_image_path(yaml_path, embedded[yaml_path]), None
+        else:
+            image_path, expected_hash = None, None
+
+        if image_path is None:
+            report.unlinked_yaml.append(yaml_path)
+            continue
+        referenced.add(image_path)
+
+        if image_path in image_hashes:
+            actual_hash = image_hashes[image_path]
+        elif os.path.exists(image_path):
+            # 走査したフォルダの外にある画像
+            actual_hash = file_hash(image_path)
+        else:
+            found_at = paths_by_hash.get(expected_hash, []) if expected_hash else []
+            report.stale_links.append({"yaml": yaml_path, "image": image_path, "found_at": found_at})
+            referenced.update(found_at)
+            continue
+
+        item = {"yaml": yaml_path, "image": image_path}
+        if expected_hash is None:
+            report.unverified.append(item)
+        elif actual_hash != expected_hash:
+            report.mismatches.append(item)
+        else:
+            report.ok.append(yaml_path)
+
+    report.orphan_images = sorted(path for path in images if path not in referenced)
+
+    if state_path:
+        try:
+            _save_state(state_path, {
+                "version": _STATE_VERSION,
+                "images": {path: [*images[path], image_hashes[path]] for path in images},
+                "yamls": {path: [*yamls[path], embedded[path]] for path in yamls},
+            })
+        except OSError as e:
+            print(f"Warning: Could not save scan state: {e}")
+
+    report.elapsed = time.perf_counter() - start
+    return report
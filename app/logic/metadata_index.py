@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+メタデータインデックス
+YAMLファイルと生成画像の関連付け（日時・内容のハッシュ）をSQLiteに記録する
+YAMLファイルを書き換えずに1行の追加で関連付けられ、途中で終了しても記録が壊れない
+"""
+
+import hashlib
+import os
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import closing
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import CACHE_DIR
+
+
+# インデックスのパス（どのディレクトリから実行しても同じインデックスを使う）
+METADATA_INDEX_PATH = os.path.join(CACHE_DIR, "metadata.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_links (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    yaml_path TEXT NOT NULL,
+    image_path TEXT NOT NULL,
+    yaml_hash TEXT,
+    image_hash TEXT,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS image_links_yaml ON image_links (yaml_path, id);
+CREATE INDEX IF NOT EXISTS image_links_image ON image_links (image_path, id);
+"""
+
+
+def file_hash(path: str) -> Optional[str]:
+    """
+    ファイル内容のハッシュ（読めない場合はNone）
+
+    Args:
+        path: ファイルパス
+
+    Returns:
+        BLAKE2bの16進文字列
+    """
+    try:
+        digest = hashlib.blake2b(digest_size=20)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+    except OSError:
+        return None
+
+
+@dataclass
+class ImageLink:
+    """YAMLファイルと生成画像の関連付け"""
+    id: int
+    yaml_path: str
+    image_path: str
+    yaml_hash: Optional[str]    # 関連付けた時点のYAMLの内容のハッシュ
+    image_hash: Optional[str]   # 関連付けた時点の画像の内容のハッシュ
+    created_at: float
+
+    @property
+    def generated_image(self) -> str:
+        """画像のファイル名"""
+        return os.path.basename(self.image_path)
+
+    def to_metadata(self) -> dict:
+        """YAMLの _metadata ブロックと同じ形式の辞書"""
+        return {
+            'created_at': datetime.fromtimestamp(self.created_at).strftime('%Y-%m-%d %H:%M:%S'),
+            'generated_image': self.generated_image,
+            'generated_image_full_path': self.image_path,
+        }
+
+    @classmethod
+    def from_row(cls, row: sqlite3.Row) -> "ImageLink":
+        return cls(**dict(row))
+
+
+class MetadataIndex:
+    """YAMLファイルと生成画像の関連付けの記録（追記のみ。最新の記録が有効）"""
+
+    def __init__(self, db_path: str = METADATA_INDEX_PATH):
+        """
+        Args:
+            db_path: インデックスのパス
+        """
+        self.db_path = db_path
+        directory = os.path.dirname(os.path.abspath(db_path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    def _connect(self) -> sqlite3.Connection:
+        """接続を作成（スレッドごとに別の接続を使う。with conn はコミットのみで閉じないため closing() で閉じる）"""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def link(self, yaml_path: str, image_path: str) -> ImageLink:
+        """
+        YAMLファイルに生成画像を関連付ける（1回のトランザクションで記録される）
+
+        Args:
+            yaml_path: YAMLファイルのパス
+            image_path: 生成画像のパス
+
+        Returns:
+            記録した関連付け
+        """
+        yaml_path = os.path.abspath(yaml_path)
+        image_path = os.path.abspath(image_path)
+        yaml_hash = file_hash(yaml_path)
+        image_hash = file_hash(image_path)
+        created_at = time.time()
+
+        with closing(self._connect()) as conn, conn:
+            cursor = conn.execute(
+                "INSERT INTO image_links (yaml_path, image_path, yaml_hash, image_hash, created_at)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (yaml_path, image_path, yaml_hash, image_hash, created_at)
+            )
+            link_id = cursor.lastrowid
+        return ImageLink(link_id, yaml_path, image_path, yaml_hash, image_hash, created_at)
+
+    def get(self, yaml_path: str) -> Optional[ImageLink]:
+        """YAMLファイルの最新の関連付け（なければNone）"""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT * FROM image_links WHERE yaml_path = ? ORDER BY id DESC LIMIT 1",
+                (os.path.abspath(yaml_path),)
+            ).fetchone()
+        return ImageLink.from_row(row) if row else None
+
+    def latest_links(self) -> Dict[str, ImageLink]:
+        """すべてのYAMLファイルの最新の関連付け（YAMLのパス -> 関連付け）"""
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                "SELECT * FROM image_links WHERE id IN"
+                " (SELECT MAX(id) FROM image_links GROUP BY yaml_path)"
+            ).fetchall()
+        return {row["yaml_path"]: ImageLink.from_row(row) for row in rows}
+
+    def history(self, yaml_path: str, limit: int = 100) -> List[ImageLink]:
+        """YAMLファイルの関連付けの履歴（新しい順）"""
+        with closing(self._connect()) as conn, conn:
+            rows = conn.execute(
+                "SELECT * FROM image_links WHERE yaml_path = ? ORDER BY id DESC LIMIT ?",
+                (os.path.abspath(yaml_path), limit)
+            ).fetchall()
+        return [ImageLink.from_row(row) for row in rows]
+
+    def find_by_image(self, image_path: str) -> Optional[ImageLink]:
+        """画像を関連付けた最新の記録（なければNone）"""
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT * FROM image_links WHERE image_path = ? ORDER BY id DESC LIMIT 1",
+                (os.path.abspath(image_path),)
+            ).fetchone()
+        return ImageLink.from_row(row) if row else None
+
+
+# プロセス共通のインデックス（最初に使うときに開く）
+_metadata_index: Optional[MetadataIndex] = None
+_metadata_index_lock = threading.Lock()
+
+
+def get_metadata_index() -> MetadataIndex:
+    """プロセス共通のメタデータインデックスを取得"""
+    global _metadata_index
+    with _metadata_index_lock:
+        if _metadata_index is None:
+            _metadata_index = MetadataIndex()
+        return _metadata_index
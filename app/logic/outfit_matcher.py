@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+服装プロンプトの照合
+OUTFIT_DATA の英語表現をすべてまとめた1つの正規表現で、プロンプト中の語を1回の走査で見つけ、
+色・柄・スタイル・形状・カテゴリに分類する
+"""
+
+import re
+from typing import Dict, List, Optional, Tuple
+
+
+# 分類の結果のキーと OUTFIT_DATA のキーの対応（形状は別扱い）
+_SIMPLE_GROUPS = (
+    ("color", "色"),
+    ("pattern", "柄"),
+    ("style", "スタイル"),
+    ("category", "カテゴリ"),
+)
+
+
+def _trie_pattern(terms: List[str]) -> str:
+    """
+    語のリストから、共通の接頭辞をまとめた正規表現を作る（同じ位置では最も長い語に一致する）
+
+    Args:
+        terms: 小文字の語のリスト
+    """
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node: dict) -> str:
+        terminal = "" in node
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # 子があれば貪欲に長い方を優先し、ここで終わる語は省略可能として表す
+        return f"(?:{body})?" if terminal else body
+
+    return build(trie)
+
+
+class OutfitMatcher:
+    """OUTFIT_DATA から作る服装プロンプトの照合器"""
+
+    def __init__(self, outfit_data: dict):
+        """
+        Args:
+            outfit_data: OUTFIT_DATA（"色"・"柄"・"スタイル"・"カテゴリ" は {日本語: 英語}、
+                         "形状" は {カテゴリ: {日本語: 英語}}）
+        """
+        # 語 -> [(分類, 優先順位, 値)]。優先順位は OUTFIT_DATA 内の順番（小さいほど優先）
+        entries: Dict[str, List[Tuple[str, int, object]]] = {}
+
+        for group, key in _SIMPLE_GROUPS:
+            for priority, (jp_name, en_name) in enumerate(outfit_data.get(key, {}).items()):
+                if en_name:
+                    entries.setdefault(en_name.lower(), []).append((group, priority, jp_name))
+
+        priority = 0
+        for category, shapes in outfit_data.get("形状", {}).items():
+            for jp_shape, en_shape in shapes.items():
+                if en_shape:
+                    entries.setdefault(en_shape.lower(), []).append(("shape", priority, (category, jp_shape)))
+                priority += 1
+
+        terms = sorted(entries)
+        # 語が別の語を含む場合（"navy blue" と "blue" など）、長い方に一致した時点で短い方も見つかったことにする
+        self._closure: Dict[str, List[Tuple[str, int, object]]] = {
+            term: [entry for other in terms if other in term for entry in entries[other]]
+            for term in terms
+        }
+        # 一致した語の途中から始まって語の外まで続く別の語がありうる場合は、その位置から探し直す
+        # （語の末尾が別の語の先頭と重なる最初の位置。なければ語の直後から）
+        prefixes = {term[:i] for term in terms for i in range(1, len(term))}
+        self._resume: Dict[str, int] = {
+            term: next((k for k in range(1, len(term)) if term[k:] in prefixes), len(term))
+            for term in terms
+        }
+        self._pattern = re.compile(_trie_pattern(terms)) if terms else None
+
+    def match(self, prompt: str) -> Dict[str, Optional[object]]:
+        """
+        プロンプトに含まれる語を分類し、分類ごとに最も優先順位の高いものを返す
+
+        Args:
+            prompt: 英語の服装プロンプト
+
+        Returns:
+            {'color', 'pattern', 'style', 'category': 日本語名 or None, 'shape': (カテゴリ, 日本語名) or None}
+        """
+        best: Dict[str, Tuple[int, object]] = {}
+        if self._pattern is not None and prompt:
+            text = prompt.lower()
+            search = self._pattern.search
+            seen = set()
+            found = search(text)
+            while found is not None:
+                # 各位置では最も長い語に一致する（その語に含まれる語は _closure で拾う）
+                term = found.group()
+                if term not in seen:
+                    seen.add(term)
+                    for group, priority, value in self._closure[term]:
+                        if group not in best or priority < best[group][0]:
+                            best[group] = (priority, value)
+                found = search(text, found.start() + self._resume[term])
+
+        return {
+            group: best[group][1] if group in best else None
+            for group in ("color", "pattern", "style", "category", "shape")
+        }
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+参照画像の前処理
+APIに送る参照画像を縮小・再エンコードし、エンコード済みのバイト列を再利用する
+"""
+
+import io
+import os
+import sys
+from functools import lru_cache
+from typing import Tuple
+
+from PIL import Image
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import REFERENCE_IMAGE_SETTINGS
+
+
+# 保持するエンコード済み参照画像の最大数
+REFERENCE_CACHE_SIZE = 32
+
+_MIME_TYPES = {
+    "WEBP": "image/webp",
+    "JPEG": "image/jpeg",
+    "PNG": "image/png",
+}
+
+
+def encode_image(image: Image.Image, max_edge: int, image_format: str, quality: int) -> Tuple[bytes, str]:
+    """
+    画像を長辺 max_edge 以下に縮小してエンコード
+
+    Args:
+        image: 元の画像
+        max_edge: 長辺の最大ピクセル数
+        image_format: エンコード形式 ("WEBP", "JPEG", "PNG")
+        quality: 画質（WEBP/JPEG）
+
+    Returns:
+        (エンコード済みのバイト列, MIMEタイプ)
+    """
+    image_format = image_format.upper()
+    # thumbnail() はJPEGのdraftと段階的な縮小を使うため、大きな画像でも速い
+    image.thumbnail((max_edge, max_edge), Image.Resampling.LANCZOS)
+
+    has_alpha = image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info)
+    if image_format == "JPEG":
+        image = image.convert("RGB")
+    else:
+        image = image.convert("RGBA" if has_alpha else "RGB")
+
+    buffer = io.BytesIO()
+    if image_format == "PNG":
+        image.save(buffer, format="PNG", optimize=True)
+    else:
+        image.save(buffer, format=image_format, quality=quality)
+    return buffer.getvalue(), _MIME_TYPES[image_format]
+
+
+@lru_cache(maxsize=REFERENCE_CACHE_SIZE)
+def _encode_file(
+    image_path: str,
+    mtime_ns: int,
+    file_size: int,
+    max_edge: int,
+    image_format: str,
+    quality: int
+) -> Tuple[bytes, str]:
+    """ファイルを縮小・エンコード（パス・更新日時・設定ごとにメモ化）"""
+    with Image.open(image_path) as image:
+        return encode_image(image, max_edge, image_format, quality)
+
+
+def encode_reference_image(image_path: str, settings: dict = None) -> Tuple[bytes, str]:
+    """
+    参照画像をAPI送信用にエンコード
+
+    (パス, 更新日時, サイズ, 設定) が同じ場合は前回のエンコード結果を返す。
+
+    Args:
+        image_path: 参照画像のパス
+        settings: REFERENCE_IMAGE_SETTINGS と同じ形式の設定（Noneの場合は既定値）
+
+    Returns:
+        (エンコード済みのバイト列, MIMEタイプ)
+    """
+    settings = {**REFERENCE_IMAGE_SETTINGS, **(settings or {})}
+    stat = os.stat(image_path)
+    return _encode_file(
+        os.path.abspath(image_path),
+        stat.st_mtime_ns,
+        stat.st_size,
+        int(settings["max_edge"]),
+        str(settings["format"]).upper(),
+        int(settings["quality"])
+    )
+
+
+def clear_reference_cache():
+    """エンコード済み参照画像のキャッシュをクリア"""
+    _encode_file.cache_clear()
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+"""
+API呼び出しの制御
+トークンバケットによる流量制限、ジッター付き指数バックオフでの再試行、
+サーキットブレーカーによる障害時の即時失敗をまとめて扱う
+"""
+
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import API_RESILIENCE
+
+
+# 再試行するHTTPステータスコード
+RETRYABLE_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+
+
+class CircuitOpenError(Exception):
+    """サーキットブレーカーが開いているため呼び出しを行わなかった"""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = retry_after
+        super().__init__(
+            f"APIの障害が続いているため呼び出しを一時停止しています。"
+            f"{retry_after:.0f}秒後に再度お試しください。"
+        )
+
+
+def is_retryable(error: Exception) -> bool:
+    """
+    再試行すべきエラーか判定
+
+    レート制限・サーバーエラー（429/5xx等）と、通信エラー・タイムアウトを再試行の対象とする。
+    """
+    code = getattr(error, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS_CODES
+
+    try:
+        import httpx
+        if isinstance(error, httpx.TransportError):
+            return True
+    except ImportError:
+        pass
+
+    return isinstance(error, (ConnectionError, TimeoutError))
+
+
+class TokenBucket:
+    """トークンバケット（一定の割合でトークンが補充され、呼び出しごとに1つ消費する）"""
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        """
+        Args:
+            rate: 1秒あたりに補充されるトークン数
+            capacity: バケットの容量（連続して呼び出せる回数）
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """
+        トークンを1つ予約し、使えるようになるまでの待ち時間を返す
+
+        待ち時間の分だけ先にトークンを借りるため、呼び出し側は返された時間だけ待てばよい。
+
+        Returns:
+            待つべき秒数（すぐに使える場合は0）
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= 1
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate
+
+
+class CircuitBreaker:
+    """サーキットブレーカー（連続した失敗で開き、一定時間後に1回だけ試行を許す）"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int,
+        reset_timeout: float,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        """
+        Args:
+            failure_threshold: 開くまでの連続失敗回数
+            reset_timeout: 開いてから試行を再開するまでの秒数
+            clock: 現在時刻（秒）を返す関数
+        """
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self.state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0    # 直近に開いた時刻（再試行の判定に使う）
+        self._open_since = 0.0   # 閉じた状態から開いた時刻
+        self._trial_in_flight = False
+        self.open_seconds = 0.0  # 開いていた時間の合計（閉じた時点で加算）
+        self._lock = threading.Lock()
+
+    def allow(self) -> float:
+        """
+        呼び出してよいか確認
+
+        Returns:
+            0の場合は呼び出してよい。正の値の場合は開いており、再試行できるまでの秒数
+        """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return 0.0
+
+            remaining = self._opened_at + self.reset_timeout - self._clock()
+            if self.state == self.OPEN and remaining <= 0:
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return 0.0
+            return max(remaining, 0.001)
+
+    def record_success(self):
+        """呼び出しの成功を記録"""
+        with self._lock:
+            if self.state != self.CLOSED:
+                self.open_seconds += self._clock() - self._open_since
+            self.state = self.CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """再試行対象の失敗を記録"""
+        with self._lock:
+            self._failures += 1
+            if self.state == self.HALF_OPEN:
+                # 試行に失敗したら開き直す（開いていた時間は継続）
+                self.state = self.OPEN
+                self._opened_at = self._clock()
+            elif self.state == self.CLOSED and self._failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = self._open_since = self._clock()
+            self._trial_in_flight = False
+
+    def current_open_seconds(self) -> float:
+        """現在開いている時間を含めた、開いていた時間の合計"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return self.open_seconds
+            return self.open_seconds + self._clock() - self._open_since
+
+
+class RequestGuard:
+    """API呼び出しに流量制限・再試行・サーキットブレーカーを適用する"""
+
+    def __init__(
+        self,
+        settings: Optional[dict] = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None
+    ):
+        """
+        Args:
+            settings: API_RESILIENCE と同じ形式の設定（Noneの場合は既定値）
+            clock: 現在時刻（秒）を返す関数
+            rng: バックオフのジッターに使う乱数生成器
+        """
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._stats_lock = threading.Lock()
+        self.configure(**(settings or {}))
+
+    def configure(self, **settings):
+        """設定を変更し、流量制限・サーキットブレーカー・統計情報を初期化"""
+        self.settings = {**API_RESILIENCE, **settings}
+        self.bucket = TokenBucket(
+            self.settings["rate_per_minute"] / 60.0,
+            self.settings["burst"],
+            self._clock
+        )
+        self.breaker = CircuitBreaker(
+            self.settings["failure_threshold"],
+            self.settings["reset_timeout"],
+            self._clock
+        )
+        self._stats = {
+            "calls": 0,                 # call() / call_async() の呼び出し回数
+            "attempts": 0,              # 実際にAPIを呼んだ回数
+            "retries": 0,               # 再試行の回数
+            "failures": 0,              # 最終的に失敗した呼び出しの数
+            "rate_limit_waits": 0,      # 流量制限で待った回数
+            "rate_limit_wait_seconds": 0.0,
+            "backoff_wait_seconds": 0.0,
+            "circuit_rejections": 0,    # サーキットブレーカーで即時失敗した回数
+        }
+
+    def _count(self, name: str, value=1):
+        with self._stats_lock:
+            self._stats[name] += value
+
+    def get_stats(self) -> Dict[str, float]:
+        """統計情報のスナップショット"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["circuit_state"] = self.breaker.state
+        stats["circuit_open_seconds"] = self.breaker.current_open_seconds()
+        return stats
+
+    def _backoff(self, attempt: int) -> float:
+        """ジッター付き指数バックオフの待ち時間（Full Jitter）"""
+        ceiling = min(self.settings["max_delay"], self.settings["base_delay"] * (2 ** attempt))
+        return self._rng.uniform(0, ceiling)
+
+    def _before_attempt(self) -> float:
+        """試行前の確認。待つべき秒数を返す（開いている場合は CircuitOpenError）"""
+        retry_after = self.breaker.allow()
+        if retry_after > 0:
+            self._count("circuit_rejections")
+            raise CircuitOpenError(retry_after)
+
+        wait = self.bucket.reserve()
+        if wait > 0:
+            self._count("rate_limit_waits")
+            self._count("rate_limit_wait_seconds", wait)
+        self._count("attempts")
+        return wait
+
+    def _after_failure(self, error: Exception, attempt: int) -> float:
+        """失敗後の処理。再試行までの秒数を返す（再試行しない場合は例外を送出）"""
+        if not is_retryable(error):
+            # リクエスト自体の誤り（400等）は障害として扱わない
+            self.breaker.record_success()
+            self._count("failures")
+            raise error
+
+        self.breaker.record_failure()
+        if attempt + 1 >= self.settings["max_attempts"]:
+            self._count("failures")
+            raise error
+
+        delay = self._backoff(attempt)
+        self._count("retries")
+        self._count("backoff_wait_seconds", delay)
+        return delay
+
+    def call(self, func: Callable[[], object], sleep: Callable[[float], None] = time.sleep):
+        """
+        関数を流量制限・再試行・サーキットブレーカー付きで呼び出す
+
+        Args:
+            func: API呼び出しを行う関数（引数なし）
+            sleep: 待機に使う関数
+
+        Returns:
+            func の戻り値
+
+        Raises:
+            CircuitOpenError: サーキットブレーカーが開いている場合
+            Exception: 再試行しないエラー、または再試行回数を超えた場合の最後のエラー
+        """
+        self._count("calls")
+        attempt = 0
+        while True:
+            wait = self._before_attempt()
+            if wait > 0:
+                sleep(wait)
+            try:
+                result = func()
+            except Exception as e:
+                sleep(self._after_failure(e, attempt))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
+
+    async def call_async(self, func: Callable[[], Awaitable[object]]):
+        """
+        call() の非同期版
+
+        Args:
+            func: コルーチンを返す関数（引数なし）
+
+        Returns:
+            コルーチンの結果
+        """
+        self._count("calls")
+        attempt = 0
+        while True:
+            wait = self._before_attempt()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            try:
+                result = await func()
+            except Exception as e:
+                await asyncio.sleep(self._after_failure(e, attempt))
+                attempt += 1
+                continue
+            self.breaker.record_success()
+            return result
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+APIレスポンスキャッシュ
+生成された画像のバイト列を内容アドレス（ハッシュ）でディスクに保存する
+"""
+
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import CACHE_DIR
+
+
+# キャッシュに保持する画像の合計バイト数の上限
+RESPONSE_CACHE_BYTES = 512 * 1024 * 1024
+
+# MIMEタイプと拡張子の対応
+_MIME_EXTENSIONS = {
+    "image/png": ".png",
+    "image/jpeg": ".jpg",
+    "image/webp": ".webp",
+}
+
+
+def make_cache_key(model: str, prompt: str, resolution: str, image_paths: List[str]) -> str:
+    """
+    キャッシュキーを計算
+
+    (モデル, プロンプト, 解像度, 各参照画像のバイト列) のハッシュ。
+    読み込めない参照画像はAPIにも送られないため、キーにも含めない。
+
+    Args:
+        model: モデル名
+        prompt: 送信するプロンプト（清書モードでは清書用プロンプト）
+        resolution: 解像度 ("1K", "2K", "4K")
+        image_paths: 参照画像のパス（送信順）
+
+    Returns:
+        16進数のキャッシュキー
+    """
+    digest = hashlib.blake2b(digest_size=20)
+
+    def update(data: bytes):
+        # 長さを前置して区切りを曖昧にしない
+        digest.update(len(data).to_bytes(8, "little"))
+        digest.update(data)
+
+    update(model.encode("utf-8"))
+    update((prompt or "").encode("utf-8"))
+    update(resolution.encode("utf-8"))
+    for path in image_paths:
+        try:
+            with open(path, "rb") as f:
+                update(f.read())
+        except OSError:
+            continue
+
+    return digest.hexdigest()
+
+
+class ResponseCache:
+    """生成画像のディスクキャッシュ（LRU・合計バイト数で上限管理）"""
+
+    def __init__(self, directory: str, max_bytes: int = RESPONSE_CACHE_BYTES):
+        """
+        Args:
+            directory: キャッシュを保存するディレクトリ
+            max_bytes: 保持する画像の合計バイト数の上限
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self._entries: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()  # キー -> (ファイル名, バイト数)
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    def set_directory(self, directory: str):
+        """
+        保存先のディレクトリを切り替える（それまでの索引は破棄し、新しいディレクトリから読み直す）
+
+        Args:
+            directory: キャッシュを保存するディレクトリ
+        """
+        with self._lock:
+            self.directory = directory
+            self._entries.clear()
+            self.current_bytes = 0
+            self._loaded = False
+
+    def _load_index(self):
+        """ディレクトリ内のファイルから索引を作る（最終アクセス日時の古い順）"""
+        if self._loaded:
+            return
+        self._loaded = True
+
+        try:
+            entries = []
+            for entry in os.scandir(self.directory):
+                key, ext = os.path.splitext(entry.name)
+                if entry.is_file() and ext in _MIME_EXTENSIONS.values():
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime_ns, key, entry.name, stat.st_size))
+        except FileNotFoundError:
+            return
+
+        for _, key, name, size in sorted(entries):
+            self._entries[key] = (name, size)
+            self.current_bytes += size
+
+    def get(self, key: str) -> Optional[Tuple[bytes, str]]:
+        """
+        キャッシュから画像を取得
+
+        Returns:
+            (画像のバイト列, MIMEタイプ)。なければNone
+        """
+        with self._lock:
+            self._load_index()
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            name, _ = entry
+            path = os.path.join(self.directory, name)
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+                # 更新日時をアクセス日時として使い、再起動後もLRU順を保つ
+                os.utime(path)
+            except OSError:
+                self._remove(key)
+                return None
+
+            self._entries.move_to_end(key)
+
+        ext = os.path.splitext(name)[1]
+        mime_type = next(m for m, e in _MIME_EXTENSIONS.items() if e == ext)
+        return data, mime_type
+
+    def put(self, key: str, data: bytes, mime_type: str = "image/png"):
+        """画像をキャッシュに保存し、上限を超えた分を古い順に削除"""
+        ext = _MIME_EXTENSIONS.get(mime_type)
+        if ext is None or len(data) > self.max_bytes:
+            return
+
+        name = key + ext
+        with self._lock:
+            self._load_index()
+            os.makedirs(self.directory, exist_ok=True)
+
+            # 一時ファイルに書いてから置き換え、途中のファイルを残さない
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, "wb") as f:
+                    f.write(data)
+                os.replace(tmp_path, os.path.join(self.directory, name))
+            except OSError as e:
+                print(f"Warning: Could not write response cache: {e}")
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+
+            if key in self._entries:
+                old_name, old_size = self._entries.pop(key)
+                self.current_bytes -= old_size
+                if old_name != name:
+                    self._delete_file(old_name)
+            self._entries[key] = (name, len(data))
+            self.current_bytes += len(data)
+
+            while self.current_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: str):
+        """エントリとファイルを削除（ロック取得済みで呼ぶ）"""
+        name, size = self._entries.pop(key)
+        self.current_bytes -= size
+        self._delete_file(name)
+
+    def _delete_file(self, name: str):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except OSError:
+            pass
+
+    def clear(self):
+        """キャッシュをすべて削除"""
+        with self._lock:
+            self._load_index()
+            for key in list(self._entries):
+                self._remove(key)
+
+
+# プロセス共通のキャッシュ
+_response_cache = ResponseCache(os.path.join(CACHE_DIR, "responses"))
+
+
+def get_response_cache() -> ResponseCache:
+    """プロセス共通のレスポンスキャッシュを取得"""
+    return _response_cache
+
+
+def clear_response_cache():
+    """レスポンスキャッシュをクリア"""
+    _response_cache.clear()
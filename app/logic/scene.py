@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+シーングラフ
+レイヤー順に並べたノードを保持し、変更のあった領域だけを再合成する
+"""
+
+import hashlib
+from dataclasses import dataclass
+from typing import Dict, Hashable, List, Optional, Tuple
+
+from PIL import Image
+
+
+# 描画順のレイヤー（先頭が最背面）
+LAYERS = ("background", "gradient", "characters", "labels", "texts")
+
+# 下位レイヤー（合成結果をベース画像としてキャッシュする）
+BASE_LAYERS = ("background", "gradient", "characters")
+
+# 変更領域がフレーム面積のこの割合を超えたら全体を再合成する
+FULL_REDRAW_RATIO = 0.5
+
+Rect = Tuple[int, int, int, int]
+
+
+@dataclass
+class SceneNode:
+    """シーンに配置された1つの要素"""
+    node_id: str
+    layer: str
+    image: Image.Image  # RGBA画像（共有されるため変更しない）
+    position: Tuple[int, int]  # 左上の配置位置
+    content_hash: int  # 内容を識別するハッシュ値
+
+    @property
+    def bounds(self) -> Rect:
+        """ノードが占める範囲 (left, top, right, bottom)"""
+        x, y = self.position
+        return x, y, x + self.image.width, y + self.image.height
+
+
+def _hash_image(image: Image.Image) -> int:
+    """画像の内容からハッシュ値を計算"""
+    digest = hashlib.blake2b(image.tobytes(), digest_size=8).digest()
+    return hash((image.mode, image.size, digest))
+
+
+def _union(a: Optional[Rect], b: Optional[Rect]) -> Optional[Rect]:
+    """2つの矩形を含む最小の矩形"""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def _intersect(a: Rect, b: Rect) -> Optional[Rect]:
+    """2つの矩形の共通部分（なければNone）"""
+    left, top = max(a[0], b[0]), max(a[1], b[1])
+    right, bottom = min(a[2], b[2]), min(a[3], b[3])
+    if left >= right or top >= bottom:
+        return None
+    return left, top, right, bottom
+
+
+def _area(rect: Rect) -> int:
+    """矩形の面積"""
+    return (rect[2] - rect[0]) * (rect[3] - rect[1])
+
+
+class Scene:
+    """レイヤー構造を持つシーン（変更領域のみ再合成する）"""
+
+    def __init__(self, width: int = 1280, height: int = 720):
+        """
+        Args:
+            width: フレームの幅
+            height: フレームの高さ
+        """
+        self.width = width
+        self.height = height
+        self._nodes: Dict[str, SceneNode] = {}  # 現在のフレームで配置されたノード
+        self._rendered: Dict[str, SceneNode] = {}  # 前回合成したノード
+        self._base: Optional[Image.Image] = None  # 下位レイヤーの合成結果
+        self._frame: Optional[Image.Image] = None  # 全レイヤーの合成結果
+
+        # 統計情報
+        self.full_renders = 0
+        self.partial_renders = 0
+        self.last_dirty_area = 0
+
+    def begin(self, size: Optional[Tuple[int, int]] = None):
+        """
+        新しいフレームの構築を開始（前回のノードは render() 時に差分比較される）
+
+        Args:
+            size: フレームサイズ (width, height)。変わった場合はキャッシュを破棄する
+        """
+        if size is not None and tuple(size) != (self.width, self.height):
+            self.width, self.height = size
+            self.invalidate()
+        self._nodes = {}
+
+    def invalidate(self):
+        """キャッシュを破棄し、次回は全体を再合成する"""
+        self._rendered = {}
+        self._base = None
+        self._frame = None
+
+    def cached_image(self, node_id: str, content_key: Hashable) -> Optional[Image.Image]:
+        """
+        前回のフレームで同じ内容だったノードの画像を取得
+
+        Args:
+            node_id: ノードID
+            content_key: ノードの内容を表すキー
+
+        Returns:
+            前回の画像（内容が異なる・存在しない場合はNone）
+        """
+        node = self._rendered.get(node_id)
+        if node is not None and node.content_hash == hash(content_key):
+            return node.image
+        return None
+
+    def set_node(
+        self,
+        node_id: str,
+        layer: str,
+        image: Image.Image,
+        position: Tuple[int, int] = (0, 0),
+        content_key: Optional[Hashable] = None
+    ):
+        """
+        ノードを配置（同じIDのノードは置き換えられる）
+
+        Args:
+            node_id: ノードID
+            layer: レイヤー名（LAYERS のいずれか）
+            image: RGBA画像（シーンと共有されるため変更しない）
+            position: 左上の配置位置
+            content_key: 内容を表すキー（Noneの場合は画像の内容からハッシュを計算）
+        """
+        if layer not in LAYERS:
+            raise ValueError(f"未知のレイヤーです: {layer}")
+
+        content_hash = hash(content_key) if content_key is not None else _hash_image(image)
+        self._nodes.pop(node_id, None)
+        self._nodes[node_id] = SceneNode(
+            node_id=node_id,
+            layer=layer,
+            image=image,
+            position=(int(position[0]), int(position[1])),
+            content_hash=content_hash
+        )
+
+    def has_layer(self, layer: str) -> bool:
+        """現在のフレームに指定レイヤーのノードがあるか"""
+        return any(node.layer == layer for node in self._nodes.values())
+
+    def _ordered(self, nodes: Dict[str, SceneNode]) -> List[SceneNode]:
+        """レイヤー順・配置順に並べたノード"""
+        return sorted(nodes.values(), key=lambda node: LAYERS.index(node.layer))
+
+    def _layer_sequence(self, nodes: Dict[str, SceneNode], layer: str, common: set) -> List[str]:
+        """レイヤー内の（共通ノードの）並び順"""
+        return [node_id for node_id, node in nodes.items() if node.layer == layer and node_id in common]
+
+    def _dirty_rects(self) -> Tuple[List[Rect], List[Rect]]:
+        """
+        前回のフレームとの差分から再合成が必要な領域を求める
+
+        Returns:
+            (下位レイヤーの変更領域, 全体の変更領域)
+        """
+        frame_rect = (0, 0, self.width, self.height)
+        common = set(self._nodes) & set(self._rendered)
+
+        # レイヤー内の重なり順が変わった場合は、そのレイヤーの全ノードを変更扱いにする
+        reordered = {
+            layer for layer in LAYERS
+            if self._layer_sequence(self._nodes, layer, common)
+            != self._layer_sequence(self._rendered, layer, common)
+        }
+
+        base_rects = []
+        frame_rects = []
+        for node_id in set(self._nodes) | set(self._rendered):
+            old = self._rendered.get(node_id)
+            new = self._nodes.get(node_id)
+
+            if (
+                old is not None and new is not None
+                and old.layer == new.layer
+                and old.layer not in reordered
+                and old.content_hash == new.content_hash
+                and old.position == new.position
+            ):
+                continue
+
+            rect = _union(old.bounds if old else None, new.bounds if new else None)
+            rect = _intersect(rect, frame_rect)
+            if rect is None:
+                continue
+
+            if (old and old.layer in BASE_LAYERS) or (new and new.layer in BASE_LAYERS):
+                base_rects.append(rect)
+            frame_rects.append(rect)
+
+        return base_rects, frame_rects
+
+    def _composite_region(self, canvas: Image.Image, nodes: List[SceneNode], rect: Rect):
+        """指定領域に重なるノードをキャンバスに合成"""
+        for node in nodes:
+            region = _intersect(node.bounds, rect)
+            if region is None:
+                continue
+            x, y = node.position
+            canvas.alpha_composite(
+                node.image,
+                dest=region[:2],
+                source=(region[0] - x, region[1] - y, region[2] - x, region[3] - y)
+            )
+
+    def render(self) -> Image.Image:
+        """
+        現在のノードを合成したフレームを取得
+
+        前回のフレームから変更のあったノードについて、変更前後の範囲を合わせた領域だけを
+        キャッシュ済みの下位レイヤーから再合成する。
+
+        Returns:
+            PIL.Image: 合成されたフレーム（呼び出し側で変更してよいコピー）
+        """
+        ordered = self._ordered(self._nodes)
+        base_nodes = [node for node in ordered if node.layer in BASE_LAYERS]
+        top_nodes = [node for node in ordered if node.layer not in BASE_LAYERS]
+        frame_rect = (0, 0, self.width, self.height)
+
+        full_redraw = self._frame is None
+        if not full_redraw:
+            base_rects, frame_rects = self._dirty_rects()
+            dirty_area = sum(_area(rect) for rect in frame_rects)
+            full_redraw = dirty_area > _area(frame_rect) * FULL_REDRAW_RATIO
+
+        if full_redraw:
+            self._base = Image.new("RGBA", (self.width, self.height), (0, 0, 0, 0))
+            self._composite_region(self._base, base_nodes, frame_rect)
+            self._frame = self._base.copy()
+            self._composite_region(self._frame, top_nodes, frame_rect)
+            self.full_renders += 1
+            self.last_dirty_area = _area(frame_rect)
+        else:
+            # 下位レイヤーの変更領域を再合成
+            for rect in base_rects:
+                self._base.paste((0, 0, 0, 0), rect)
+                self._composite_region(self._base, base_nodes, rect)
+
+            # ベース画像の上に上位レイヤーを再合成
+            for rect in frame_rects:
+                self._frame.paste(self._base.crop(rect), rect[:2])
+                self._composite_region(self._frame, top_nodes, rect)
+
+            self.partial_renders += 1
+            self.last_dirty_area = dirty_area
+
+        self._rendered = dict(self._nodes)
+        return self._frame.copy()
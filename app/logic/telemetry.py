@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+計測データ
+処理フェーズごとの所要時間（直近の値のヒストグラム）とカウンターをプロセス内に保持し、
+JSON Lines または Prometheus のテキスト形式でファイルに書き出す
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import APP_VERSION
+
+
+# フェーズごとに保持する直近の計測値の数
+ROLLING_WINDOW = 1000
+
+# 書き出す分位点
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _quantile(sorted_values: list, q: float) -> float:
+    """ソート済みの値の分位点（線形補間）"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * q
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+class _Histogram:
+    """直近の値を保持するヒストグラム（件数と合計は累計）"""
+
+    def __init__(self, window: int):
+        self.values: Deque[float] = deque(maxlen=window)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value: float):
+        self.values.append(value)
+        self.count += 1
+        self.total += value
+
+    def summary(self) -> dict:
+        values = sorted(self.values)
+        summary = {"count": self.count, "sum": self.total}
+        for q in QUANTILES:
+            summary[f"p{int(q * 100)}"] = _quantile(values, q)
+        return summary
+
+
+class Telemetry:
+    """フェーズごとの所要時間とカウンターの集計"""
+
+    def __init__(self, namespace: str, window: int = ROLLING_WINDOW):
+        """
+        Args:
+            namespace: 書き出すメトリクス名の接頭辞
+            window: フェーズごとに保持する直近の計測値の数
+        """
+        self.namespace = namespace
+        self.window = window
+        self._phases: Dict[str, _Histogram] = {}
+        self._counters: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str):
+        """
+        ブロックの所要時間をフェーズとして記録（単調増加クロックで計測）
+
+        使い方:
+            with telemetry.phase("image_loading"):
+                ...
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name: str, seconds: float):
+        """フェーズの所要時間（秒）を記録"""
+        with self._lock:
+            histogram = self._phases.get(name)
+            if histogram is None:
+                histogram = self._phases[name] = _Histogram(self.window)
+            histogram.observe(seconds)
+
+    def count(self, name: str, value: float = 1):
+        """カウンターを加算"""
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def reset(self):
+        """計測データをすべて破棄"""
+        with self._lock:
+            self._phases.clear()
+            self._counters.clear()
+
+    def snapshot(self) -> dict:
+        """
+        現在の計測データ
+
+        Returns:
+            {
+                'timestamp': float,
+                'version': str,
+                'counters': {名前: 値},
+                'phases': {フェーズ名: {'count', 'sum', 'p50', 'p95', 'p99'}}   # 秒
+            }
+        """
+        with self._lock:
+            return {
+                "timestamp": time.time(),
+                "version": APP_VERSION,
+                "counters": dict(self._counters),
+                "phases": {name: h.summary() for name, h in self._phases.items()},
+            }
+
+    def to_prometheus(self) -> str:
+        """Prometheus のテキスト形式に変換"""
+        snapshot = self.snapshot()
+        ns = self.namespace
+        lines = []
+
+        if snapshot["phases"]:
+            lines.append(f"# HELP {ns}_phase_seconds Time spent in each phase.")
+            lines.append(f"# TYPE {ns}_phase_seconds summary")
+            for name, summary in sorted(snapshot["phases"].items()):
+                for q in QUANTILES:
+                    value = summary[f"p{int(q * 100)}"]
+                    lines.append(f'{ns}_phase_seconds{{phase="{name}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'{ns}_phase_seconds_sum{{phase="{name}"}} {summary["sum"]:.6f}')
+                lines.append(f'{ns}_phase_seconds_count{{phase="{name}"}} {summary["count"]}')
+
+        for name, value in sorted(snapshot["counters"].items()):
+            lines.append(f"# TYPE {ns}_{name}_total counter")
+            lines.append(f"{ns}_{name}_total {value:g}")
+
+        return "\n".join(lines) + "\n"
+
+    def export(self, path: str, format: str = "jsonl"):
+        """
+        計測データをファイルに書き出す
+
+        Args:
+            path: 出力先のパス
+            format: "jsonl"（1行追記。リリースをまたいだ推移の記録用）
+                    または "prometheus"（現在の値で置き換え。node_exporter の textfile collector 等で読む）
+        """
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        if format == "jsonl":
+            with open(path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(self.snapshot(), ensure_ascii=False) + "\n")
+        elif format == "prometheus":
+            # 読み取り側が書きかけのファイルを読まないように置き換える
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.to_prometheus())
+            os.replace(tmp_path, path)
+        else:
+            raise ValueError(f"未対応の形式です: {format}")
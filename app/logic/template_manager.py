@@ -4,11 +4,14 @@
 サムネイルテンプレートの定義と管理
 """
 
+import copy
 import os
 import yaml
 from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, field
 
+from .yaml_cache import load_yaml
+
 
 @dataclass
 class TextElement:
@@ -378,8 +381,8 @@ class TemplateManager:
     def _load_template_from_yaml(self, filepath: str) -> Optional[ThumbnailTemplate]:
         """YAMLファイルからテンプレートを読み込み"""
         try:
-            with open(filepath, "r", encoding="utf-8") as f:
-                data = yaml.safe_load(f)
+            # 変更のないファイルはキャッシュから返る（テンプレートと共有しないように複製する）
+            data = copy.deepcopy(load_yaml(filepath))
 
             text_elements = []
             for te_data in data.get("text_elements", []):
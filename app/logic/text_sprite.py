@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+"""
+テキストスプライト生成ロジック
+装飾付きテキスト（縁取り・影）を一度だけRGBA画像に描画してキャッシュする
+"""
+
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+from PIL import Image, ImageDraw
+
+
+# キャッシュするスプライトの最大数
+TEXT_SPRITE_CACHE_SIZE = 128
+
+
+@dataclass(frozen=True)
+class TextSprite:
+    """描画済みテキストスプライト"""
+    image: Image.Image  # RGBAのスプライト画像
+    offset: Tuple[int, int]  # 描画原点からスプライト左上までのオフセット
+    text_size: Tuple[int, int]  # 縁取り・影を含まないテキストの (width, height)
+
+
+class TextSpriteCache:
+    """テキストスプライトのLRUキャッシュ"""
+
+    def __init__(self, max_entries: int = TEXT_SPRITE_CACHE_SIZE):
+        """
+        Args:
+            max_entries: 保持するスプライトの最大数
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, TextSprite]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple) -> Optional[TextSprite]:
+        """キャッシュからスプライトを取得（なければNone）"""
+        with self._lock:
+            sprite = self._entries.get(key)
+            if sprite is not None:
+                self._entries.move_to_end(key)
+            return sprite
+
+    def put(self, key: tuple, sprite: TextSprite):
+        """スプライトをキャッシュに追加し、上限を超えた分を古い順に破棄"""
+        with self._lock:
+            self._entries[key] = sprite
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """キャッシュをクリア"""
+        with self._lock:
+            self._entries.clear()
+
+
+# プロセス共通のキャッシュ
+_sprite_cache = TextSpriteCache()
+
+
+def _font_key(font) -> tuple:
+    """フォントを識別するキーを作成"""
+    path = getattr(font, "path", None)
+    if path is None:
+        # デフォルトフォントなどファイルを持たないフォント
+        return ("object", id(font))
+    return (path, getattr(font, "index", 0), font.size)
+
+
+def _colored_layer(size: Tuple[int, int], color: str, mask: Image.Image) -> Image.Image:
+    """単色レイヤーにマスクをアルファとして適用"""
+    layer = Image.new("RGBA", size, color)
+    layer.putalpha(mask)
+    return layer
+
+
+def render_text_sprite(
+    text: str,
+    font,
+    font_color: str = "#FFFFFF",
+    stroke_width: int = 0,
+    stroke_color: str = "#000000",
+    shadow: bool = False,
+    shadow_offset: Tuple[int, int] = (3, 3),
+    shadow_color: str = "#000000"
+) -> TextSprite:
+    """
+    テキストをスプライトとして描画
+
+    Args:
+        text: 描画するテキスト
+        font: 使用するフォント
+        font_color: フォント色
+        stroke_width: 縁取りの太さ
+        stroke_color: 縁取りの色
+        shadow: 影をつけるかどうか
+        shadow_offset: 影のオフセット
+        shadow_color: 影の色
+
+    Returns:
+        TextSprite: 描画されたスプライト
+    """
+    measure = ImageDraw.Draw(Image.new("L", (1, 1)))
+
+    # テキスト本体・縁取り・影を含む範囲を計算
+    bbox = measure.textbbox((0, 0), text, font=font)
+    left, top, right, bottom = measure.textbbox(
+        (0, 0), text, font=font, stroke_width=stroke_width
+    )
+    if shadow:
+        sx, sy = shadow_offset
+        shadow_bbox = measure.textbbox((sx, sy), text, font=font)
+        left = min(left, shadow_bbox[0])
+        top = min(top, shadow_bbox[1])
+        right = max(right, shadow_bbox[2])
+        bottom = max(bottom, shadow_bbox[3])
+
+    size = (max(1, right - left), max(1, bottom - top))
+    origin = (-left, -top)
+    sprite = Image.new("RGBA", size, (0, 0, 0, 0))
+
+    # 影を描画
+    if shadow:
+        mask = Image.new("L", size, 0)
+        ImageDraw.Draw(mask).text(
+            (origin[0] + shadow_offset[0], origin[1] + shadow_offset[1]),
+            text, font=font, fill=255
+        )
+        sprite = Image.alpha_composite(sprite, _colored_layer(size, shadow_color, mask))
+
+    # 縁取りを描画
+    if stroke_width > 0:
+        mask = Image.new("L", size, 0)
+        ImageDraw.Draw(mask).text(
+            origin, text, font=font, fill=255,
+            stroke_width=stroke_width, stroke_fill=255
+        )
+        sprite = Image.alpha_composite(sprite, _colored_layer(size, stroke_color, mask))
+
+    # テキスト本体を描画
+    mask = Image.new("L", size, 0)
+    ImageDraw.Draw(mask).text(origin, text, font=font, fill=255)
+    sprite = Image.alpha_composite(sprite, _colored_layer(size, font_color, mask))
+
+    return TextSprite(
+        image=sprite,
+        offset=(left, top),
+        text_size=(bbox[2] - bbox[0], bbox[3] - bbox[1])
+    )
+
+
+def get_text_sprite(
+    text: str,
+    font,
+    font_color: str = "#FFFFFF",
+    stroke_width: int = 0,
+    stroke_color: str = "#000000",
+    shadow: bool = False,
+    shadow_offset: Tuple[int, int] = (3, 3),
+    shadow_color: str = "#000000"
+) -> TextSprite:
+    """
+    テキストスプライトを取得（同じ条件ならキャッシュを返す）
+
+    返されるスプライト画像は共有されるため、変更しないこと。
+    引数は render_text_sprite と同じ。
+
+    Returns:
+        TextSprite: 描画済みのスプライト
+    """
+    key = (
+        text, _font_key(font), font_color,
+        stroke_width, stroke_color if stroke_width > 0 else None,
+        (tuple(shadow_offset), shadow_color) if shadow else None
+    )
+    sprite = _sprite_cache.get(key)
+    if sprite is None:
+        sprite = render_text_sprite(
+            text, font, font_color, stroke_width, stroke_color,
+            shadow, shadow_offset, shadow_color
+        )
+        _sprite_cache.put(key, sprite)
+    return sprite
+
+
+def clear_text_sprite_cache():
+    """テキストスプライトのキャッシュをクリア"""
+    _sprite_cache.clear()
+
+
+def paste_sprite(canvas: Image.Image, sprite: Image.Image, position: Tuple[int, int]):
+    """
+    スプライトをキャンバスにアルファ合成（キャンバス外にはみ出す部分は切り捨て）
+
+    Args:
+        canvas: 合成先のRGBAキャンバス（直接変更される）
+        sprite: 合成するRGBA画像
+        position: スプライト左上の配置位置 (x, y)
+    """
+    x, y = position
+    source = (max(0, -x), max(0, -y))
+    dest = (max(0, x), max(0, y))
+    if source[0] >= sprite.width or source[1] >= sprite.height:
+        return
+    if dest[0] >= canvas.width or dest[1] >= canvas.height:
+        return
+    canvas.alpha_composite(sprite, dest=dest, source=source)
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+YAML読み込み
+LibYAMLのローダーが使える場合はそれを使い、解析結果をファイルの (パス, 更新時刻, サイズ) で
+キャッシュする。変更のないファイルの再読み込みは stat の1回で済む。
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Iterator, Optional, Tuple
+
+import yaml
+
+
+# LibYAML（C拡張）があればそのローダーを使う（なければ純Python版）
+SafeLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+# キャッシュに保持するファイル数の上限
+YAML_CACHE_ENTRIES = 128
+
+
+def parse_yaml(text: str) -> Any:
+    """
+    YAML文字列を解析（yaml.safe_load と同じ結果）
+
+    Args:
+        text: YAML文字列
+
+    Returns:
+        解析結果
+    """
+    return yaml.load(text, Loader=SafeLoader)
+
+
+def iter_yaml(stream) -> Iterator[Any]:
+    """
+    複数ドキュメント（--- 区切り）のYAMLを1つずつ解析して返す（yaml.safe_load_all と同じ結果）
+    ファイルは解析に必要な分だけ読み進めるため、全体をメモリに読み込まない
+
+    Args:
+        stream: YAML文字列またはテキストモードで開いたファイル
+
+    Yields:
+        各ドキュメントの解析結果（空のドキュメントはNone）
+    """
+    yield from yaml.load_all(stream, Loader=SafeLoader)
+
+
+class YamlCache:
+    """解析済みYAMLのキャッシュ（ファイルが変更されると読み直す）"""
+
+    def __init__(self, max_entries: int = YAML_CACHE_ENTRIES):
+        """
+        Args:
+            max_entries: 保持するファイル数の上限（超えると最も古く使われたものから破棄）
+        """
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def read(self, path: str, skip_header: Optional[Callable[[str], str]] = None) -> Tuple[str, Any]:
+        """
+        YAMLファイルを読み込んで解析
+
+        Args:
+            path: ファイルパス
+            skip_header: 解析前にファイルの内容から先頭の説明文などを取り除く関数
+                         （キャッシュは関数ごとに別になるため、モジュールレベルの関数を渡す）
+
+        Returns:
+            (ファイルの内容, 解析結果)。解析結果は呼び出し間で共有されるため変更しないこと
+
+        Raises:
+            OSError: ファイルを読めない場合
+            yaml.YAMLError: 解析できない場合（キャッシュされない）
+        """
+        key = (os.path.abspath(path), skip_header)
+        stat = os.stat(path)
+        signature = (stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+
+        with open(path, "r", encoding="utf-8") as f:
+            content = f.read()
+        data = parse_yaml(skip_header(content) if skip_header else content)
+
+        with self._lock:
+            self._entries[key] = (signature, content, data)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return content, data
+
+    def invalidate(self, path: str = None):
+        """
+        キャッシュを破棄
+
+        Args:
+            path: 指定した場合はそのファイルのみ（Noneの場合はすべて）
+        """
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                return
+            target = os.path.abspath(path)
+            for key in [key for key in self._entries if key[0] == target]:
+                del self._entries[key]
+
+
+# プロセス共通のキャッシュ
+_yaml_cache = YamlCache()
+
+
+def read_yaml(path: str, skip_header: Optional[Callable[[str], str]] = None) -> Tuple[str, Any]:
+    """
+    YAMLファイルをキャッシュを通して読み込む（YamlCache.read を参照）
+
+    Returns:
+        (ファイルの内容, 解析結果)。解析結果は共有されるため変更する場合は copy.deepcopy する
+    """
+    return _yaml_cache.read(path, skip_header)
+
+
+def load_yaml(path: str) -> Any:
+    """YAMLファイルをキャッシュを通して読み込み、解析結果を返す（変更しないこと）"""
+    return _yaml_cache.read(path)[1]
+
+
+def get_yaml_cache() -> YamlCache:
+    """プロセス共通のキャッシュを取得"""
+    return _yaml_cache
@@ -2,8 +2,18 @@
 """
 YouTubeサムネイル生成ツール
 メインエントリーポイント
+
+使い方:
+    python app/main.py                          # GUIを起動
+    python app/main.py render manifest.yaml     # マニフェストの一括描画（GUIなし）
+    python app/main.py render prompts.yaml --documents  # 複数ドキュメントのYAMLプロンプトを順に描画
+    python app/main.py jobs submit prompt.yaml  # AI画像生成ジョブを追加
+    python app/main.py jobs run                 # ジョブを処理（API Keyは環境変数 GEMINI_API_KEY）
+    python app/main.py jobs list                # ジョブの一覧
+    python app/main.py scan [output]            # YAMLと生成画像の関連付けをまとめて確認
 """
 
+import argparse
 import os
 import sys
 
@@ -11,13 +21,155 @@ import sys
 APP_ROOT = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, APP_ROOT)
 
-from ui.main_window import MainWindow
+
+def run_gui():
+    """GUIを起動"""
+    from ui.main_window import MainWindow
+    from logic.api_client import close_clients, export_telemetry
+
+    try:
+        app = MainWindow()
+        app.mainloop()
+    finally:
+        # API呼び出しの計測データを書き出し、クライアントの接続を閉じる
+        export_telemetry()
+        close_clients()
+
+
+def run_render(args) -> int:
+    """マニフェストを一括描画（customtkinterは読み込まない）"""
+    from logic.batch_renderer import render_manifest, render_prompt_documents
+
+    if args.documents:
+        results = render_prompt_documents(
+            args.manifest,
+            template=args.template,
+            output_dir=args.output,
+            templates_dir=args.templates,
+            workers=args.workers
+        )
+    else:
+        results = render_manifest(
+            args.manifest,
+            output_dir=args.output,
+            templates_dir=args.templates,
+            workers=args.workers
+        )
+    return 0 if all(r["success"] for r in results) else 1
+
+
+def run_jobs(args) -> int:
+    """AI画像生成ジョブキューの操作"""
+    from constants import API_KEY_ENV
+    from logic.job_queue import JobQueue, JobWorkerPool
+
+    queue = JobQueue()
+
+    if args.jobs_command == "submit":
+        with open(args.yaml, "r", encoding="utf-8") as f:
+            yaml_prompt = f.read()
+        # ジョブは別のディレクトリから実行されることがあるため、パスは絶対パスで記録する
+        job_id = queue.submit(
+            yaml_prompt,
+            char_image_paths=[os.path.abspath(path) for path in args.character],
+            resolution=args.resolution,
+            ref_image_path=os.path.abspath(args.ref) if args.ref else None,
+            yaml_path=os.path.abspath(args.yaml)
+        )
+        print(f"ジョブを追加しました: #{job_id}")
+        return 0
+
+    if args.jobs_command == "run":
+        api_key = os.environ.get(API_KEY_ENV)
+        if not api_key:
+            print(f"環境変数 {API_KEY_ENV} にAPI Keyを設定してください。")
+            return 1
+
+        def report(job):
+            detail = job.result_path or job.error or ""
+            print(f"  #{job.id:05d} {job.status:<8} {detail}")
+
+        pool = JobWorkerPool(queue, api_key, workers=args.workers, on_update=report)
+        resumed = pool.start()
+        if resumed:
+            print(f"前回の未完了ジョブを{resumed}件再開します。")
+        try:
+            pool.wait_until_idle()
+        except KeyboardInterrupt:
+            print("中断しました（未完了のジョブは次回再開されます）。")
+        finally:
+            pool.stop(timeout=0)
+            from logic.api_client import close_clients, export_telemetry
+            export_telemetry()
+            close_clients()
+        # 以前の実行で失敗したジョブは含めず、今回の実行の結果だけで判定する
+        return 0 if not pool.failed else 1
+
+    for job in queue.list_jobs(status=args.status):
+        seconds = f"{job.seconds:6.1f} s" if job.seconds is not None else "       -"
+        detail = job.result_path or job.error or ""
+        print(f"#{job.id:05d} {job.status:<8} {job.resolution:<3} {seconds}  {detail}")
+    return 0
+
+
+def run_scan(args) -> int:
+    """YAMLと生成画像の関連付けをまとめて確認"""
+    import json
+    from logic.library_scanner import scan_library
+
+    report = scan_library(args.root, workers=args.workers, full=args.full)
+    print(report.format_text())
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report.to_dict(), f, ensure_ascii=False, indent=2)
+    problems = report.mismatches or report.stale_links
+    return 1 if problems else 0
 
 
 def main():
     """メイン関数"""
-    app = MainWindow()
-    app.mainloop()
+    parser = argparse.ArgumentParser(description="YouTube Thumbnail Generator")
+    subparsers = parser.add_subparsers(dest="command")
+
+    render_parser = subparsers.add_parser("render", help="マニフェスト（YAML/CSV）のサムネイルを一括描画")
+    render_parser.add_argument("manifest", help="マニフェストファイルのパス")
+    render_parser.add_argument("--output", "-o", default=None, help="出力ディレクトリ（既定: output）")
+    render_parser.add_argument("--templates", default=None, help="カスタムテンプレートのディレクトリ（既定: templates）")
+    render_parser.add_argument("--workers", "-j", type=int, default=None, help="ワーカープロセス数（既定: CPU数）")
+    render_parser.add_argument(
+        "--documents", action="store_true",
+        help="マニフェストの代わりに複数ドキュメント（--- 区切り）のYAMLプロンプトを1件ずつ解析しながら描画"
+    )
+    render_parser.add_argument("--template", default="new_song", help="--documents でテンプレートの指定がない場合のテンプレートID")
+
+    jobs_parser = subparsers.add_parser("jobs", help="AI画像生成ジョブキューの操作")
+    jobs_subparsers = jobs_parser.add_subparsers(dest="jobs_command", required=True)
+    submit_parser = jobs_subparsers.add_parser("submit", help="YAMLプロンプトからジョブを追加")
+    submit_parser.add_argument("yaml", help="YAMLプロンプトファイルのパス（完成後にメタデータで関連付ける）")
+    submit_parser.add_argument("--resolution", default="2K", choices=["1K", "2K", "4K"], help="解像度")
+    submit_parser.add_argument("--ref", default=None, help="参考画像（清書モード）のパス")
+    submit_parser.add_argument("--character", action="append", default=[], help="キャラクター参照画像（複数指定可）")
+    run_parser = jobs_subparsers.add_parser("run", help="待機中のジョブをすべて処理")
+    run_parser.add_argument("--workers", "-j", type=int, default=2, help="ワーカースレッド数")
+    list_parser = jobs_subparsers.add_parser("list", help="ジョブの一覧")
+    list_parser.add_argument("--status", default=None, choices=["pending", "running", "done", "failed"])
+
+    scan_parser = subparsers.add_parser("scan", help="YAMLと生成画像の関連付けをまとめて確認")
+    scan_parser.add_argument("root", nargs="?", default=None, help="走査するフォルダ（既定: プロジェクト直下の output）")
+    scan_parser.add_argument("--workers", "-j", type=int, default=8, help="ファイルを読み込むスレッド数")
+    scan_parser.add_argument("--full", action="store_true", help="前回の結果を使わずにすべて読み直す")
+    scan_parser.add_argument("--json", default=None, help="報告をJSONで書き出すパス")
+
+    args = parser.parse_args()
+
+    if args.command == "render":
+        sys.exit(run_render(args))
+    elif args.command == "jobs":
+        sys.exit(run_jobs(args))
+    elif args.command == "scan":
+        sys.exit(run_scan(args))
+    else:
+        run_gui()
 
 
 if __name__ == "__main__":
@@ -18,6 +18,8 @@ from constants import (
     UI_SETTINGS, COLORS, PATHS
 )
 from logic.image_composer import ImageComposer
+from logic.scene import Scene
+from ui.preview_scheduler import PreviewScheduler
 
 
 # テキストスタイルプリセット
@@ -104,7 +106,17 @@ class MainWindow(ctk.CTk):
         # 状態変数
         self.background_image_path: str = None
         self.preview_image = None
-        self.image_composer = ImageComposer(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+        # プレビュー用のシーン（変更のあった領域だけを再合成する）
+        self.preview_scene = Scene()
+
+        # プレビューはワーカースレッドで描画し、最新のフレームだけを反映する
+        self.preview_scheduler = PreviewScheduler(
+            self,
+            render=self._render_preview,
+            on_result=self._show_preview,
+            debounce_ms=UI_SETTINGS["preview_debounce_ms"]
+        )
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
         # UIの構築
         self._setup_ui()
@@ -392,56 +404,109 @@ class MainWindow(ctk.CTk):
             initialdir=self.base_path
         )
         if filepath:
-            self.background_image_path = filepath
-            self.bg_path_label.configure(text=os.path.basename(filepath))
-            self._update_preview()
+            self.set_background_image(filepath)
 
     def _load_preset_background(self, filename: str):
         """プリセット背景を読み込み"""
         filepath = os.path.join(self.base_path, filename)
         if os.path.exists(filepath):
-            self.background_image_path = filepath
-            self.bg_path_label.configure(text=filename)
-            self._update_preview()
+            self.set_background_image(filepath)
+
+    def set_background_image(self, filepath: str):
+        """
+        背景画像を設定してプレビューを更新
+
+        Args:
+            filepath: 背景画像のパス（生成したドラフトのパスも指定できる）
+        """
+        self.background_image_path = filepath
+        self.bg_path_label.configure(text=os.path.basename(filepath))
+        self._update_preview()
 
     def _update_preview(self):
-        """プレビューを更新"""
-        # 新しいコンポーザーを作成
-        self.image_composer = ImageComposer(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT)
+        """プレビューの更新をリクエスト（入力はデバウンスされ、ワーカーで描画される）"""
+        self.preview_scheduler.request(self._collect_render_params())
+
+    def _render_preview(self, params: dict) -> Image.Image:
+        """プレビュー解像度で描画（ワーカースレッドで実行、ウィジェットに触れない）"""
+        composer = self._compose_thumbnail(
+            params, UI_SETTINGS["preview_scale"], self.preview_scene
+        )
+        return composer.get_image()
+
+    def _show_preview(self, preview_img: Image.Image):
+        """描画済みのプレビューを表示（メインスレッド）"""
+        if preview_img:
+            preview_width = int(THUMBNAIL_WIDTH * UI_SETTINGS["preview_scale"])
+            preview_height = int(THUMBNAIL_HEIGHT * UI_SETTINGS["preview_scale"])
+
+            self.preview_image = ctk.CTkImage(
+                light_image=preview_img,
+                dark_image=preview_img,
+                size=(preview_width, preview_height)
+            )
+            self.preview_canvas.configure(image=self.preview_image, text="")
+
+    def _collect_render_params(self) -> dict:
+        """現在のUIの入力を取り出す（メインスレッドで呼ぶ）"""
+        return {
+            "background_image_path": self.background_image_path,
+            "style": self.style_var.get(),
+            "position": self.position_var.get(),
+            "title": self.title_entry.get(),
+            "artist": self.artist_entry.get(),
+            "subtitle": self.subtitle_entry.get() if self.subtitle_var.get() else "",
+            "date": self.date_entry.get() if self.date_var.get() else "",
+            "description": self.desc_entry.get() if self.desc_var.get() else "",
+        }
+
+    def _compose_thumbnail(self, params: dict, scale: float = 1.0, scene: Scene = None) -> ImageComposer:
+        """
+        サムネイルを合成
+
+        Args:
+            params: _collect_render_params() で取り出した入力
+            scale: 描画倍率（プレビューは縮小、出力は1.0）
+            scene: 差分合成に使うシーン（Noneの場合はキャンバスに直接描画）
+
+        Returns:
+            ImageComposer: 合成済みのコンポーザー
+        """
+        composer = ImageComposer(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT, scale=scale, scene=scene)
 
         # 背景を設定
-        if self.background_image_path:
-            self.image_composer.set_background_image(self.background_image_path)
+        if params["background_image_path"]:
+            composer.set_background_image(params["background_image_path"])
         else:
-            self.image_composer.create_canvas("#1a1a2e")
+            composer.create_canvas("#1a1a2e")
 
         # スタイルと位置を取得
-        style = TEXT_STYLES.get(self.style_var.get(), TEXT_STYLES["インパクト"])
-        position = TEXT_POSITIONS.get(self.position_var.get(), TEXT_POSITIONS["左上"])
+        style = TEXT_STYLES.get(params["style"], TEXT_STYLES["インパクト"])
+        position = TEXT_POSITIONS.get(params["position"], TEXT_POSITIONS["左上"])
 
         # オプションテキストのY位置オフセット計算
         y_offset = 0
 
         # 副題（オプション）
-        if self.subtitle_var.get():
-            subtitle_text = self.subtitle_entry.get()
-            if subtitle_text:
-                subtitle_y = position["title"][1] - 60
-                self.image_composer.add_text(
-                    text=subtitle_text,
-                    position=(position["title"][0], subtitle_y),
-                    font_size=28,
-                    font_color="#FFFFFF",
-                    anchor=position["anchor"],
-                    stroke_width=2,
-                    stroke_color="#000000",
-                    shadow=False
-                )
+        subtitle_text = params["subtitle"]
+        if subtitle_text:
+            subtitle_y = position["title"][1] - 60
+            composer.add_text(
+                text=subtitle_text,
+                position=(position["title"][0], subtitle_y),
+                font_size=28,
+                font_color="#FFFFFF",
+                anchor=position["anchor"],
+                stroke_width=2,
+                stroke_color="#000000",
+                shadow=False,
+                node_id="subtitle"
+            )
 
         # 曲タイトル（メイン）
-        title_text = self.title_entry.get()
+        title_text = params["title"]
         if title_text:
-            self.image_composer.add_text(
+            composer.add_text(
                 text=title_text,
                 position=position["title"],
                 font_size=style["font_size_title"],
@@ -451,13 +516,14 @@ class MainWindow(ctk.CTk):
                 stroke_color=style["stroke_color"],
                 shadow=style["shadow"],
                 shadow_offset=style["shadow_offset"],
-                shadow_color=style["shadow_color"]
+                shadow_color=style["shadow_color"],
+                node_id="title"
             )
 
         # アーティスト名（メイン）
-        artist_text = self.artist_entry.get()
+        artist_text = params["artist"]
         if artist_text:
-            self.image_composer.add_text(
+            composer.add_text(
                 text=artist_text,
                 position=position["artist"],
                 font_size=style["font_size_artist"],
@@ -467,61 +533,49 @@ class MainWindow(ctk.CTk):
                 stroke_color=style["stroke_color"],
                 shadow=style["shadow"],
                 shadow_offset=style["shadow_offset"],
-                shadow_color=style["shadow_color"]
+                shadow_color=style["shadow_color"],
+                node_id="artist"
             )
 
         # 曲の説明（オプション）
-        if self.desc_var.get():
-            desc_text = self.desc_entry.get()
-            if desc_text:
-                desc_y = position["artist"][1] + 70
-                self.image_composer.add_text(
-                    text=desc_text,
-                    position=(position["artist"][0], desc_y),
-                    font_size=24,
-                    font_color="#FFFFFF",
-                    anchor=position["anchor"],
-                    stroke_width=2,
-                    stroke_color="#000000",
-                    shadow=False
-                )
+        desc_text = params["description"]
+        if desc_text:
+            desc_y = position["artist"][1] + 70
+            composer.add_text(
+                text=desc_text,
+                position=(position["artist"][0], desc_y),
+                font_size=24,
+                font_color="#FFFFFF",
+                anchor=position["anchor"],
+                stroke_width=2,
+                stroke_color="#000000",
+                shadow=False,
+                node_id="description"
+            )
 
         # 公開日（オプション）
-        if self.date_var.get():
-            date_text = self.date_entry.get()
-            if date_text:
-                # 右下に配置
-                self.image_composer.add_text(
-                    text=date_text,
-                    position=(1230, 670),
-                    font_size=24,
-                    font_color="#FFEB3B",
-                    anchor="right",
-                    stroke_width=2,
-                    stroke_color="#000000",
-                    shadow=False
-                )
-
-        # プレビュー画像を更新
-        preview_img = self.image_composer.get_image()
-        if preview_img:
-            preview_width = int(THUMBNAIL_WIDTH * UI_SETTINGS["preview_scale"])
-            preview_height = int(THUMBNAIL_HEIGHT * UI_SETTINGS["preview_scale"])
-            preview_img = preview_img.resize(
-                (preview_width, preview_height),
-                Image.Resampling.LANCZOS
+        date_text = params["date"]
+        if date_text:
+            # 右下に配置
+            composer.add_text(
+                text=date_text,
+                position=(1230, 670),
+                font_size=24,
+                font_color="#FFEB3B",
+                anchor="right",
+                stroke_width=2,
+                stroke_color="#000000",
+                shadow=False,
+                node_id="date"
             )
 
-            self.preview_image = ctk.CTkImage(
-                light_image=preview_img,
-                dark_image=preview_img,
-                size=(preview_width, preview_height)
-            )
-            self.preview_canvas.configure(image=self.preview_image, text="")
+        return composer
 
     def _save_image(self, format: str):
         """画像を保存"""
-        if not self.image_composer.get_image():
+        # 出力はフル解像度で描画し直す
+        composer = self._compose_thumbnail(self._collect_render_params(), 1.0)
+        if not composer.get_image():
             messagebox.showwarning("警告", "保存する画像がありません。")
             return
 
@@ -546,7 +600,12 @@ class MainWindow(ctk.CTk):
         )
 
         if filepath:
-            if self.image_composer.save(filepath, format):
+            if composer.save(filepath, format):
                 messagebox.showinfo("完了", f"画像を保存しました:\n{filepath}")
             else:
                 messagebox.showerror("エラー", "画像の保存に失敗しました。")
+
+    def _on_close(self):
+        """ウィンドウを閉じる"""
+        self.preview_scheduler.shutdown()
+        self.destroy()
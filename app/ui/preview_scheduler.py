@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+"""
+プレビュー描画スケジューラ
+入力をデバウンスし、ワーカースレッドで描画して最新のフレームだけをUIに返す
+"""
+
+import queue
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+class PreviewScheduler:
+    """デバウンス・キャンセル可能なプレビュー描画スケジューラ"""
+
+    # 描画中に結果を確認する間隔（ミリ秒）
+    POLL_INTERVAL_MS = 15
+
+    def __init__(
+        self,
+        widget,
+        render: Callable[[Any], Any],
+        on_result: Callable[[Any], None],
+        debounce_ms: int = 120
+    ):
+        """
+        Args:
+            widget: after() を提供するTkウィジェット（メインスレッドで使う）
+            render: ワーカースレッドで実行する描画関数（引数は request() に渡した値）。
+                    Tkウィジェットには触れないこと
+            on_result: 最新の描画結果を受け取るコールバック（メインスレッドで呼ばれる）
+            debounce_ms: 最後の入力から描画開始までの待ち時間
+        """
+        self.widget = widget
+        self.render = render
+        self.on_result = on_result
+        self.debounce_ms = debounce_ms
+
+        self._generation = 0  # 最新のリクエスト番号
+        self._pending_params = None
+        self._debounce_id: Optional[str] = None
+        self._poll_id: Optional[str] = None
+        self._in_flight = 0
+
+        # ワーカーへの受け渡し（常に最新の1件だけを保持する）
+        self._job_lock = threading.Condition()
+        self._job: Optional[tuple] = None
+        self._closed = False
+
+        self._results: "queue.Queue[tuple]" = queue.Queue()
+
+        # 統計情報
+        self.stats: Dict[str, int] = {
+            "requested": 0,   # request() の呼び出し回数
+            "coalesced": 0,   # デバウンスでまとめられたリクエスト数
+            "dropped": 0,     # 新しいリクエストに追い越されて破棄されたフレーム数
+            "rendered": 0,    # 描画したフレーム数
+            "delivered": 0,   # UIに反映したフレーム数
+            "errors": 0,      # 描画中のエラー数
+        }
+
+        self._worker = threading.Thread(target=self._run, name="preview-worker", daemon=True)
+        self._worker.start()
+
+    def request(self, params: Any = None):
+        """
+        描画をリクエスト（メインスレッドから呼ぶ）
+
+        Args:
+            params: 描画関数に渡す値（UIから取り出した入力のスナップショット）
+        """
+        self.stats["requested"] += 1
+        self._generation += 1
+        self._pending_params = params
+
+        if self._debounce_id is not None:
+            self.widget.after_cancel(self._debounce_id)
+            self.stats["coalesced"] += 1
+        self._debounce_id = self.widget.after(self.debounce_ms, self._submit)
+
+    def flush(self):
+        """待機中のリクエストをデバウンスせずにすぐ送る"""
+        if self._debounce_id is not None:
+            self.widget.after_cancel(self._debounce_id)
+            self._submit()
+
+    def _submit(self):
+        """デバウンス後、ワーカーにジョブを渡す"""
+        self._debounce_id = None
+        with self._job_lock:
+            if self._job is not None:
+                # まだ描画されていない古いジョブは置き換える
+                self.stats["dropped"] += 1
+                self._in_flight -= 1
+            self._job = (self._generation, self._pending_params)
+            self._in_flight += 1
+            self._job_lock.notify()
+
+        if self._poll_id is None:
+            self._poll_id = self.widget.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def _run(self):
+        """ワーカースレッドのメインループ"""
+        while True:
+            with self._job_lock:
+                while self._job is None and not self._closed:
+                    self._job_lock.wait()
+                if self._closed:
+                    return
+                generation, params = self._job
+                self._job = None
+
+            # 既に新しいリクエストがあれば描画しない
+            if generation != self._generation:
+                self._results.put((generation, None, None))
+                continue
+
+            try:
+                result = self.render(params)
+                self._results.put((generation, result, None))
+            except Exception as e:
+                self._results.put((generation, None, e))
+
+    def _poll(self):
+        """描画結果を取り出し、最新のものだけをUIに反映（メインスレッド）"""
+        self._poll_id = None
+        latest = None
+
+        while True:
+            try:
+                generation, result, error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._in_flight -= 1
+
+            if error is not None:
+                self.stats["errors"] += 1
+                print(f"プレビュー描画エラー: {error}")
+                continue
+            if result is None:
+                self.stats["dropped"] += 1
+                continue
+
+            self.stats["rendered"] += 1
+            if latest is not None:
+                self.stats["dropped"] += 1
+            latest = (generation, result)
+
+        if latest is not None:
+            generation, result = latest
+            if generation == self._generation:
+                self.stats["delivered"] += 1
+                self.on_result(result)
+            else:
+                self.stats["dropped"] += 1
+
+        if self._in_flight > 0 and not self._closed:
+            self._poll_id = self.widget.after(self.POLL_INTERVAL_MS, self._poll)
+
+    def shutdown(self):
+        """ワーカースレッドを停止し、予約中のコールバックを取り消す"""
+        for after_id in (self._debounce_id, self._poll_id):
+            if after_id is not None:
+                try:
+                    self.widget.after_cancel(after_id)
+                except Exception:
+                    pass
+        self._debounce_id = None
+        self._poll_id = None
+
+        with self._job_lock:
+            self._closed = True
+            self._job_lock.notify()
+        self._worker.join(timeout=1.0)
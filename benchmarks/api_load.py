@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+API呼び出しの負荷試験
+
+ローカルのモックGeminiエンドポイントに対して generate_image_with_api() を並行して呼び出し、
+1呼び出しあたりのレイテンシ（p50/p95/p99）とスループット、結果の内訳を表示する。
+
+使い方:
+    python benchmarks/api_load.py [--requests 200] [--concurrency 8]
+                                  [--latency-ms 50] [--latency-sigma 0.5]
+                                  [--error-rate 0.05] [--safety-rate 0.02]
+                                  [--image procedural] [--resolution 1K]
+                                  [--telemetry api.prom --telemetry-format prometheus]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from constants import API_BASE_URL_ENV
+from logic import api_client
+from mock_gemini import isolated_response_cache, start_mock_server
+
+
+API_KEY = "mock-api-key-for-benchmark"
+
+
+def _call(index: int, resolution: str) -> tuple:
+    """1回呼び出して (所要時間ミリ秒, 結果) を返す"""
+    start = time.perf_counter()
+    result = api_client.generate_image_with_api(
+        API_KEY, f"prompt: load test {index}", [], resolution, use_cache=False
+    )
+    return (time.perf_counter() - start) * 1000, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="generate_image_with_api() の負荷試験（モックエンドポイント）")
+    parser.add_argument("--requests", type=int, default=200, help="リクエスト数")
+    parser.add_argument("--concurrency", type=int, default=8, help="同時に呼び出すスレッド数")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="サーバー処理時間の中央値")
+    parser.add_argument("--latency-sigma", type=float, default=0.5, help="サーバー処理時間のばらつき（対数正規分布のσ）")
+    parser.add_argument("--error-rate", type=float, default=0.05, help="HTTPエラー（429/503）の割合")
+    parser.add_argument("--safety-rate", type=float, default=0.02, help="安全性フィルターでブロックする割合")
+    parser.add_argument("--image", choices=["canned", "procedural"], default="canned", help="返す画像")
+    parser.add_argument("--resolution", default="1K", help="要求する解像度")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    parser.add_argument("--telemetry", help="フェーズごとの計測データの書き出し先")
+    parser.add_argument("--telemetry-format", choices=["jsonl", "prometheus"], default="jsonl", help="計測データの形式")
+    args = parser.parse_args()
+
+    server = start_mock_server(
+        latency=args.latency_ms / 1000,
+        latency_sigma=args.latency_sigma,
+        error_rate=args.error_rate,
+        error_statuses=(429, 503),
+        safety_rate=args.safety_rate,
+        image_mode=args.image,
+        seed=args.seed
+    )
+    os.environ[API_BASE_URL_ENV] = server.base_url
+
+    # 負荷試験では流量制限を外し、バックオフも短くする
+    guard = api_client.get_request_guard()
+    guard.configure(
+        rate_per_minute=args.requests * 600, burst=args.concurrency,
+        base_delay=0.01, max_delay=0.1, failure_threshold=args.requests
+    )
+
+    print(
+        f"モックエンドポイント: {server.base_url}  {args.requests}リクエスト  並列数 {args.concurrency}  "
+        f"処理時間 {args.latency_ms:.0f} ms (σ={args.latency_sigma})  "
+        f"エラー率 {args.error_rate:.0%}  ブロック率 {args.safety_rate:.0%}"
+    )
+
+    try:
+        with isolated_response_cache():
+            start = time.perf_counter()
+            with contextlib.redirect_stdout(io.StringIO()):
+                with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+                    results = list(executor.map(
+                        lambda i: _call(i, args.resolution), range(args.requests)
+                    ))
+            elapsed = time.perf_counter() - start
+    finally:
+        api_client.close_clients()
+        server.shutdown()
+        server.server_close()
+
+    timings = [ms for ms, _ in results]
+    quantiles = statistics.quantiles(timings, n=100, method="inclusive")
+    succeeded = sum(1 for _, result in results if result["success"])
+    stats = guard.get_stats()
+
+    print(
+        f"  latency  p50 {quantiles[49]:7.1f} ms  p95 {quantiles[94]:7.1f} ms  "
+        f"p99 {quantiles[98]:7.1f} ms  max {max(timings):7.1f} ms"
+    )
+    print(f"  throughput {len(results) / elapsed:7.1f} req/s  ({elapsed:.2f} s)")
+    print(
+        f"  success {succeeded}/{len(results)}  "
+        f"HTTP requests {server.request_count}  retries {stats['retries']}"
+    )
+    print("  server outcomes: " + "  ".join(f"{k} {v}" for k, v in sorted(server.outcomes.items())))
+
+    telemetry = api_client.get_telemetry()
+    snapshot = telemetry.snapshot()
+    for phase, summary in snapshot["phases"].items():
+        print(
+            f"  {phase:<16} p50 {summary['p50'] * 1000:7.1f} ms  p95 {summary['p95'] * 1000:7.1f} ms  "
+            f"p99 {summary['p99'] * 1000:7.1f} ms"
+        )
+    counters = snapshot["counters"]
+    print(
+        f"  HTTP upload {counters.get('http_upload_bytes', 0) / 1024:.0f} KB  "
+        f"download {counters.get('http_download_bytes', 0) / 1024:.0f} KB"
+    )
+    if args.telemetry:
+        telemetry.export(args.telemetry, args.telemetry_format)
+        print(f"  計測データ: {args.telemetry}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+API呼び出しの流量制限・再試行・サーキットブレーカーの動作確認
+
+ローカルのモックGeminiエンドポイントのエラー率を切り替えながら generate_image_with_api() を呼び出し、
+一時的なエラーからの回復、障害時の即時失敗、障害からの復帰を確認して統計情報を表示する。
+
+使い方:
+    python benchmarks/api_resilience.py [--requests 20] [--error-rate 0.3]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from constants import API_BASE_URL_ENV
+from logic import api_client
+from mock_gemini import isolated_response_cache, start_mock_server
+
+
+API_KEY = "mock-api-key-for-benchmark"
+
+# 計測用に待ち時間を短くした設定
+SETTINGS = {
+    "rate_per_minute": 1200,
+    "burst": 5,
+    "max_attempts": 4,
+    "base_delay": 0.05,
+    "max_delay": 0.5,
+    "failure_threshold": 5,
+    "reset_timeout": 1.0,
+}
+
+
+def _run_phase(label: str, server, requests: int, error_rate: float):
+    """エラー率を設定して指定回数呼び出し、結果を表示"""
+    server.error_rate = error_rate
+    guard = api_client.get_request_guard()
+    before = guard.get_stats()
+    requests_before = server.request_count
+
+    succeeded = 0
+    start = time.perf_counter()
+    for i in range(requests):
+        # 呼び出しごとのログは表示しない
+        with contextlib.redirect_stdout(io.StringIO()):
+            result = api_client.generate_image_with_api(
+                API_KEY, f"prompt: {label} {i}", [], "1K", use_cache=False
+            )
+        succeeded += result["success"]
+    elapsed = time.perf_counter() - start
+
+    stats = guard.get_stats()
+    print(
+        f"  {label:<10} error rate {error_rate:4.0%}  success {succeeded}/{requests}  "
+        f"{elapsed * 1000 / requests:7.1f} ms/call  "
+        f"HTTP requests {server.request_count - requests_before}  "
+        f"retries {stats['retries'] - before['retries']}  "
+        f"rejected {stats['circuit_rejections'] - before['circuit_rejections']}  "
+        f"circuit {stats['circuit_state']}"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API呼び出しの再試行・サーキットブレーカーの動作確認")
+    parser.add_argument("--requests", type=int, default=20, help="各フェーズのリクエスト数")
+    parser.add_argument("--error-rate", type=float, default=0.3, help="一時的なエラーの割合")
+    args = parser.parse_args()
+
+    server = start_mock_server(seed=0)
+    os.environ[API_BASE_URL_ENV] = server.base_url
+    api_client.get_request_guard().configure(**SETTINGS)
+    print(f"モックエンドポイント: {server.base_url}")
+
+    try:
+        with isolated_response_cache():
+            _run_phase("flaky", server, args.requests, args.error_rate)
+            _run_phase("outage", server, args.requests, 1.0)
+
+            # サーキットブレーカーが試行を再開するまで待ってから復帰を確認
+            time.sleep(SETTINGS["reset_timeout"])
+            _run_phase("recovery", server, args.requests, 0.0)
+    finally:
+        api_client.close_clients()
+        server.shutdown()
+        server.server_close()
+
+    stats = api_client.get_request_guard().get_stats()
+    print(
+        f"合計: attempts {stats['attempts']}  retries {stats['retries']}  failures {stats['failures']}  "
+        f"rate-limit waits {stats['rate_limit_waits']} ({stats['rate_limit_wait_seconds']:.2f} s)  "
+        f"backoff {stats['backoff_wait_seconds']:.2f} s  "
+        f"circuit open {stats['circuit_open_seconds']:.2f} s"
+    )
+
+
+if __name__ == "__main__":
+    main()
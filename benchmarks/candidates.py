@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+複数候補の生成と評価のベンチマーク
+
+ローカルのモックGeminiエンドポイントから、N回の呼び出しで1枚ずつ取得する方法と、
+1回の呼び出しでN個の候補を取得する generate_candidates() の所要時間を比較し、
+候補のデコード・評価を逐次で行った場合とスレッドプールで並行して行った場合の時間も表示する。
+
+使い方:
+    python benchmarks/candidates.py [--candidates 4] [--resolution 2K] [--latency-ms 2000]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from constants import API_BASE_URL_ENV
+from logic import api_client
+from logic.candidate_ranking import rank_candidates, rank_scores, score_image
+from logic.generated_image import GeneratedImage
+from mock_gemini import isolated_response_cache, start_mock_server
+
+
+API_KEY = "mock-api-key-for-benchmark"
+
+# main_window の TEXT_POSITIONS["左上"] と同じ配置
+TEXT_POSITIONS = [{"title": (50, 120), "artist": (50, 220), "anchor": "left"}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="複数候補の生成と評価の所要時間（モックエンドポイント）")
+    parser.add_argument("--candidates", type=int, default=4, help="候補数")
+    parser.add_argument("--resolution", default="2K", help="要求する解像度")
+    parser.add_argument("--latency-ms", type=float, default=2000.0, help="1呼び出しあたりのサーバー処理時間")
+    args = parser.parse_args()
+
+    server = start_mock_server(latency=args.latency_ms / 1000, image_mode="procedural")
+    os.environ[API_BASE_URL_ENV] = server.base_url
+    api_client.get_request_guard().configure(rate_per_minute=6000, burst=100)
+    print(
+        f"モックエンドポイント: {server.base_url}  候補 {args.candidates}  "
+        f"{args.resolution}  処理時間 {args.latency_ms:.0f} ms"
+    )
+
+    try:
+        with isolated_response_cache():
+            with contextlib.redirect_stdout(io.StringIO()):
+                start = time.perf_counter()
+                for index in range(args.candidates):
+                    result = api_client.generate_image_with_api(
+                        API_KEY, f"prompt: candidates #{index}", [], args.resolution, use_cache=False
+                    )
+                    result["image"].decode()
+                sequential = time.perf_counter() - start
+
+                start = time.perf_counter()
+                result = api_client.generate_candidates(
+                    API_KEY, "prompt: candidates", [], args.resolution,
+                    candidate_count=args.candidates, text_positions=TEXT_POSITIONS
+                )
+                batched = time.perf_counter() - start
+    finally:
+        api_client.close_clients()
+        server.shutdown()
+        server.server_close()
+
+    if not result["success"]:
+        print(f"生成に失敗しました: {result['error']}")
+        sys.exit(1)
+
+    print(f"  {args.candidates} calls x 1 image   {sequential * 1000:8.0f} ms")
+    print(f"  1 call x {args.candidates} candidates  {batched * 1000:8.0f} ms  (デコード・評価を含む)")
+
+    # デコード・評価のみの比較（毎回デコード前の状態から）
+    data = [(c["image"].data, c["image"].mime_type) for c in result["candidates"]]
+
+    start = time.perf_counter()
+    rank_scores([
+        score_image(GeneratedImage(d, m), TEXT_POSITIONS, i) for i, (d, m) in enumerate(data)
+    ])
+    serial = time.perf_counter() - start
+
+    start = time.perf_counter()
+    rank_candidates([GeneratedImage(d, m) for d, m in data], TEXT_POSITIONS)
+    parallel = time.perf_counter() - start
+
+    print(f"  decode+rank serial    {serial * 1000:8.1f} ms")
+    print(f"  decode+rank parallel  {parallel * 1000:8.1f} ms")
+    for candidate in result["candidates"]:
+        score = candidate["score"]
+        print(
+            f"    #{score.index}  score {score.score:5.2f}  sharpness {score.sharpness:7.1f}  "
+            f"contrast {score.contrast:5.3f}  free_space {score.free_space:5.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
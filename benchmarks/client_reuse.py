@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+APIクライアント再利用のベンチマーク
+
+ローカルのモックGeminiエンドポイントに対して generate_image_with_api() を繰り返し呼び出し、
+毎回クライアントを作り直す従来の方法と、プールしたクライアントを再利用する方法の
+1リクエストあたりの所要時間とTCP接続数を比較する。
+
+使い方:
+    python benchmarks/client_reuse.py [--requests 50]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from constants import API_BASE_URL_ENV
+from logic import api_client
+from mock_gemini import isolated_response_cache, start_mock_server
+
+
+API_KEY = "mock-api-key-for-benchmark"
+
+
+def _measure(requests: int, reuse: bool) -> list:
+    """generate_image_with_api() を繰り返し呼び出して所要時間（ミリ秒）を返す"""
+    timings = []
+    for _ in range(requests):
+        if not reuse:
+            # 従来方式の再現: 呼び出しごとに新しいクライアント（と接続）を作る
+            api_client.close_clients()
+
+        start = time.perf_counter()
+        result = api_client.generate_image_with_api(API_KEY, "prompt: benchmark", [], use_cache=False)
+        timings.append((time.perf_counter() - start) * 1000)
+
+        if not result["success"]:
+            raise RuntimeError(result["error"])
+
+    api_client.close_clients()
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="APIクライアント再利用の有無による1リクエストあたりの所要時間の比較")
+    parser.add_argument("--requests", type=int, default=50, help="計測するリクエスト数")
+    args = parser.parse_args()
+
+    server = start_mock_server()
+    os.environ[API_BASE_URL_ENV] = server.base_url
+    # 流量制限で待たないようにする
+    api_client.get_request_guard().configure(rate_per_minute=args.requests * 600, burst=args.requests)
+    print(f"モックエンドポイント: {server.base_url}  {args.requests}リクエスト")
+
+    try:
+        with isolated_response_cache():
+            # ウォームアップ
+            _measure(3, reuse=True)
+
+            for label, reuse in [("new client", False), ("pooled client", True)]:
+                connections_before = server.connection_count
+                timings = _measure(args.requests, reuse)
+                print(
+                    f"  {label:<14} mean {statistics.mean(timings):6.2f} ms  "
+                    f"median {statistics.median(timings):6.2f} ms  "
+                    f"connections {server.connection_count - connections_before}"
+                )
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+大きな画像のデコードのベンチマーク
+
+フル解像度でデコードしてからLANCZOSで縮小する従来の方法と、
+draft / reduce() で縮小デコードしてから仕上げる方法の
+処理時間とピークメモリ（RSS）を比較する。
+
+各方式は別プロセスで実行し、プロセスごとのピークRSSを計測する（macOS/Linux）。
+
+使い方:
+    python benchmarks/decode_large.py [画像のパス ...] [--size 1280x720]
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from PIL import Image
+
+from logic.background_cache import fit_background
+from logic.image_loader import load_image
+
+
+def _peak_rss_mb() -> float:
+    """このプロセスのピークRSS（MB）"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOSはバイト、Linuxはキロバイト単位
+    if sys.platform == "darwin":
+        return peak / (1024 * 1024)
+    return peak / 1024
+
+
+def _decode_full(image_path: str, size: tuple):
+    """従来方式: フル解像度でデコードしてから縮小"""
+    with Image.open(image_path) as source:
+        return fit_background(source.convert("RGBA"), size, "cover")
+
+
+def _decode_reduced(image_path: str, size: tuple):
+    """新方式: 縮小デコードしてから仕上げ"""
+    return fit_background(load_image(image_path, size, "cover"), size, "cover")
+
+
+def _run(decode, image_path: str, size: tuple, queue):
+    """子プロセスで1回デコードし、時間とピークRSSを返す"""
+    baseline = _peak_rss_mb()
+    start = time.perf_counter()
+    decode(image_path, size)
+    elapsed = (time.perf_counter() - start) * 1000
+    queue.put((elapsed, _peak_rss_mb(), baseline))
+
+
+def _measure(decode, image_path: str, size: tuple) -> tuple:
+    """別プロセスで計測"""
+    queue = multiprocessing.Queue()
+    process = multiprocessing.Process(target=_run, args=(decode, image_path, size, queue))
+    process.start()
+    result = queue.get()
+    process.join()
+    return result
+
+
+def _create_samples(directory: str) -> list:
+    """6000x4000のサンプル画像（JPEG/PNG）を作成"""
+    gradient = Image.linear_gradient("L").resize((6000, 4000))
+    sample = Image.merge("RGB", (gradient, gradient.transpose(Image.Transpose.ROTATE_180), gradient))
+
+    paths = []
+    for ext, kwargs in [(".jpg", {"quality": 90}), (".png", {"compress_level": 1})]:
+        path = os.path.join(directory, f"sample_6000x4000{ext}")
+        sample.save(path, **kwargs)
+        paths.append(path)
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description="大きな画像のデコード時間とメモリ使用量の比較")
+    parser.add_argument("images", nargs="*", help="画像のパス（省略時は6000x4000のサンプルを生成）")
+    parser.add_argument("--size", default="1280x720", help="目標サイズ (例: 1280x720)")
+    args = parser.parse_args()
+
+    size = tuple(int(v) for v in args.size.lower().split("x"))
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        images = args.images or _create_samples(tmpdir)
+
+        for image_path in images:
+            with Image.open(image_path) as source:
+                print(f"{os.path.basename(image_path)} ({source.format} {source.width}x{source.height}) -> {size[0]}x{size[1]}")
+
+            for label, decode in [("full decode", _decode_full), ("draft/reduce", _decode_reduced)]:
+                elapsed, peak, baseline = _measure(decode, image_path, size)
+                print(
+                    f"  {label:<14} {elapsed:8.1f} ms  "
+                    f"peak RSS {peak:7.1f} MB (+{peak - baseline:.1f} MB)"
+                )
+
+
+if __name__ == "__main__":
+    main()
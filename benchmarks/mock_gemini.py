@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+"""
+ローカルのモックGeminiエンドポイント
+
+generateContent への POST に対して、画像パーツを含むレスポンスを返す。
+HTTP/1.1 の keep-alive に対応しているため、接続の再利用の効果を計測できる。
+
+- 画像: 固定の小さなPNG（canned）か、要求された解像度で生成したPNG（procedural）
+- 処理時間: 中央値とばらつき（対数正規分布）を指定できる
+- エラー: 一定の割合でHTTPエラー（429/503等）を返す
+- 安全性フィルター: 一定の割合で finishReason=SAFETY を返す
+- シナリオ: プロンプトに "[mock:<シナリオ名>]" を含めると、そのレスポンスを必ず返す
+  （process_api_response() の各分岐を確認するためのフィクスチャ。SCENARIOS を参照）
+
+使い方:
+    python benchmarks/mock_gemini.py [--port 8765] [--latency-ms 0] [--latency-sigma 0]
+                                     [--error-rate 0] [--error-status 503] [--safety-rate 0]
+                                     [--image procedural]
+
+    # アプリ側はこの環境変数で接続先を差し替える
+    GEMINI_API_BASE_URL=http://127.0.0.1:8765 python app/main.py
+"""
+
+import argparse
+import base64
+import contextlib
+import hashlib
+import io
+import json
+import random
+import re
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from PIL import Image
+
+
+# 解像度ごとの生成画像サイズ（16:9）
+IMAGE_SIZES = {
+    "1K": (1024, 576),
+    "2K": (2048, 1152),
+    "4K": (4096, 2304),
+}
+
+# シナリオ名 -> 説明（process_api_response() の分岐に対応）
+SCENARIOS = {
+    "image": "画像パーツを含む正常なレスポンス",
+    "text_only": "テキストのみで画像がない",
+    "long_text": "200文字を超えるテキストのみ（メッセージが省略される）",
+    "no_parts_content": "画像もテキストもないパーツ",
+    "empty_parts": "パーツが空",
+    "no_parts": "コンテンツにパーツがない",
+    "no_content": "候補にコンテンツがない",
+    "safety": "安全性フィルターでブロック（finishReason=SAFETY）",
+    "recitation": "著作権関連でブロック（finishReason=RECITATION）",
+    "blocked": "候補が空でプロンプトがブロックされた（promptFeedback.blockReason）",
+    "no_candidates": "候補データがない",
+    "corrupt_image": "画像パーツのデータが壊れている",
+}
+
+_SCENARIO_TAG = re.compile(r"\[mock:(\w+)\]")
+
+
+def _png_bytes(image: Image.Image) -> bytes:
+    """画像をPNGにエンコード"""
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG", compress_level=1)
+    return buffer.getvalue()
+
+
+def _procedural_png(prompt: str, resolution: str) -> bytes:
+    """プロンプトから色を決めたグラデーション画像を要求された解像度で生成"""
+    width, height = IMAGE_SIZES.get(resolution, IMAGE_SIZES["1K"])
+    seed = hashlib.blake2b(prompt.encode("utf-8"), digest_size=3).digest()
+    gradient = Image.linear_gradient("L").resize((width, height))
+    channels = [gradient.point(lambda v, c=c: (v * c) // 255) for c in seed]
+    return _png_bytes(Image.merge("RGB", channels))
+
+
+def _candidate(parts=None, finish_reason="STOP", content=True) -> dict:
+    """候補データを組み立てる"""
+    candidate = {"finishReason": finish_reason}
+    if content:
+        candidate["content"] = {"role": "model"}
+        if parts is not None:
+            candidate["content"]["parts"] = parts
+    return candidate
+
+
+def _request_prompt(request: dict) -> str:
+    """リクエストに含まれるテキストを連結"""
+    texts = []
+    for content in request.get("contents", []):
+        for part in content.get("parts", []):
+            if "text" in part:
+                texts.append(part["text"])
+    return "\n".join(texts)
+
+
+class MockGeminiHandler(BaseHTTPRequestHandler):
+    """generateContent を模倣するリクエストハンドラ"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            request = {}
+
+        server = self.server
+        prompt = _request_prompt(request)
+        generation_config = request.get("generationConfig", {})
+        resolution = generation_config.get("imageConfig", {}).get("imageSize", "1K")
+        candidate_count = generation_config.get("candidateCount") or 1
+
+        latency = server.sample_latency()
+        if latency > 0:
+            time.sleep(latency)
+
+        scenario, status = server.choose_outcome(prompt)
+        server.count(scenario if status is None else f"http_{status}")
+        if status is not None:
+            self._send_error(status)
+            return
+
+        body = json.dumps(
+            server.build_response(scenario, prompt, resolution, candidate_count)
+        ).encode("utf-8")
+        self._send_json(200, body)
+
+    def _send_error(self, status: int):
+        """Gemini APIと同じ形式のエラーを返す"""
+        body = json.dumps({
+            "error": {
+                "code": status,
+                "message": "mock error",
+                "status": "RESOURCE_EXHAUSTED" if status == 429 else "UNAVAILABLE",
+            }
+        }).encode("utf-8")
+        self._send_json(status, body)
+
+    def _send_json(self, status: int, body: bytes):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MockGeminiServer(ThreadingHTTPServer):
+    """モックGeminiサーバー"""
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address,
+        latency: float = 0.0,
+        error_rate: float = 0.0,
+        error_statuses=(503,),
+        seed: int = None,
+        latency_sigma: float = 0.0,
+        safety_rate: float = 0.0,
+        image_mode: str = "canned"
+    ):
+        """
+        Args:
+            address: 待ち受けアドレス (host, port)
+            latency: 1リクエストごとの処理時間の中央値（秒）
+            error_rate: HTTPエラーを返す割合（0〜1）
+            error_statuses: 返すHTTPエラーのステータス（均等に選ぶ）
+            seed: 乱数のシード
+            latency_sigma: 処理時間のばらつき（対数正規分布のσ。0の場合は一定）
+            safety_rate: 安全性フィルターでブロックする割合（0〜1）
+            image_mode: "canned"（固定の小さな画像）または "procedural"（要求された解像度で生成）
+        """
+        super().__init__(address, MockGeminiHandler)
+        self.latency = latency
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.error_statuses = tuple(error_statuses)
+        self.safety_rate = safety_rate
+        self.image_mode = image_mode
+        self.rng = random.Random(seed)
+        self.canned_image = _png_bytes(Image.new("RGB", (64, 36), (40, 80, 160)))
+        self.request_count = 0
+        self.error_count = 0
+        self.outcomes = {}  # シナリオ名（HTTPエラーは "http_<status>"）-> 回数
+        self._connections = set()
+        self._lock = threading.Lock()
+
+    def process_request(self, request, client_address):
+        # 受け付けた接続の数を数える（keep-aliveの効果の確認用）
+        self._connections.add(client_address)
+        super().process_request(request, client_address)
+
+    @property
+    def connection_count(self) -> int:
+        """受け付けたTCP接続の数"""
+        return len(self._connections)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def sample_latency(self) -> float:
+        """処理時間を分布から選ぶ"""
+        if self.latency <= 0:
+            return 0.0
+        if self.latency_sigma <= 0:
+            return self.latency
+        with self._lock:
+            return self.latency * self.rng.lognormvariate(0.0, self.latency_sigma)
+
+    def choose_outcome(self, prompt: str):
+        """
+        レスポンスの種類を決める
+
+        Returns:
+            (シナリオ名, HTTPエラーのステータスまたはNone)
+        """
+        match = _SCENARIO_TAG.search(prompt)
+        if match and match.group(1) in SCENARIOS:
+            return match.group(1), None
+
+        with self._lock:
+            if self.error_rate > 0 and self.rng.random() < self.error_rate:
+                return None, self.rng.choice(self.error_statuses)
+            if self.safety_rate > 0 and self.rng.random() < self.safety_rate:
+                return "safety", None
+        return "image", None
+
+    def count(self, outcome: str):
+        """レスポンスの種類ごとの回数を記録"""
+        with self._lock:
+            self.request_count += 1
+            if outcome.startswith("http_"):
+                self.error_count += 1
+            self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+
+    def build_response(self, scenario: str, prompt: str, resolution: str, candidate_count: int = 1) -> dict:
+        """シナリオに対応するレスポンスを組み立てる（画像は candidateCount 個の候補を返す）"""
+        if scenario == "image":
+            candidates = []
+            for index in range(candidate_count):
+                if self.image_mode == "procedural":
+                    data = _procedural_png(f"{prompt}#{index}", resolution)
+                else:
+                    data = self.canned_image
+                parts = [
+                    {"text": "mock image"},
+                    {"inlineData": {"mimeType": "image/png", "data": base64.b64encode(data).decode("ascii")}},
+                ]
+                candidates.append(_candidate(parts))
+            return {"candidates": candidates}
+        if scenario == "text_only":
+            return {"candidates": [_candidate([{"text": "I can't draw that, but here is a description."}])]}
+        if scenario == "long_text":
+            return {"candidates": [_candidate([{"text": "x" * 500}])]}
+        if scenario == "no_parts_content":
+            return {"candidates": [_candidate([{"thought": True}])]}
+        if scenario == "empty_parts":
+            return {"candidates": [_candidate([])]}
+        if scenario == "no_parts":
+            return {"candidates": [_candidate()]}
+        if scenario == "no_content":
+            return {"candidates": [_candidate(content=False)]}
+        if scenario == "safety":
+            return {"candidates": [_candidate(finish_reason="SAFETY", content=False)]}
+        if scenario == "recitation":
+            return {"candidates": [_candidate(finish_reason="RECITATION", content=False)]}
+        if scenario == "blocked":
+            return {"candidates": [], "promptFeedback": {"blockReason": "SAFETY"}}
+        if scenario == "no_candidates":
+            return {"modelVersion": "mock"}
+        if scenario == "corrupt_image":
+            parts = [{"inlineData": {"mimeType": "image/png", "data": base64.b64encode(b"not a png").decode("ascii")}}]
+            return {"candidates": [_candidate(parts)]}
+        raise ValueError(f"未知のシナリオです: {scenario}")
+
+
+def start_mock_server(port: int = 0, latency: float = 0.0, **options) -> MockGeminiServer:
+    """
+    モックサーバーをバックグラウンドスレッドで起動
+
+    Args:
+        port: 待ち受けポート（0の場合は空いているポート）
+        latency: 1リクエストごとの処理時間の中央値（秒）
+        **options: MockGeminiServer のその他の引数
+            （error_rate, error_statuses, seed, latency_sigma, safety_rate, image_mode。
+              起動後も同名の属性で変更できる）
+
+    Returns:
+        MockGeminiServer: 起動したサーバー（終了時は shutdown() を呼ぶ）
+    """
+    server = MockGeminiServer(("127.0.0.1", port), latency, **options)
+    thread = threading.Thread(target=server.serve_forever, name="mock-gemini", daemon=True)
+    thread.start()
+    return server
+
+
+@contextlib.contextmanager
+def isolated_response_cache():
+    """
+    モックの画像がアプリのレスポンスキャッシュに残らないよう、一時ディレクトリに切り替える
+
+    終了時に一時ディレクトリを削除し、元の保存先に戻す。app を sys.path に追加してから使う
+    （このモジュール単体ではアプリに依存しないよう、呼ばれたときに読み込む）。
+
+    Yields:
+        str: 一時ディレクトリのパス
+    """
+    from logic.response_cache import get_response_cache
+
+    cache = get_response_cache()
+    previous = cache.directory
+    with tempfile.TemporaryDirectory() as directory:
+        cache.set_directory(directory)
+        try:
+            yield directory
+        finally:
+            cache.set_directory(previous)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ローカルのモックGeminiエンドポイント")
+    parser.add_argument("--port", type=int, default=8765, help="待ち受けポート")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="1リクエストごとの処理時間の中央値")
+    parser.add_argument("--latency-sigma", type=float, default=0.0, help="処理時間のばらつき（対数正規分布のσ）")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="HTTPエラーを返す割合（0〜1）")
+    parser.add_argument("--error-status", type=int, action="append", help="返すHTTPエラーのステータス（複数指定可）")
+    parser.add_argument("--safety-rate", type=float, default=0.0, help="安全性フィルターでブロックする割合（0〜1）")
+    parser.add_argument("--image", choices=["canned", "procedural"], default="canned", help="返す画像")
+    parser.add_argument("--seed", type=int, default=None, help="乱数のシード")
+    args = parser.parse_args()
+
+    server = MockGeminiServer(
+        ("127.0.0.1", args.port),
+        args.latency_ms / 1000,
+        error_rate=args.error_rate,
+        error_statuses=args.error_status or (503,),
+        seed=args.seed,
+        latency_sigma=args.latency_sigma,
+        safety_rate=args.safety_rate,
+        image_mode=args.image
+    )
+    print(f"モックGeminiサーバー: {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+服装プロンプト照合のベンチマーク
+
+OUTFIT_DATA の語を組み合わせた大量のプロンプトに対して、分類ごと・語ごとに部分文字列を探す従来の方法と、
+1つの正規表現で1回だけ走査する OutfitMatcher の所要時間を比較し、すべてのプロンプトで結果が一致するかを確認する。
+語彙は --vocabulary で指定したJSONファイル（OUTFIT_DATA と同じ形）を使う。指定がない場合は constants.OUTFIT_DATA、
+それも定義されていない場合は同梱のサンプル語彙（outfit_vocabulary_sample.json。アプリの語彙ではなく、
+"dress" / "long dress" や "blue" / "navy blue" のように語が重なるよう作った架空の語彙）を使う。
+
+使い方:
+    python benchmarks/outfit_matching.py [--prompts 20000] [--seed 0] [--vocabulary outfit_data.json]
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+import constants
+from logic.outfit_matcher import OutfitMatcher
+
+
+SAMPLE_VOCABULARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "outfit_vocabulary_sample.json")
+
+_FILLER = [
+    "wearing", "with", "and", "a", "long sleeves", "ribbon", "accessories", "slightly oversized",
+    "high quality", "detailed fabric", "knee length", "frills", "buttons", "lace trim", "soft lighting",
+]
+
+
+def _linear_scan(outfit_data: dict, outfit_prompt: str) -> dict:
+    """従来の方法（分類ごとに語を順に部分文字列として探す）"""
+    result = {'category': 'おまかせ', 'shape': 'おまかせ', 'color': 'おまかせ', 'pattern': 'おまかせ', 'style': 'おまかせ'}
+    if not outfit_prompt:
+        return result
+    prompt_lower = outfit_prompt.lower()
+    for key, group in (('color', "色"), ('pattern', "柄"), ('style', "スタイル")):
+        for jp_name, en_name in outfit_data[group].items():
+            if en_name and en_name.lower() in prompt_lower:
+                result[key] = jp_name
+                break
+    found_category = None
+    found_shape = None
+    for category, shapes in outfit_data["形状"].items():
+        for jp_shape, en_shape in shapes.items():
+            if en_shape and en_shape.lower() in prompt_lower:
+                found_category = category
+                found_shape = jp_shape
+                break
+        if found_shape:
+            break
+    if not found_category:
+        for jp_name, en_name in outfit_data["カテゴリ"].items():
+            if en_name and en_name.lower() in prompt_lower:
+                found_category = jp_name
+                break
+    if found_category:
+        result['category'] = found_category
+    if found_shape:
+        result['shape'] = found_shape
+    return result
+
+
+def _matcher_scan(matcher: OutfitMatcher, outfit_prompt: str) -> dict:
+    """OutfitMatcher を使う方法（parse_outfit_from_prompt() と同じ組み立て）"""
+    result = {'category': 'おまかせ', 'shape': 'おまかせ', 'color': 'おまかせ', 'pattern': 'おまかせ', 'style': 'おまかせ'}
+    if not outfit_prompt:
+        return result
+    found = matcher.match(outfit_prompt)
+    for key in ('color', 'pattern', 'style'):
+        if found[key]:
+            result[key] = found[key]
+    if found['shape']:
+        result['category'], result['shape'] = found['shape']
+    elif found['category']:
+        result['category'] = found['category']
+    return result
+
+
+def _corpus(outfit_data: dict, count: int, seed: int) -> list:
+    """語彙と無関係な語を組み合わせたプロンプト（大文字小文字も混ぜる）"""
+    rng = random.Random(seed)
+    vocabulary = [v for key in ("カテゴリ", "色", "柄", "スタイル") for v in outfit_data[key].values() if v]
+    vocabulary += [v for shapes in outfit_data["形状"].values() for v in shapes.values() if v]
+    prompts = []
+    for _ in range(count):
+        words = rng.sample(vocabulary, rng.randint(0, 6)) + rng.sample(_FILLER, rng.randint(2, 8))
+        rng.shuffle(words)
+        prompt = ", ".join(words)
+        prompts.append(prompt.upper() if rng.random() < 0.1 else prompt)
+    return prompts
+
+
+def _load_vocabulary(path: str):
+    """
+    比較に使う語彙を読み込む
+
+    Returns:
+        (語彙, 表示用の名前)。読み込めなかった場合は (None, エラーメッセージ)
+    """
+    if path is None:
+        outfit_data = getattr(constants, "OUTFIT_DATA", None)
+        if outfit_data:
+            return outfit_data, "constants.OUTFIT_DATA"
+        path = SAMPLE_VOCABULARY_PATH
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            outfit_data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        return None, f"語彙を読み込めません: {path} ({e})"
+    if os.path.abspath(path) == SAMPLE_VOCABULARY_PATH:
+        return outfit_data, "サンプル語彙（アプリの語彙ではない）"
+    return outfit_data, path
+
+
+def main():
+    parser = argparse.ArgumentParser(description="服装プロンプト照合の所要時間の比較")
+    parser.add_argument("--prompts", type=int, default=20000, help="プロンプト数")
+    parser.add_argument("--seed", type=int, default=0, help="乱数のシード")
+    parser.add_argument("--vocabulary", help="OUTFIT_DATA と同じ形の語彙のJSONファイル")
+    args = parser.parse_args()
+
+    outfit_data, source = _load_vocabulary(args.vocabulary)
+    if outfit_data is None:
+        print(source)
+        sys.exit(2)
+
+    start = time.perf_counter()
+    matcher = OutfitMatcher(outfit_data)
+    build = time.perf_counter() - start
+
+    prompts = _corpus(outfit_data, args.prompts, args.seed)
+    print(f"{source}  プロンプト {len(prompts)}件  照合器の作成 {build * 1000:.1f} ms")
+
+    start = time.perf_counter()
+    expected = [_linear_scan(outfit_data, p) for p in prompts]
+    linear = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = [_matcher_scan(matcher, p) for p in prompts]
+    single_pass = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    print(f"  linear scans   {linear * 1e6 / len(prompts):7.2f} us/prompt")
+    print(f"  single regex   {single_pass * 1e6 / len(prompts):7.2f} us/prompt")
+    print(f"  結果の不一致   {mismatches}件")
+    sys.exit(1 if mismatches else 0)
+
+
+if __name__ == "__main__":
+    main()
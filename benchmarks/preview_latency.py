@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+プレビュー描画のベンチマーク
+
+フル解像度で合成してからLANCZOSで縮小する従来の方法と、
+プレビュー解像度で直接合成する方法のレイテンシを比較する。
+
+使い方:
+    python benchmarks/preview_latency.py [背景画像のパス] [--iterations N]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from PIL import Image
+
+from constants import THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT, UI_SETTINGS
+from logic.image_composer import ImageComposer
+
+
+def _compose(scale: float, background_path: str, title: str) -> ImageComposer:
+    """キー入力1回分のプレビュー合成（MainWindowの「インパクト」「左上」相当）"""
+    composer = ImageComposer(THUMBNAIL_WIDTH, THUMBNAIL_HEIGHT, scale=scale)
+    if background_path:
+        composer.set_background_image(background_path)
+    else:
+        composer.create_canvas("#1a1a2e")
+
+    composer.add_text(
+        text="新人AIシンガーソングライター", position=(50, 60), font_size=28,
+        anchor="left", stroke_width=2, stroke_color="#000000"
+    )
+    composer.add_text(
+        text=title, position=(50, 120), font_size=80, anchor="left",
+        stroke_width=8, stroke_color="#000000",
+        shadow=True, shadow_offset=(4, 4), shadow_color="#000000"
+    )
+    composer.add_text(
+        text="彩瀬こよみ", position=(50, 220), font_size=56, anchor="left",
+        stroke_width=8, stroke_color="#000000",
+        shadow=True, shadow_offset=(4, 4), shadow_color="#000000"
+    )
+    composer.add_text(
+        text="12月15日公開", position=(1230, 670), font_size=24,
+        font_color="#FFEB3B", anchor="right", stroke_width=2
+    )
+    return composer
+
+
+def render_full_then_downscale(background_path: str, title: str) -> Image.Image:
+    """従来方式: 1280x720で合成してから縮小"""
+    image = _compose(1.0, background_path, title).get_image()
+    preview_size = (
+        int(THUMBNAIL_WIDTH * UI_SETTINGS["preview_scale"]),
+        int(THUMBNAIL_HEIGHT * UI_SETTINGS["preview_scale"])
+    )
+    return image.resize(preview_size, Image.Resampling.LANCZOS)
+
+
+def render_native_preview(background_path: str, title: str) -> Image.Image:
+    """新方式: プレビュー解像度で直接合成"""
+    return _compose(UI_SETTINGS["preview_scale"], background_path, title).get_image()
+
+
+def _measure(render, background_path: str, iterations: int) -> list:
+    """タイトルを毎回変えながら1回あたりの時間を計測（タイトルのスプライトは毎回描画される）"""
+    base_title = "秋風のプロミス"
+    render(background_path, base_title)  # ウォームアップ
+
+    timings = []
+    for i in range(iterations):
+        title = f"{base_title}{i}"
+        start = time.perf_counter()
+        render(background_path, title)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="プレビュー描画のレイテンシ比較")
+    parser.add_argument("background", nargs="?", default=None, help="背景画像のパス")
+    parser.add_argument("--iterations", type=int, default=50, help="計測回数")
+    args = parser.parse_args()
+
+    for label, render in [
+        ("full-res + LANCZOS", render_full_then_downscale),
+        ("native preview", render_native_preview),
+    ]:
+        timings = _measure(render, args.background, args.iterations)
+        print(
+            f"{label:<20} median {statistics.median(timings):7.2f} ms  "
+            f"p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
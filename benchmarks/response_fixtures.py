@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+process_api_response() の全分岐の確認
+
+モックGeminiエンドポイントのシナリオ（SCENARIOS）ごとに generate_image_with_api() を呼び出し、
+HTTPでは表現できない形（レスポンスがNone・属性の欠けたオブジェクト等）は
+process_api_response() に直接渡して、それぞれ想定した結果になるかを表示する。
+
+使い方:
+    python benchmarks/response_fixtures.py
+"""
+
+import contextlib
+import io
+import os
+import sys
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from constants import API_BASE_URL_ENV
+from logic import api_client
+from mock_gemini import SCENARIOS, isolated_response_cache, start_mock_server
+
+
+API_KEY = "mock-api-key-for-benchmark"
+
+# シナリオ -> 想定する結果（Noneは成功、文字列はエラーメッセージに含まれる文言）
+HTTP_FIXTURES = {
+    "image": None,
+    "text_only": "APIからのメッセージ",
+    "long_text": "...",
+    "no_parts_content": "画像データが返されませんでした",
+    "empty_parts": "パーツが空です",
+    "no_parts": "パーツデータがありません",
+    "no_content": "コンテンツがありません",
+    "safety": "安全性フィルター",
+    "recitation": "著作権関連",
+    "blocked": "(理由: ",
+    "no_candidates": "候補データがありません",
+    "corrupt_image": "レスポンス処理エラー",
+}
+
+# HTTPでは返せないレスポンスオブジェクト -> 想定する結果
+DIRECT_FIXTURES = {
+    "none_response": (None, "レスポンスがありませんでした"),
+    "missing_attribute": (
+        SimpleNamespace(candidates=[SimpleNamespace(
+            finish_reason=None,
+            content=SimpleNamespace(parts=[SimpleNamespace(inline_data=object())])
+        )]),
+        "レスポンス構造エラー"
+    ),
+    "unexpected_type": (SimpleNamespace(candidates=5), "レスポンス処理エラー"),
+}
+
+
+def _check(name: str, result: dict, expected) -> bool:
+    """結果が想定どおりか表示"""
+    if expected is None:
+        ok = result["success"] and result["image"] is not None
+    else:
+        ok = not result["success"] and expected in (result["error"] or "")
+    detail = "success" if result["success"] else (result["error"] or "").splitlines()[0]
+    print(f"  [{'OK' if ok else 'NG'}] {name:<18} {detail}")
+    return ok
+
+
+def main():
+    missing = set(SCENARIOS) - set(HTTP_FIXTURES)
+    if missing:
+        print(f"想定結果が定義されていないシナリオがあります: {sorted(missing)}")
+        sys.exit(1)
+
+    server = start_mock_server()
+    os.environ[API_BASE_URL_ENV] = server.base_url
+    api_client.get_request_guard().configure(rate_per_minute=6000, burst=100)
+
+    results = []
+    try:
+        with isolated_response_cache():
+            print(f"モックエンドポイント: {server.base_url}")
+            for scenario, expected in HTTP_FIXTURES.items():
+                with contextlib.redirect_stdout(io.StringIO()):
+                    result = api_client.generate_image_with_api(
+                        API_KEY, f"prompt: fixture [mock:{scenario}]", [], "1K", use_cache=False
+                    )
+                results.append(_check(scenario, result, expected))
+
+            for name, (response, expected) in DIRECT_FIXTURES.items():
+                results.append(_check(name, api_client.process_api_response(response), expected))
+    finally:
+        api_client.close_clients()
+        server.shutdown()
+        server.server_close()
+
+    print(f"{sum(results)}/{len(results)} 件が想定どおり")
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+YAML読み込みのベンチマーク
+
+生成プロンプトと同程度の大きさのYAMLファイル（メタデータ付き）を一時ディレクトリに作成し、
+1回の読み込みあたりの所要時間を比較する。
+
+- yaml.safe_load（純Python版。従来の方法）
+- LibYAMLのローダーでの解析
+- キャッシュ経由（変更のないファイルの2回目以降。stat のみ）
+
+使い方:
+    python benchmarks/yaml_loading.py [--scenes 6] [--repeat 200]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from logic.yaml_cache import SafeLoader, YamlCache
+
+
+def _sample_document(scenes: int) -> dict:
+    """生成プロンプトに似た構造のドキュメント"""
+    return {
+        "title": "サンプル動画のサムネイル",
+        "style": {"color_mode": "フルカラー", "output_style": "アニメ調", "aspect_ratio": "16:9"},
+        "characters": [
+            {
+                "name": f"キャラクター{i}",
+                "description": "明るい性格の高校生。長い黒髪に赤いリボン。" * 3,
+                "outfit": "school uniform, sailor collar, navy blue, plain, cute",
+                "expression": "smile",
+            }
+            for i in range(3)
+        ],
+        "scenes": [
+            {
+                "background": "classroom at sunset, warm light through the windows",
+                "speeches": [
+                    {"character": "キャラクター0", "content": "今日は何をしようか？", "position": "left"},
+                    {"character": "キャラクター1", "content": "新しい動画を作ろう！", "position": "right"},
+                ],
+                "texts": [{"content": f"第{i}話", "position": "top-left"}],
+            }
+            for i in range(scenes)
+        ],
+        "_metadata": {
+            "created_at": "2025-01-01 12:00:00",
+            "generated_image": "sample.png",
+            "generated_image_full_path": "/path/to/output/sample.png",
+        },
+    }
+
+
+def _measure(label: str, func, repeat: int):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<24} {elapsed * 1000:8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="YAML読み込みの所要時間の比較")
+    parser.add_argument("--scenes", type=int, default=6, help="サンプルのシーン数")
+    parser.add_argument("--repeat", type=int, default=200, help="繰り返し回数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sample.yaml")
+        with open(path, "w", encoding="utf-8") as f:
+            yaml.dump(_sample_document(args.scenes), f, allow_unicode=True, default_flow_style=False)
+        print(f"サンプル: {os.path.getsize(path) / 1024:.1f} KB  ローダー: {SafeLoader.__name__}")
+
+        def pure_python():
+            with open(path, "r", encoding="utf-8") as f:
+                return yaml.safe_load(f)
+
+        def libyaml():
+            with open(path, "r", encoding="utf-8") as f:
+                return yaml.load(f, Loader=SafeLoader)
+
+        cache = YamlCache()
+        cache.read(path)
+
+        _measure("yaml.safe_load", pure_python, args.repeat)
+        _measure(SafeLoader.__name__, libyaml, args.repeat)
+        _measure("cached (unchanged file)", lambda: cache.read(path), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+複数ドキュメントのYAML読み込みのベンチマーク
+
+生成プロンプトのドキュメントを多数含む1つのYAMLファイル（先頭に指示文、途中に辞書でないドキュメントを含む）を
+一時ディレクトリに作成し、(番号, データ, UI用データ) が得られるまでの時間・全体の所要時間・
+ピークメモリ（tracemalloc）を比較する。最後に両方の結果がすべて一致するかを確認する。
+
+- ファイル全体を読み込み、指示文を除いて yaml.safe_load_all の結果をリストにしてから変換する（純Python版。従来の方法）
+- 同じことをLibYAMLのローダーで行う
+- iter_yaml_documents() で1件ずつ解析・変換する（render --documents が使う方法）
+
+使い方:
+    python benchmarks/yaml_streaming.py [--documents 200] [--scenes 6]
+"""
+
+import argparse
+import itertools
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import yaml
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app"))
+
+from logic.file_manager import _skip_instruction_header, iter_yaml_documents, parse_yaml_to_ui_data
+from logic.yaml_cache import SafeLoader
+from yaml_loading import _sample_document
+
+
+def _measure(label: str, open_documents):
+    """最初のドキュメントまでの時間・全体の時間・ピークメモリを表示"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    first = None
+    count = 0
+    for _ in open_documents():
+        if first is None:
+            first = time.perf_counter() - start
+        count += 1
+    total = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"  {label:<28} 最初 {first * 1000:8.1f} ms  全体 {total * 1000:8.1f} ms  "
+          f"ピーク {peak / 1024 / 1024:6.1f} MB  ({count}件)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="複数ドキュメントのYAML読み込みの比較")
+    parser.add_argument("--documents", type=int, default=200, help="ドキュメント数")
+    parser.add_argument("--scenes", type=int, default=6, help="1ドキュメントあたりのシーン数")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "prompts.yaml")
+        document = _sample_document(args.scenes)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("Generate thumbnails from the YAML documents below.\n\n")
+            yaml.dump_all([document] * args.documents, f, allow_unicode=True, default_flow_style=False)
+            # 辞書でないドキュメントは飛ばされる
+            f.write("---\n- not a prompt\n")
+        print(f"サンプル: {os.path.getsize(path) / 1024 / 1024:.1f} MB  {args.documents}件  "
+              f"ローダー: {SafeLoader.__name__}")
+
+        def read_all(loader):
+            def documents():
+                with open(path, "r", encoding="utf-8") as f:
+                    content = f.read()
+                parsed = list(yaml.load_all(_skip_instruction_header(content), Loader=loader))
+                return [
+                    (index, data, parse_yaml_to_ui_data(data))
+                    for index, data in enumerate(parsed) if isinstance(data, dict)
+                ]
+            return documents
+
+        _measure("yaml.safe_load_all (list)", read_all(yaml.SafeLoader))
+        _measure(f"{SafeLoader.__name__} (list)", read_all(SafeLoader))
+        _measure("iter_yaml_documents", lambda: iter_yaml_documents(path))
+
+        expected = read_all(SafeLoader)()
+        mismatches = sum(
+            1 for a, b in itertools.zip_longest(expected, iter_yaml_documents(path)) if a != b
+        ) + abs(len(expected) - args.documents)
+        print(f"  結果の不一致   {mismatches}件")
+        if mismatches:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()